@@ -0,0 +1,87 @@
+# bench_upstream.py
+"""
+Latency benchmark for upstream calls against a local mock Gemini server.
+Compares a new httpx.AsyncClient per call (the old behaviour) with the shared
+app-scoped client from main.py. The mock adds --handshake-ms once per new
+connection to stand in for TCP+TLS setup, and --latency-ms per request.
+
+Usage: python bench_upstream.py [--requests 500] [--concurrency 20] [--handshake-ms 30] [--latency-ms 20]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+RESPONSE = json.dumps({"candidates": [{"content": {"parts": [{"text": "{\"ai_score\": 70}"}]}}]}).encode()
+
+async def mock_upstream(reader, writer, handshake: float, latency: float):
+    await asyncio.sleep(handshake)
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            if length:
+                await reader.readexactly(length)
+            await asyncio.sleep(latency)
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%s" % (len(RESPONSE), RESPONSE))
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+async def measure(call, requests: int, concurrency: int):
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with slots:
+            start = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1]
+
+async def main(args):
+    server = await asyncio.start_server(
+        lambda r, w: mock_upstream(r, w, args.handshake_ms / 1000, args.latency_ms / 1000), "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    os.environ.setdefault("GEMINI_API_KEY", "bench")
+    os.environ["GEMINI_API_BASE"] = f"http://127.0.0.1:{port}"
+    import httpx
+    import main as service
+
+    url = f"{service.GEMINI_API_BASE}/v1beta/models/gemini-2.0-flash:generateContent"
+    payload = {"contents": [{"parts": [{"text": "benchmark"}]}]}
+
+    async def per_call_client():
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            r = await client.post(url, params={"key": "bench"}, json=payload)
+            r.raise_for_status()
+
+    async def shared_client():
+        await service.call_gemini_raw("benchmark")
+
+    print(f"requests={args.requests} concurrency={args.concurrency} handshake={args.handshake_ms}ms latency={args.latency_ms}ms http2={service.HTTP2_ENABLED}")
+    p50, p99 = await measure(per_call_client, args.requests, args.concurrency)
+    print(f"client per call: p50={p50:.1f}ms p99={p99:.1f}ms")
+    async with service.lifespan(service.app):
+        p50, p99 = await measure(shared_client, args.requests, args.concurrency)
+    print(f"shared client:   p50={p50:.1f}ms p99={p99:.1f}ms")
+    server.close()
+    await server.wait_closed()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-call vs shared HTTP client")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--handshake-ms", type=float, default=30.0)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    asyncio.run(main(parser.parse_args()))
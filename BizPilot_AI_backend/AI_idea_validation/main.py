@@ -1,12 +1,18 @@
 # main.py
 import os
 import json
-from typing import List
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Set
 from fastapi import FastAPI, HTTPException, Form, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import httpx
+import time
 from fastapi.middleware.cors import CORSMiddleware
+from response_cache import ResponseCache, SQLiteStore, make_key, normalize
+from streaming import SectionParser, LatencyStats
+from sessions import SessionStore, compact_reply
 
 
 load_dotenv()
@@ -17,8 +23,70 @@ GOOGLE_PLACES_API_KEY = os.getenv("GOOGLE_PLACES_API_KEY")
 if not GEMINI_API_KEY:
     raise RuntimeError("GEMINI_API_KEY not set in environment")
 
+# upstream base URLs can point at a local mock (see bench_upstream.py)
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com")
+PLACES_API_BASE = os.getenv("PLACES_API_BASE", "https://maps.googleapis.com")
+
+GEMINI_TIMEOUT = httpx.Timeout(float(os.getenv("GEMINI_TIMEOUT", "30")), connect=5.0)
+PLACES_TIMEOUT = httpx.Timeout(float(os.getenv("PLACES_TIMEOUT", "10")), connect=3.0)
+# how long /idea_validation waits for Places before prompting Gemini without it
+PLACES_DEADLINE_SECONDS = float(os.getenv("PLACES_DEADLINE_SECONDS", "1.0"))
+HTTP_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+    max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "20")),
+    keepalive_expiry=30.0,
+)
+
+try:
+    import h2  # noqa: F401  (httpx[http2])
+    HTTP2_ENABLED = True
+except ImportError:
+    HTTP2_ENABLED = False
+
+# per-upstream concurrency caps, so a burst cannot exhaust the pool or the quota
+gemini_slots = asyncio.Semaphore(int(os.getenv("GEMINI_MAX_CONCURRENCY", "32")))
+places_slots = asyncio.Semaphore(int(os.getenv("PLACES_MAX_CONCURRENCY", "16")))
+
+# response caches (see response_cache.py); IDEA_CACHE_PATH enables SQLite persistence
+IDEA_CACHE_PATH = os.getenv("IDEA_CACHE_PATH", "")
+IDEA_CACHE_MAX_ENTRIES = int(os.getenv("IDEA_CACHE_MAX_ENTRIES", "2048"))
+# near-duplicate lookup over local trigram embeddings is opt-in
+IDEA_CACHE_SEMANTIC = os.getenv("IDEA_CACHE_SEMANTIC", "").lower() in ("1", "true", "yes")
+IDEA_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("IDEA_CACHE_SEMANTIC_THRESHOLD", "0.85"))
+_cache_store = SQLiteStore(IDEA_CACHE_PATH) if IDEA_CACHE_PATH else None
+gemini_cache = ResponseCache("gemini", IDEA_CACHE_MAX_ENTRIES, float(os.getenv("GEMINI_CACHE_TTL_SECONDS", "86400")), _cache_store)
+places_cache = ResponseCache("places", IDEA_CACHE_MAX_ENTRIES, float(os.getenv("PLACES_CACHE_TTL_SECONDS", "604800")), _cache_store)
+idea_cache = ResponseCache("idea", IDEA_CACHE_MAX_ENTRIES, float(os.getenv("GEMINI_CACHE_TTL_SECONDS", "86400")), _cache_store)
+
+# one keep-alive client for the whole app, opened in lifespan
+http_client: Optional[httpx.AsyncClient] = None
+
+def create_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(http2=HTTP2_ENABLED, limits=HTTP_LIMITS)
+
+def get_http_client() -> httpx.AsyncClient:
+    """The shared client; outside the app lifespan (scripts, tests) it is created on first use."""
+    global http_client
+    if http_client is None:
+        http_client = create_http_client()
+    return http_client
+
+async def close_http_client() -> None:
+    global http_client
+    client, http_client = http_client, None
+    if client is not None:
+        await client.aclose()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_http_client()
+    try:
+        yield
+    finally:
+        await close_http_client()
 
-app = FastAPI(title="BizPilot AI - Business Co-Pilot")
+
+app = FastAPI(title="BizPilot AI - Business Co-Pilot", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -39,12 +107,12 @@ class IdeaValidationResponse(BaseModel):
     monthly_estimates: dict
 
 
-async def call_gemini_raw(prompt: str, model: str = "gemini-2.0-flash", timeout: float = 30.0) -> str:
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
+async def call_gemini_raw(prompt: str, model: str = "gemini-2.0-flash", timeout: Optional[float] = None) -> str:
+    url = f"{GEMINI_API_BASE}/v1beta/models/{model}:generateContent"
     headers = {"Content-Type": "application/json"}
     payload = {"contents": [{"parts": [{"text": prompt}]}]}
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        r = await client.post(f"{url}?key={GEMINI_API_KEY}", headers=headers, json=payload)
+    async with gemini_slots:
+        r = await get_http_client().post(url, params={"key": GEMINI_API_KEY}, headers=headers, json=payload, timeout=timeout or GEMINI_TIMEOUT)
         r.raise_for_status()
         data = r.json()
     try:
@@ -52,6 +120,37 @@ async def call_gemini_raw(prompt: str, model: str = "gemini-2.0-flash", timeout:
     except Exception:
         return json.dumps({"error": "unexpected gemini response", "raw": data})
 
+async def stream_gemini(prompt: str, model: str = "gemini-2.0-flash") -> AsyncIterator[str]:
+    """Text chunks from streamGenerateContent (server-sent events) as they arrive."""
+    url = f"{GEMINI_API_BASE}/v1beta/models/{model}:streamGenerateContent"
+    payload = {"contents": [{"parts": [{"text": prompt}]}]}
+    async with gemini_slots:
+        async with get_http_client().stream("POST", url, params={"alt": "sse", "key": GEMINI_API_KEY}, json=payload, timeout=GEMINI_TIMEOUT) as r:
+            r.raise_for_status()
+            async for line in r.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                try:
+                    event = json.loads(line[5:])
+                    parts = event["candidates"][0]["content"]["parts"]
+                except (ValueError, KeyError, IndexError):
+                    continue
+                text = "".join(part.get("text", "") for part in parts)
+                if text:
+                    yield text
+
+async def call_gemini_cached(prompt: str, model: str = "gemini-2.0-flash") -> str:
+    """call_gemini_raw behind the prompt-hash cache; only parseable replies are cached."""
+    key = make_key(model, prompt)
+    cached = gemini_cache.get(key)
+    if cached is not None:
+        return cached
+    start = time.perf_counter()
+    raw = await call_gemini_raw(prompt, model=model)
+    if try_parse_json_like(raw) is not None:
+        gemini_cache.put(key, raw, cost=time.perf_counter() - start)
+    return raw
+
 def try_parse_json_like(text: str):
     cleaned = text.strip()
     if cleaned.startswith("```"):
@@ -73,18 +172,35 @@ def try_parse_json_like(text: str):
 async def fetch_competitors_google_places(business_type: str, location: str, limit: int = 3) -> List[str]:
     if not GOOGLE_PLACES_API_KEY:
         return []
+    key = make_key(normalize(business_type), normalize(location), limit)
+    cached = places_cache.get(key)
+    if cached is not None:
+        return cached
+    start = time.perf_counter()
     query = f"{business_type} near {location}"
-    url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
+    url = f"{PLACES_API_BASE}/maps/api/place/textsearch/json"
     params = {"query": query, "key": GOOGLE_PLACES_API_KEY}
-    async with httpx.AsyncClient() as client:
-        r = await client.get(url, params=params, timeout=10.0)
+    async with places_slots:
+        r = await get_http_client().get(url, params=params, timeout=PLACES_TIMEOUT)
         r.raise_for_status()
         data = r.json()
     results = data.get("results", [])[:limit]
-    return [res.get("name") for res in results if res.get("name")]
+    competitors = [res.get("name") for res in results if res.get("name")]
+    places_cache.put(key, competitors, cost=time.perf_counter() - start)
+    return competitors
 
-def build_idea_prompt(business_type: str, location: str, competitors: List[str]) -> str:
-    competitors_text = ", ".join(competitors) if competitors else "No reliable competitor data available"
+async def fetch_competitors_or_empty(business_type: str, location: str, limit: int = 3) -> List[str]:
+    try:
+        return await fetch_competitors_google_places(business_type, location, limit=limit)
+    except Exception:
+        return []
+
+def build_idea_prompt(business_type: str, location: str, competitors: Optional[List[str]]) -> str:
+    """competitors=None is the "pending" variant used while Places is still running."""
+    if competitors is None:
+        competitors_text = "Lookup still pending; name the most likely local competitors yourself"
+    else:
+        competitors_text = ", ".join(competitors) if competitors else "No reliable competitor data available"
     prompt = f"""
 You are a helpful business analyst specialized in Bangladesh startups.
 
@@ -105,18 +221,60 @@ Analyze the business idea and return ONLY valid JSON:
 """
     return prompt
 
+async def validate_idea_raw(business_type: str, location: str):
+    """
+    Places and Gemini without adding their latencies:
+    - Places answers within PLACES_DEADLINE_SECONDS: prompt with its competitors
+    - otherwise Gemini starts on the pending prompt and races Places; if Places
+      lands first its names replace the model's guesses, if Gemini lands first
+      Places is cancelled
+    returns (raw_reply, competitors, override) where override means the
+    competitors were not in the prompt and should replace the model's list
+    """
+    places = asyncio.create_task(fetch_competitors_or_empty(business_type, location, limit=5))
+    speculative = None
+    try:
+        done, _ = await asyncio.wait({places}, timeout=PLACES_DEADLINE_SECONDS)
+        if places in done:
+            competitors = places.result()
+            return await call_gemini_cached(build_idea_prompt(business_type, location, competitors)), competitors, False
+        speculative = asyncio.create_task(call_gemini_cached(build_idea_prompt(business_type, location, None)))
+        done, _ = await asyncio.wait({places, speculative}, return_when=asyncio.FIRST_COMPLETED)
+        competitors = places.result() if places in done else []
+        return await speculative, competitors, bool(competitors)
+    finally:
+        for task in (places, speculative):
+            if task is not None and not task.done():
+                task.cancel()
+
+async def validate_idea_cached(business_type: str, location: str):
+    """
+    validate_idea_raw with caching on normalized inputs, so "Tea Stall"/"tea stall "
+    share cache entries; with IDEA_CACHE_SEMANTIC a close enough earlier business
+    type in the same (exactly matching) location is answered without calling
+    either upstream. Locations are never fuzzy-matched: "mirpur 1" and
+    "mirpur 10" look alike but are different markets. Normalization is for the
+    lookup only; upstream calls get the user's text ("C++ Tutoring" stays as is).
+    """
+    business_key, location_key = normalize(business_type), normalize(location)
+    if IDEA_CACHE_SEMANTIC:
+        near = idea_cache.nearest(business_key, IDEA_CACHE_SEMANTIC_THRESHOLD, group=location_key)
+        if near is not None:
+            value, _ = near
+            return value["raw"], value["competitors"], value["override"]
+    start = time.perf_counter()
+    raw, competitors, override = await validate_idea_raw(business_type, location)
+    if IDEA_CACHE_SEMANTIC and try_parse_json_like(raw) is not None:
+        idea_cache.put(make_key(business_key, location_key), {"raw": raw, "competitors": competitors, "override": override},
+                       cost=time.perf_counter() - start, text=business_key, group=location_key)
+    return raw, competitors, override
+
 @app.post("/idea_validation", response_model=IdeaValidationResponse)
 async def idea_validation(
     business_type: str = Form(...),
     location: str = Form(...),
 ):
-    try:
-        competitors = await fetch_competitors_google_places(business_type, location, limit=5)
-    except Exception:
-        competitors = []
-
-    prompt = build_idea_prompt(business_type, location, competitors)
-    raw = await call_gemini_raw(prompt)
+    raw, competitors, override = await validate_idea_cached(business_type, location)
     parsed = try_parse_json_like(raw)
 
     if parsed is None:
@@ -134,7 +292,7 @@ async def idea_validation(
         "location": location,
         "ai_score": int(parsed.get("ai_score", 0)),
         "market_trend": parsed.get("market_trend", ""),
-        "main_competitors": parsed.get("main_competitors", competitors if competitors else []),
+        "main_competitors": competitors if override else parsed.get("main_competitors", competitors if competitors else []),
         "business_opportunities": parsed.get("business_opportunities", ""),
         "monthly_estimates": parsed.get("monthly_estimates", {"income":0,"expense":0,"currency":"BDT"}),
     }
@@ -142,33 +300,82 @@ async def idea_validation(
 # websocket...
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Set[WebSocket] = set()
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        self.active_connections.discard(websocket)
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
         await websocket.send_text(message)
 
 manager = ConnectionManager()
 
+# BizBot conversations (see sessions.py); set SESSION_STORE_PATH to resume across workers/restarts
+session_store = SessionStore(
+    path=os.getenv("SESSION_STORE_PATH", ""),
+    token_budget=int(os.getenv("SESSION_TOKEN_BUDGET", "2000")),
+    summary_chars=int(os.getenv("SESSION_SUMMARY_CHARS", "1200")),
+    max_in_memory=int(os.getenv("SESSION_MAX_IN_MEMORY", "1000")),
+)
+
+# time from receiving a user message to the first streamed byte sent back
+bizbot_ttfb = LatencyStats()
+
+async def stream_reply(websocket: WebSocket, prompt: str, received_at: float) -> str:
+    """
+    Streams one reply: {"type":"chunk"} frames with raw text, a {"type":"section"}
+    frame per completed top-level key, then {"type":"done"} with the full result.
+    """
+    parser = SectionParser()
+    chunks = []
+    async for text in stream_gemini(prompt):
+        if not chunks:
+            bizbot_ttfb.add(time.perf_counter() - received_at)
+        chunks.append(text)
+        await manager.send_personal_message(json.dumps({"type": "chunk", "text": text}, ensure_ascii=False), websocket)
+        for name, value in parser.feed(text):
+            await manager.send_personal_message(json.dumps({"type": "section", "name": name, "value": value}, ensure_ascii=False), websocket)
+    raw_reply = "".join(chunks)
+    parsed_reply = try_parse_json_like(raw_reply) or empty_roadmap()
+    await manager.send_personal_message(json.dumps({"type": "done", "result": parsed_reply}, ensure_ascii=False), websocket)
+    return raw_reply
+
+def empty_roadmap() -> dict:
+    return {
+        "registration_steps": [],
+        "tax_steps": [],
+        "market_segments": [],
+        "potential_investors": [],
+        "estimated_startup_costs": {"minimum":0,"maximum":0,"currency":"BDT"}
+    }
+
 @app.websocket("/ws/bizbot")
 async def websocket_bizbot(websocket: WebSocket):
+    """
+    Connect with ?stream=1 to receive replies incrementally (see stream_reply).
+    Pass ?session_id=<id> to resume a conversation (or ?session_id=new); the
+    session id is then sent first as {"type":"session","session_id":...}.
+    """
+    streaming = websocket.query_params.get("stream", "").lower() in ("1", "true", "yes")
+    requested_session = websocket.query_params.get("session_id")
     await manager.connect(websocket)
-    context = []
+    session = session_store.open(requested_session)
     try:
+        if streaming or requested_session is not None:
+            await manager.send_personal_message(json.dumps({"type": "session", "session_id": session.id}), websocket)
         while True:
             user_text = await websocket.receive_text()
-            context.append({"role": "user", "text": user_text})
+            received_at = time.perf_counter()
+            session_store.append(session, "user", user_text)
+            await session_store.persist(session)
 
             # Build prompt for AI
             messages_text = "You are BizBot, an expert business assistant for Bangladesh startups.\n"
-            for m in context[-6:]:
-                messages_text += f"{m['role'].upper()}: {m['text']}\n"
+            messages_text += session_store.prompt_context(session)
             messages_text += """
 User wants a complete roadmap for their business. Respond ONLY in valid JSON:
 
@@ -182,23 +389,19 @@ User wants a complete roadmap for their business. Respond ONLY in valid JSON:
 Be practical and concise for Bangladesh startups.
 """
 
-            raw_reply = await call_gemini_raw(messages_text)
-            parsed_reply = try_parse_json_like(raw_reply)
-
-            if parsed_reply is None:
-                parsed_reply = {
-                    "registration_steps": [],
-                    "tax_steps": [],
-                    "market_segments": [],
-                    "potential_investors": [],
-                    "estimated_startup_costs": {"minimum":0,"maximum":0,"currency":"BDT"}
-                }
+            if streaming:
+                raw_reply = await stream_reply(websocket, messages_text, received_at)
+            else:
+                raw_reply = await call_gemini_raw(messages_text)
+                parsed_reply = try_parse_json_like(raw_reply)
 
-            await manager.send_personal_message(json.dumps(parsed_reply, ensure_ascii=False, indent=2), websocket)
-            context.append({"role":"assistant","text":raw_reply})
+                if parsed_reply is None:
+                    parsed_reply = empty_roadmap()
 
-            if len(context) > 20:
-                context = context[-20:]
+                await manager.send_personal_message(json.dumps(parsed_reply, ensure_ascii=False, indent=2), websocket)
+                bizbot_ttfb.add(time.perf_counter() - received_at)
+            session_store.append(session, "assistant", compact_reply(raw_reply, try_parse_json_like(raw_reply)))
+            await session_store.persist(session)
 
     except WebSocketDisconnect:
         manager.disconnect(websocket)
@@ -208,6 +411,15 @@ Be practical and concise for Bangladesh startups.
         except:
             pass
         manager.disconnect(websocket)
+    finally:
+        session_store.release(session.id)
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "cache": {c.namespace: c.metrics() for c in (gemini_cache, places_cache, idea_cache)},
+        "bizbot": {"ttfb": bizbot_ttfb.summary(), "connections": len(manager.active_connections), **session_store.stats()},
+    }
 
 @app.get("/")
 async def root():
@@ -0,0 +1,172 @@
+# response_cache.py
+"""
+Response cache for the co-pilot's upstream calls (Gemini and Google Places).
+
+- keys: hashes of normalized inputs (Places) or of the final prompt (Gemini)
+- TTL per entry and size-bounded LRU eviction
+- optional persistence to a SQLite file, so restarts and workers share a warm cache
+- optional near-duplicate lookup: entries may carry a short text ("tea stall")
+  that is embedded as hashed character trigrams, and a group that must match
+  exactly ("mirpur 10 dhaka"); a lookup returns the most similar entry of the
+  same group above a cosine threshold. Fields that change the answer but look
+  alike as strings (locations) belong in the group, not the text
+- metrics: hits, misses, near-duplicate hits and the upstream time saved
+"""
+import hashlib
+import json
+import math
+import re
+import sqlite3
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+EMBEDDING_DIM = 512
+
+def normalize(text: str) -> str:
+    """Case, accents/width, punctuation and whitespace insensitive form of user input."""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+def make_key(*parts: Any) -> str:
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def embed(text: str) -> Dict[int, float]:
+    """Sparse, L2-normalized hashed character-trigram vector; cheap and local."""
+    padded = f"  {normalize(text)}  "
+    counts: Dict[int, float] = {}
+    for i in range(len(padded) - 2):
+        bucket = int.from_bytes(hashlib.blake2b(padded[i:i + 3].encode(), digest_size=4).digest(), "little") % EMBEDDING_DIM
+        counts[bucket] = counts.get(bucket, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+    return {k: v / norm for k, v in counts.items()}
+
+def cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+class CacheEntry:
+    __slots__ = ("value", "expires_at", "cost", "text", "group", "embedding")
+
+    def __init__(self, value: Any, expires_at: float, cost: float, text: Optional[str] = None, group: Optional[str] = None):
+        self.value = value
+        self.expires_at = expires_at
+        self.cost = cost
+        self.text = text
+        self.group = group
+        self.embedding = embed(text) if text else None
+
+class SQLiteStore:
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, cost REAL NOT NULL, text TEXT, grp TEXT, "
+            "PRIMARY KEY (namespace, key))"
+        )
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(response_cache)")}
+        if "grp" not in columns:
+            # files written before groups existed: their near-duplicate texts mixed
+            # business and location, so drop those rather than match across locations
+            self.conn.execute("ALTER TABLE response_cache ADD COLUMN grp TEXT")
+            self.conn.execute("DELETE FROM response_cache WHERE text IS NOT NULL")
+        self.conn.commit()
+
+    def load(self, namespace: str, now: float) -> List[Tuple[str, Any, float, float, Optional[str], Optional[str]]]:
+        self.conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+        self.conn.commit()
+        rows = self.conn.execute(
+            "SELECT key, value, expires_at, cost, text, grp FROM response_cache WHERE namespace = ? ORDER BY expires_at",
+            (namespace,),
+        ).fetchall()
+        return [(key, json.loads(value), expires_at, cost, text, grp) for key, value, expires_at, cost, text, grp in rows]
+
+    def put(self, namespace: str, key: str, entry: CacheEntry) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO response_cache (namespace, key, value, expires_at, cost, text, grp) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (namespace, key, json.dumps(entry.value, ensure_ascii=False), entry.expires_at, entry.cost, entry.text, entry.group),
+        )
+        self.conn.commit()
+
+    def delete(self, namespace: str, key: str) -> None:
+        self.conn.execute("DELETE FROM response_cache WHERE namespace = ? AND key = ?", (namespace, key))
+        self.conn.commit()
+
+class ResponseCache:
+    def __init__(self, namespace: str, max_entries: int = 2048, ttl: float = 86400.0, store: Optional[SQLiteStore] = None):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.store = store
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "near_hits": 0, "saved_seconds": 0.0}
+        if store is not None:
+            for key, value, expires_at, cost, text, group in store.load(namespace, time.time())[-max_entries:]:
+                self._entries[key] = CacheEntry(value, expires_at, cost, text, group)
+
+    def _hit(self, key: str, entry: CacheEntry, stat: str) -> Any:
+        self._entries.move_to_end(key)
+        self.stats[stat] += 1
+        self.stats["saved_seconds"] += entry.cost
+        return entry.value
+
+    def _expire(self, key: str) -> None:
+        del self._entries[key]
+        if self.store is not None:
+            self.store.delete(self.namespace, key)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= time.time():
+            self._expire(key)
+            entry = None
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        return self._hit(key, entry, "hits")
+
+    def nearest(self, text: str, threshold: float, group: Optional[str] = None) -> Optional[Tuple[Any, float]]:
+        """
+        Most similar live entry of the same `group` whose text scores at least
+        `threshold`, as (value, score).
+        """
+        query = embed(text)
+        now = time.time()
+        best_key, best_score = None, threshold
+        for key, entry in self._entries.items():
+            if entry.embedding is None or entry.group != group or entry.expires_at <= now:
+                continue
+            score = cosine(query, entry.embedding)
+            if score >= best_score:
+                best_key, best_score = key, score
+        if best_key is None:
+            self.stats["misses"] += 1
+            return None
+        return self._hit(best_key, self._entries[best_key], "near_hits"), best_score
+
+    def put(self, key: str, value: Any, cost: float = 0.0, text: Optional[str] = None, group: Optional[str] = None) -> None:
+        entry = CacheEntry(value, time.time() + self.ttl, cost, text, group)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            old_key, _ = self._entries.popitem(last=False)
+            if self.store is not None:
+                self.store.delete(self.namespace, old_key)
+        if self.store is not None:
+            self.store.put(self.namespace, key, entry)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def metrics(self) -> Dict[str, float]:
+        lookups = self.stats["hits"] + self.stats["near_hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "hit_rate": (self.stats["hits"] + self.stats["near_hits"]) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,149 @@
+# sessions.py
+"""
+Bounded-memory conversation store for /ws/bizbot.
+
+- Message and Session use __slots__; assistant replies are stored minified
+- each session keeps at most `token_budget` (estimated) tokens of recent turns;
+  older turns are folded into a rolling extractive summary capped at
+  `summary_chars`, so memory per session is bounded however long it runs
+- sessions have ids and can be resumed after a reconnect; with a SQLite path
+  persist() writes them to disk from a worker thread, so any worker sharing
+  the file can resume them, and idle sessions only live in memory up to
+  `max_in_memory` (LRU)
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting
+    return len(text) // 4 + 1
+
+class Message:
+    __slots__ = ("role", "text", "tokens")
+
+    def __init__(self, role: str, text: str):
+        self.role = role
+        self.text = text
+        self.tokens = estimate_tokens(text)
+
+class Session:
+    __slots__ = ("id", "messages", "summary", "tokens", "updated_at")
+
+    def __init__(self, session_id: str, messages: Optional[List[Message]] = None, summary: str = ""):
+        self.id = session_id
+        self.messages = messages or []
+        self.summary = summary
+        self.tokens = sum(m.tokens for m in self.messages)
+        self.updated_at = time.time()
+
+    def to_json(self) -> str:
+        return json.dumps({"summary": self.summary, "messages": [[m.role, m.text] for m in self.messages]}, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, session_id: str, raw: str) -> "Session":
+        data = json.loads(raw)
+        return cls(session_id, [Message(role, text) for role, text in data.get("messages", [])], data.get("summary", ""))
+
+def compact_reply(raw_reply: str, parsed: Optional[dict]) -> str:
+    """Assistant turns are kept as minified JSON instead of the raw model output."""
+    if parsed is None:
+        return " ".join(raw_reply.split())
+    return json.dumps(parsed, ensure_ascii=False, separators=(",", ":"))
+
+def summarize_turn(message: Message, limit: int = 160) -> str:
+    text = " ".join(message.text.split())
+    if len(text) > limit:
+        text = text[:limit - 3] + "..."
+    return f"{message.role}: {text}"
+
+class SessionStore:
+    def __init__(self, path: str = "", token_budget: int = 2000, summary_chars: int = 1200, max_in_memory: int = 1000):
+        self.token_budget = token_budget
+        self.summary_chars = summary_chars
+        self.max_in_memory = max_in_memory
+        self._live: "OrderedDict[str, Session]" = OrderedDict()
+        self._db = None
+        self._db_lock = threading.Lock()
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS bizbot_session (id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)")
+            self._db.commit()
+
+    def _remember(self, session: Session) -> Session:
+        self._live[session.id] = session
+        self._live.move_to_end(session.id)
+        while len(self._live) > self.max_in_memory:
+            self._live.popitem(last=False)
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        session = self._live.get(session_id)
+        if session is not None:
+            self._live.move_to_end(session_id)
+            return session
+        if self._db is not None:
+            row = self._db.execute("SELECT data FROM bizbot_session WHERE id = ?", (session_id,)).fetchone()
+            if row is not None:
+                return self._remember(Session.from_json(session_id, row[0]))
+        return None
+
+    def open(self, session_id: Optional[str] = None) -> Session:
+        """Resumes `session_id` if known, otherwise starts a new session."""
+        session = self.get(session_id) if session_id else None
+        return session or self._remember(Session(uuid.uuid4().hex))
+
+    def append(self, session: Session, role: str, text: str) -> None:
+        """Adds a turn in memory; call persist() (or save()) to write it out."""
+        message = Message(role, text)
+        session.messages.append(message)
+        session.tokens += message.tokens
+        # keep the latest turn even if it alone exceeds the budget
+        while session.tokens > self.token_budget and len(session.messages) > 1:
+            old = session.messages.pop(0)
+            session.tokens -= old.tokens
+            session.summary = (session.summary + "\n" + summarize_turn(old)).strip()[-self.summary_chars:]
+        session.updated_at = time.time()
+        self._remember(session)
+
+    def _write(self, session_id: str, data: str, updated_at: float) -> None:
+        # writes may land out of order from the thread pool: never go back in time
+        with self._db_lock:
+            self._db.execute(
+                "INSERT INTO bizbot_session VALUES (?, ?, ?) ON CONFLICT(id) DO UPDATE SET data = excluded.data, "
+                "updated_at = excluded.updated_at WHERE excluded.updated_at >= bizbot_session.updated_at",
+                (session_id, data, updated_at),
+            )
+            self._db.commit()
+
+    def save(self, session: Session) -> None:
+        self._remember(session)
+        if self._db is not None:
+            self._write(session.id, session.to_json(), session.updated_at)
+
+    async def persist(self, session: Session) -> None:
+        """save() for the event loop: the snapshot is taken here, the write runs in a thread."""
+        self._remember(session)
+        if self._db is not None:
+            await asyncio.to_thread(self._write, session.id, session.to_json(), session.updated_at)
+
+    def release(self, session_id: str) -> None:
+        """Drops an idle session from memory; it stays resumable from disk."""
+        if self._db is not None:
+            self._live.pop(session_id, None)
+
+    def prompt_context(self, session: Session, last: int = 6) -> str:
+        lines = []
+        if session.summary:
+            lines.append(f"EARLIER CONVERSATION (summary):\n{session.summary}")
+        for m in session.messages[-last:]:
+            lines.append(f"{m.role.upper()}: {m.text}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def stats(self) -> Dict[str, int]:
+        return {"live_sessions": len(self._live), "live_tokens": sum(s.tokens for s in self._live.values())}
@@ -0,0 +1,87 @@
+# streaming.py
+"""
+Helpers for streaming Gemini replies over /ws/bizbot.
+
+- SectionParser: incremental parser for a streamed top-level JSON object; it
+  emits each (key, value) pair as soon as the value is complete, skipping any
+  text or ``` fences around the object
+- LatencyStats: bounded window of latency samples (e.g. time to first byte)
+"""
+import json
+from collections import deque
+from typing import Any, Dict, List, Tuple
+
+class SectionParser:
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key_start = None
+        self._key = None
+        self._value_start = None
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Adds text; returns the sections completed by it, in order."""
+        self._buf += chunk
+        sections = []
+        buf = self._buf
+        while self._pos < len(buf) and not self.done:
+            i, ch = self._pos, buf[self._pos]
+            self._pos += 1
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._key_start is not None and self._value_start is None:
+                        self._key = json.loads(buf[self._key_start:i + 1])
+                        self._key_start = None
+                continue
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                continue
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._value_start is None and self._key is None:
+                    self._key_start = i
+                continue
+            if self._depth == 1 and ch == ":" and self._key is not None and self._value_start is None:
+                self._value_start = i + 1
+                continue
+            if ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+            if self._depth == 0 or (self._depth == 1 and ch == ","):
+                if self._value_start is not None:
+                    end = i if ch in ",}" else i + 1
+                    try:
+                        sections.append((self._key, json.loads(buf[self._value_start:end])))
+                    except ValueError:
+                        pass
+                self._key, self._value_start = None, None
+                if self._depth == 0:
+                    self.done = True
+        return sections
+
+class LatencyStats:
+    def __init__(self, window: int = 1000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self.count += 1
+
+    def summary(self) -> Dict[str, float]:
+        if not self.samples:
+            return {"count": self.count}
+        ordered = sorted(self.samples)
+        pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+        return {"count": self.count, "p50_ms": pick(0.5), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
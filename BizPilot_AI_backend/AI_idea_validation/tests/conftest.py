@@ -0,0 +1,7 @@
+# tests/conftest.py
+import os
+
+# main.py refuses to import without a Gemini key; never let tests use the real
+# keys from .env (load_dotenv does not override variables that are already set)
+os.environ["GEMINI_API_KEY"] = "test-key"
+os.environ["GOOGLE_PLACES_API_KEY"] = ""
@@ -0,0 +1,64 @@
+# tests/test_idea_validation.py
+import asyncio
+import pytest
+import main
+
+class Upstreams:
+    """Stubs for the Places lookup and the Gemini call with fixed latencies."""
+    def __init__(self, places_delay: float, gemini_delay: float):
+        self.places_delay = places_delay
+        self.gemini_delay = gemini_delay
+        self.prompts = []
+        self.places_cancelled = False
+
+    async def places(self, business_type, location, limit=3):
+        try:
+            await asyncio.sleep(self.places_delay)
+        except asyncio.CancelledError:
+            self.places_cancelled = True
+            raise
+        return ["Shop A", "Shop B"]
+
+    async def gemini(self, prompt, model="gemini-2.0-flash"):
+        self.prompts.append(prompt)
+        await asyncio.sleep(self.gemini_delay)
+        return '{"ai_score": 70, "main_competitors": ["Guessed"]}'
+
+@pytest.fixture
+def upstreams(monkeypatch):
+    def install(places_delay, gemini_delay):
+        stubs = Upstreams(places_delay, gemini_delay)
+        monkeypatch.setattr(main, "PLACES_DEADLINE_SECONDS", 0.05)
+        monkeypatch.setattr(main, "fetch_competitors_or_empty", stubs.places)
+        monkeypatch.setattr(main, "call_gemini_cached", stubs.gemini)
+        return stubs
+    return install
+
+def validate():
+    return asyncio.run(main.validate_idea_raw("Pharmacy", "Mirpur 10, Dhaka"))
+
+def test_places_within_deadline_goes_into_the_prompt(upstreams):
+    stubs = upstreams(places_delay=0.0, gemini_delay=0.0)
+    raw, competitors, override = validate()
+    assert competitors == ["Shop A", "Shop B"] and override is False
+    assert len(stubs.prompts) == 1 and "Known competitors: Shop A, Shop B" in stubs.prompts[0]
+
+def test_gemini_first_cancels_places(upstreams):
+    stubs = upstreams(places_delay=1.0, gemini_delay=0.1)
+    raw, competitors, override = validate()
+    assert competitors == [] and override is False
+    assert stubs.places_cancelled
+    assert len(stubs.prompts) == 1 and "Lookup still pending" in stubs.prompts[0]
+
+def test_places_after_deadline_but_before_gemini_overrides(upstreams):
+    stubs = upstreams(places_delay=0.1, gemini_delay=0.3)
+    raw, competitors, override = validate()
+    assert competitors == ["Shop A", "Shop B"] and override is True
+    assert len(stubs.prompts) == 1 and "Lookup still pending" in stubs.prompts[0]
+    assert raw == '{"ai_score": 70, "main_competitors": ["Guessed"]}'
+
+def test_override_replaces_the_models_competitors(upstreams, monkeypatch):
+    upstreams(places_delay=0.1, gemini_delay=0.3)
+    monkeypatch.setattr(main, "IDEA_CACHE_SEMANTIC", False)
+    response = asyncio.run(main.idea_validation(business_type="Pharmacy", location="Mirpur 10, Dhaka"))
+    assert response["main_competitors"] == ["Shop A", "Shop B"]
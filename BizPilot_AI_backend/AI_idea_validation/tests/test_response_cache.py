@@ -0,0 +1,94 @@
+# tests/test_response_cache.py
+import asyncio
+import sqlite3
+import pytest
+import response_cache
+from response_cache import ResponseCache, SQLiteStore, cosine, embed, make_key, normalize
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    return now
+
+def test_normalize():
+    assert normalize("  Tea   STALL!! ") == "tea stall"
+    assert normalize("Ｃａｆé, Dhaka-1207") == "café dhaka 1207"
+    assert normalize(None) == ""
+    assert make_key(normalize("Tea Stall"), "dhaka") == make_key("tea stall", "dhaka")
+
+def test_ttl_expiry(clock):
+    cache = ResponseCache("t", ttl=60)
+    cache.put("k", {"v": 1}, cost=2.0)
+    clock[0] += 59
+    assert cache.get("k") == {"v": 1}
+    clock[0] += 1
+    assert cache.get("k") is None
+    assert len(cache) == 0
+    assert cache.metrics()["hits"] == 1 and cache.metrics()["misses"] == 1 and cache.metrics()["saved_seconds"] == 2.0
+
+def test_lru_eviction(clock):
+    cache = ResponseCache("t", max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+def test_nearest_matches_text_within_group_only(clock):
+    cache = ResponseCache("idea", ttl=60)
+    cache.put(make_key("pharmacy", "mirpur 10 dhaka"), "mirpur 10", text="pharmacy", group="mirpur 10 dhaka")
+    # these locations score above the threshold as strings, so they must never be compared
+    assert cosine(embed("pharmacy | mirpur 10 dhaka"), embed("pharmacy | mirpur 1 dhaka")) > 0.85
+    assert cache.nearest("pharmacy", 0.85, group="mirpur 1 dhaka") is None
+    value, score = cache.nearest("pharmacy shop", 0.5, group="mirpur 10 dhaka")
+    assert value == "mirpur 10" and 0.5 <= score < 1.0
+    assert cache.nearest("bakery", 0.85, group="mirpur 10 dhaka") is None
+    clock[0] += 61
+    assert cache.nearest("pharmacy", 0.85, group="mirpur 10 dhaka") is None
+    assert cache.metrics()["near_hits"] == 1
+
+def test_sqlite_store_round_trip(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache("idea", ttl=60, store=SQLiteStore(path))
+    cache.put("k", {"raw": "x"}, cost=1.5, text="pharmacy", group="mirpur 10 dhaka")
+    cache.put("gone", {"raw": "y"})
+    clock[0] += 30
+    reloaded = ResponseCache("idea", ttl=60, store=SQLiteStore(path))
+    assert reloaded.get("k") == {"raw": "x"}
+    assert reloaded.nearest("pharmacy", 0.85, group="mirpur 10 dhaka")[0] == {"raw": "x"}
+    assert ResponseCache("other", store=SQLiteStore(path)).get("k") is None
+
+def test_sqlite_store_upgrades_old_files(tmp_path, clock):
+    path = str(tmp_path / "old.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE response_cache (namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                 "expires_at REAL NOT NULL, cost REAL NOT NULL, text TEXT, PRIMARY KEY (namespace, key))")
+    conn.execute("INSERT INTO response_cache VALUES ('idea', 'a', '1', 2000000, 0, 'pharmacy | mirpur 10 dhaka')")
+    conn.execute("INSERT INTO response_cache VALUES ('gemini', 'b', '2', 2000000, 0, NULL)")
+    conn.commit()
+    conn.close()
+    store = SQLiteStore(path)
+    assert ResponseCache("idea", store=store).get("a") is None
+    assert ResponseCache("gemini", store=store).get("b") == 2
+
+def test_idea_cache_normalizes_lookups_but_not_upstream_text(monkeypatch):
+    import main
+    calls = []
+
+    async def validate_idea_raw(business_type, location):
+        calls.append((business_type, location))
+        return '{"ai_score": 70}', [], False
+
+    monkeypatch.setattr(main, "validate_idea_raw", validate_idea_raw)
+    monkeypatch.setattr(main, "IDEA_CACHE_SEMANTIC", True)
+    monkeypatch.setattr(main, "idea_cache", ResponseCache("idea"))
+
+    async def ask(business_type, location):
+        return await main.validate_idea_cached(business_type, location)
+
+    asyncio.run(ask("C++ Tutoring", "Mirpur 10, Dhaka"))
+    asyncio.run(ask("c++  tutoring", "mirpur 10 dhaka"))
+    asyncio.run(ask("C++ Tutoring", "Mirpur 1, Dhaka"))
+    assert calls == [("C++ Tutoring", "Mirpur 10, Dhaka"), ("C++ Tutoring", "Mirpur 1, Dhaka")]
@@ -0,0 +1,96 @@
+# tests/test_sessions.py
+import asyncio
+import threading
+from sessions import Message, Session, SessionStore, compact_reply, estimate_tokens
+
+def turn(i):
+    return f"question {i} about opening a tea stall in Dhaka with a small budget"
+
+def test_budget_folds_oldest_turns_into_summary():
+    store = SessionStore(token_budget=60, summary_chars=1000)
+    session = store.open()
+    for i in range(6):
+        store.append(session, "user", turn(i))
+    assert session.tokens <= 60
+    assert session.tokens == sum(m.tokens for m in session.messages)
+    assert session.messages[-1].text == turn(5)
+    folded = 6 - len(session.messages)
+    assert folded > 0
+    assert session.summary.splitlines() == [f"user: {turn(i)}" for i in range(folded)]
+    context = store.prompt_context(session)
+    assert context.startswith("EARLIER CONVERSATION (summary):\nuser: question 0")
+    assert context.endswith(f"USER: {turn(5)}\n")
+
+def test_summary_is_capped_and_latest_turn_always_kept():
+    store = SessionStore(token_budget=10, summary_chars=200)
+    session = store.open()
+    for i in range(50):
+        store.append(session, "assistant", "x" * 500)
+    assert len(session.messages) == 1 and session.messages[0].tokens > 10
+    assert len(session.summary) <= 200
+    assert session.summary.endswith("...")
+
+def test_resume_after_release(tmp_path):
+    path = str(tmp_path / "sessions.sqlite")
+    store = SessionStore(path, token_budget=60)
+    session = store.open()
+    for i in range(4):
+        store.append(session, "user", turn(i))
+    asyncio.run(store.persist(session))
+    store.release(session.id)
+    assert store.stats()["live_sessions"] == 0
+    resumed = store.open(session.id)
+    assert resumed is not session and resumed.id == session.id
+    assert (resumed.summary, [m.text for m in resumed.messages], resumed.tokens) == (session.summary, [m.text for m in session.messages], session.tokens)
+    # another worker sharing the file
+    other = SessionStore(path).open(session.id)
+    assert [m.text for m in other.messages] == [m.text for m in session.messages]
+
+def test_without_a_path_release_keeps_the_session_in_memory():
+    store = SessionStore()
+    session = store.open()
+    store.append(session, "user", "hi")
+    store.release(session.id)
+    assert store.open(session.id) is session
+
+def test_unknown_ids_start_a_new_session(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.sqlite"))
+    for requested in (None, "", "new", "does-not-exist"):
+        session = store.open(requested)
+        assert session.id != requested and session.messages == [] and session.summary == ""
+    assert len({store.open("x").id for _ in range(3)}) == 3
+
+def test_idle_sessions_are_evicted_lru(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.sqlite"), max_in_memory=2)
+    first, second = store.open(), store.open()
+    store.append(first, "user", "a")
+    store.append(second, "user", "b")
+    store.save(second)
+    store.get(first.id)
+    third = store.open()
+    assert store.stats()["live_sessions"] == 2
+    assert store._live.keys() == {first.id, third.id}
+    assert [m.text for m in store.open(second.id).messages] == ["b"]
+
+def test_persist_writes_off_the_event_loop(tmp_path):
+    path = str(tmp_path / "sessions.sqlite")
+    store = SessionStore(path)
+    session = store.open()
+    store.append(session, "user", "hi")
+    writers = []
+    write = store._write
+    store._write = lambda *args: (writers.append(threading.get_ident()), write(*args))
+    asyncio.run(store.persist(session))
+    assert writers and writers[0] != threading.get_ident()
+    assert [m.text for m in SessionStore(path).open(session.id).messages] == ["hi"]
+    # a write that finishes late must not roll the session back
+    stale = Session(session.id)
+    stale.updated_at = session.updated_at - 1
+    write(stale.id, stale.to_json(), stale.updated_at)
+    assert [m.text for m in SessionStore(path).open(session.id).messages] == ["hi"]
+
+def test_compact_reply_and_slots():
+    assert compact_reply('```json\n{"a": [1, 2]}\n```', {"a": [1, 2]}) == '{"a":[1,2]}'
+    assert compact_reply("  plain\n\n reply ", None) == "plain reply"
+    message = Message("user", "hello there")
+    assert not hasattr(message, "__dict__") and message.tokens == estimate_tokens("hello there")
@@ -0,0 +1,68 @@
+# tests/test_streaming.py
+import json
+import random
+import pytest
+from streaming import LatencyStats, SectionParser
+
+REPLY = {
+    "registration_steps": ["Trade license, \"city\" corporation", "TIN {online}"],
+    "tax_steps": [],
+    "notes": "path C:\\bizpilot\\ and a tab\t, comma, brace } and bracket ]",
+    "market": {"segments": [{"name": "students", "share": 0.4}, {"name": "offices", "share": None}], "size": 12000},
+    "ok": True,
+}
+
+def feed_all(parser, text, sizes):
+    sections, pos = [], 0
+    for size in sizes:
+        sections.extend(parser.feed(text[pos:pos + size]))
+        pos += size
+    sections.extend(parser.feed(text[pos:]))
+    return sections
+
+def test_whole_object_in_one_chunk():
+    assert SectionParser().feed(json.dumps(REPLY)) == list(REPLY.items())
+
+@pytest.mark.parametrize("seed", range(20))
+def test_any_chunk_boundaries(seed):
+    text = json.dumps(REPLY, indent=2)
+    rng = random.Random(seed)
+    sizes = [rng.randint(1, 7) for _ in range(len(text))]
+    assert feed_all(SectionParser(), text, sizes) == list(REPLY.items())
+
+def test_one_character_at_a_time_emits_each_section_when_complete():
+    text = json.dumps(REPLY)
+    parser, emitted_at = SectionParser(), {}
+    for i, ch in enumerate(text):
+        for key, _ in parser.feed(ch):
+            emitted_at[key] = i
+    assert list(emitted_at) == list(REPLY)
+    # a section is emitted by the comma (or closing brace) right after its value
+    assert text[emitted_at["registration_steps"]] == ","
+    assert emitted_at["ok"] == len(text) - 1
+
+def test_split_inside_escape_sequence():
+    parser = SectionParser()
+    assert parser.feed('{"a": "quote \\') == []
+    assert parser.feed('" still in string, }", "b"') == [("a", 'quote " still in string, }')]
+    assert parser.feed(": 1}") == [("b", 1)]
+
+def test_fenced_output_with_surrounding_text():
+    text = 'Sure! Here is your roadmap:\n```json\n' + json.dumps(REPLY, indent=2) + '\n```\nGood luck {not json}'
+    parser = SectionParser()
+    assert feed_all(parser, text, [5] * (len(text) // 5)) == list(REPLY.items())
+    assert parser.done
+    assert parser.feed('{"late": 1}') == []
+
+def test_invalid_value_is_skipped():
+    assert SectionParser().feed('{"a": nope, "b": [1, 2]}') == [("b", [1, 2])]
+
+def test_latency_stats():
+    stats = LatencyStats(window=100)
+    assert stats.summary() == {"count": 0}
+    for ms in range(1, 201):
+        stats.add(ms / 1000)
+    summary = stats.summary()
+    assert summary["count"] == 200
+    # only the last 100 samples (101..200 ms) are kept
+    assert summary["p50_ms"] == pytest.approx(151) and summary["p99_ms"] == pytest.approx(200)
@@ -0,0 +1,80 @@
+# tests/test_upstream.py
+import asyncio
+import json
+import httpx
+import pytest
+import main
+
+GEMINI_REPLY = {"candidates": [{"content": {"parts": [{"text": '{"ai_score": 70}'}]}}]}
+STREAM_EVENTS = "".join(
+    "data: " + json.dumps({"candidates": [{"content": {"parts": [{"text": text}]}}]}) + "\n\n" for text in ('{"a"', ": 1}")
+)
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Routes the shared client to an in-process mock; records clients and requests."""
+    seen = {"clients": 0, "requests": []}
+
+    def handler(request):
+        seen["requests"].append(request)
+        if request.url.path.endswith(":generateContent"):
+            return httpx.Response(200, json=GEMINI_REPLY)
+        if request.url.path.endswith(":streamGenerateContent"):
+            return httpx.Response(200, text=STREAM_EVENTS, headers={"content-type": "text/event-stream"})
+        if request.url.path.endswith("/textsearch/json"):
+            return httpx.Response(200, json={"results": [{"name": "Shop A"}, {"name": "Shop B"}, {}]})
+        return httpx.Response(404)
+
+    def create():
+        seen["clients"] += 1
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    monkeypatch.setattr(main, "create_http_client", create)
+    monkeypatch.setattr(main, "http_client", None)
+    monkeypatch.setattr(main, "GOOGLE_PLACES_API_KEY", "places-key")
+    monkeypatch.setattr(main, "gemini_cache", main.ResponseCache("gemini"))
+    monkeypatch.setattr(main, "places_cache", main.ResponseCache("places"))
+    return seen
+
+def run(coro):
+    async def scoped():
+        try:
+            return await coro
+        finally:
+            await main.close_http_client()
+    return asyncio.run(scoped())
+
+def test_calls_outside_the_lifespan_share_one_client(upstream):
+    async def calls():
+        replies = await asyncio.gather(*(main.call_gemini_raw(f"prompt {i}") for i in range(5)))
+        competitors = await main.fetch_competitors_google_places("pharmacy", "mirpur", limit=5)
+        return replies, competitors, main.http_client
+
+    replies, competitors, client = run(calls())
+    assert replies == ['{"ai_score": 70}'] * 5
+    assert competitors == ["Shop A", "Shop B"]
+    assert upstream["clients"] == 1 and len(upstream["requests"]) == 6
+    assert client.is_closed and main.http_client is None
+    assert upstream["requests"][0].url.params["key"] == "test-key"
+
+def test_lifespan_owns_the_client(upstream):
+    async def lifespan():
+        async with main.lifespan(main.app):
+            client = main.get_http_client()
+            await main.call_gemini_raw("a")
+            await main.call_gemini_raw("b")
+            assert main.get_http_client() is client
+        return client
+
+    client = asyncio.run(lifespan())
+    assert upstream["clients"] == 1 and client.is_closed and main.http_client is None
+
+def test_stream_gemini_uses_the_shared_client(upstream):
+    async def collect():
+        first = [chunk async for chunk in main.stream_gemini("hi")]
+        second = [chunk async for chunk in main.stream_gemini("again")]
+        return first, second
+
+    first, second = run(collect())
+    assert first == second == ['{"a"', ": 1}"]
+    assert upstream["clients"] == 1 and len(upstream["requests"]) == 2
@@ -7,8 +7,45 @@ load_dotenv()
 class Settings:
     SECRET_KEY: str = os.getenv("SECRET_KEY", "dev-secret")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))
+    REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./bizpilot.db")
     CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:5173").split(",")
-    REMINDER_CHECK_INTERVAL_SECONDS: int = int(os.getenv("REMINDER_CHECK_INTERVAL_SECONDS", "30"))
+    DASHBOARD_CACHE_TTL_SECONDS: int = int(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "300"))
+    DASHBOARD_CACHE_MAX_ENTRIES: int = int(os.getenv("DASHBOARD_CACHE_MAX_ENTRIES", "10000"))
+    FORECAST_STORE_PATH: str = os.getenv("FORECAST_STORE_PATH", "")
+    FORECAST_STORE_MAX_ENTRIES: int = int(os.getenv("FORECAST_STORE_MAX_ENTRIES", "1024"))
+    TAX_BATCH_CHUNK_SIZE: int = int(os.getenv("TAX_BATCH_CHUNK_SIZE", "1000"))
+    TAX_MONTH_END_DAY: int = int(os.getenv("TAX_MONTH_END_DAY", "1"))
+    TAX_MONTH_END_HOUR: int = int(os.getenv("TAX_MONTH_END_HOUR", "2"))
+    REMINDER_LEASE_SECONDS: int = int(os.getenv("REMINDER_LEASE_SECONDS", "60"))
+    REMINDER_MAX_ATTEMPTS: int = int(os.getenv("REMINDER_MAX_ATTEMPTS", "5"))
+    REMINDER_RETRY_BASE_SECONDS: int = int(os.getenv("REMINDER_RETRY_BASE_SECONDS", "30"))
+    REMINDER_CLAIM_BATCH_SIZE: int = int(os.getenv("REMINDER_CLAIM_BATCH_SIZE", "100"))
+    REMINDER_SWEEP_SECONDS: int = int(os.getenv("REMINDER_SWEEP_SECONDS", "60"))
+    # empty SMTP_HOST: notifications are only logged
+    SMTP_HOST: str = os.getenv("SMTP_HOST", "")
+    SMTP_PORT: int = int(os.getenv("SMTP_PORT", "587"))
+    SMTP_USER: str = os.getenv("SMTP_USER", "")
+    SMTP_PASSWORD: str = os.getenv("SMTP_PASSWORD", "")
+    SMTP_TLS: bool = os.getenv("SMTP_TLS", "true").lower() in ("1", "true", "yes")
+    SMTP_FROM: str = os.getenv("SMTP_FROM", "BizPilot AI <no-reply@bizpilot.local>")
+    NOTIFY_WORKERS: int = int(os.getenv("NOTIFY_WORKERS", "2"))
+    NOTIFY_BATCH_SIZE: int = int(os.getenv("NOTIFY_BATCH_SIZE", "50"))
+    NOTIFY_QUEUE_SIZE: int = int(os.getenv("NOTIFY_QUEUE_SIZE", "10000"))
+    NOTIFY_PER_USER_PER_MINUTE: float = float(os.getenv("NOTIFY_PER_USER_PER_MINUTE", "6"))
+    NOTIFY_PER_USER_BURST: int = int(os.getenv("NOTIFY_PER_USER_BURST", "10"))
+    # "bcrypt" or "argon2" (argon2id, needs argon2-cffi); older hashes are upgraded on login
+    PASSWORD_SCHEME: str = os.getenv("PASSWORD_SCHEME", "bcrypt")
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    # 0 hashes in a thread instead of a process pool
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+    AUTH_TOKEN_CACHE_SIZE: int = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+    AUTH_TOKEN_CACHE_TTL_SECONDS: int = int(os.getenv("AUTH_TOKEN_CACHE_TTL_SECONDS", "300"))
+    REVOCATION_BLOOM_CAPACITY: int = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000"))
+    REVOCATION_SYNC_SECONDS: float = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+    # incremental syncs re-read revocations this far back (slow commits, clock skew between nodes)
+    REVOCATION_SYNC_MARGIN_SECONDS: float = float(os.getenv("REVOCATION_SYNC_MARGIN_SECONDS", "60"))
+    REVOCATION_PRUNE_SECONDS: float = float(os.getenv("REVOCATION_PRUNE_SECONDS", "3600"))
 
 settings = Settings()
@@ -1,11 +1,13 @@
 # app/database.py
 from sqlmodel import SQLModel, create_engine, Session
 from .core import settings
+from .migrations import upgrade
 
 engine = create_engine(settings.DATABASE_URL, echo=False, connect_args={"check_same_thread": False})
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
+    upgrade(engine)
 
 def get_session():
     with Session(engine) as session:
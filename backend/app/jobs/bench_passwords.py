@@ -0,0 +1,42 @@
+# app/jobs/bench_passwords.py
+"""
+Login throughput benchmark: concurrent password verifications per second
+through the hashing process pool, for 1..N worker processes.
+Hashes use the configured scheme and cost (PASSWORD_SCHEME, BCRYPT_ROUNDS), so
+set those in the environment to compare settings; workers 0 is the thread fallback.
+Usage: BCRYPT_ROUNDS=12 python -m app.jobs.bench_passwords [--logins 200] [--max-workers 4]
+"""
+import argparse
+import asyncio
+import os
+import time
+from ..core import settings
+from ..utils import security
+
+async def measure(workers: int, logins: int, stored_hash: str) -> float:
+    settings.PASSWORD_HASH_WORKERS = workers
+    security.shutdown_password_pool()
+    # warm up: spawn the workers before timing
+    await asyncio.gather(*(security.verify_and_update_async("benchmark-password", stored_hash) for _ in range(max(workers, 1))))
+    start = time.perf_counter()
+    results = await asyncio.gather(*(security.verify_and_update_async("benchmark-password", stored_hash) for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    assert all(valid for valid, _ in results)
+    security.shutdown_password_pool()
+    return logins / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark password verification throughput")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    stored_hash = security.hash_password("benchmark-password")
+    print(f"scheme={security.pwd_context.identify(stored_hash)} bcrypt_rounds={settings.BCRYPT_ROUNDS} cores={os.cpu_count()}")
+    print("workers,logins_per_sec")
+    for workers in range(0, args.max_workers + 1):
+        rate = asyncio.run(measure(workers, args.logins, stored_hash))
+        label = "thread" if workers == 0 else str(workers)
+        print(f"{label},{rate:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# app/jobs/generate_tax.py
+"""
+Month-end tax generation for every user.
+All TaxConfigs for the year are loaded once; taxable income comes from a
+grouped rollup query per chunk of users (in user_id order), amounts are
+computed vectorized and written with executemany. Each chunk commits together
+with its TaxRun checkpoint, so an interrupted run resumes after the last
+committed user, and re-running a finished period is a no-op unless forced.
+Existing records are updated in place, so overlapping runs never duplicate.
+Usage: python -m app.jobs.generate_tax --year 2024 --month 5 [--force] [--chunk-size 1000]
+       python -m app.jobs.generate_tax --year 2024   (every month, one pass)
+"""
+from typing import Dict, Optional
+from datetime import date, datetime, timedelta
+import argparse
+import time
+import numpy as np
+from sqlalchemy import func, update, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+from ..core import settings
+from ..database import engine as default_engine, create_db_and_tables
+from ..models.rollup import MonthlyRollup
+from ..models.tax import TaxRun
+from ..services.cache import invalidate
+from ..services.tax_service import generate_tax_records, load_tax_configs, upsert_tax_records
+
+LEASE = timedelta(minutes=10)
+
+def _income_filter(year: int, month: int):
+    return (MonthlyRollup.year==year, MonthlyRollup.month==month, MonthlyRollup.type=="INCOME")
+
+def _claim_run(session: Session, year: int, month: int, force: bool) -> Optional[TaxRun]:
+    """
+    Get or create the TaxRun and take its lease; None if finished or leased elsewhere.
+    The scheduler fires in every worker at once, so the row may be created
+    concurrently: the loser of the insert re-reads it and goes through the lease check.
+    """
+    stmt = select(TaxRun).where(TaxRun.year==year, TaxRun.month==month)
+    run = session.exec(stmt).first()
+    if run is None:
+        try:
+            run = TaxRun(year=year, month=month)
+            session.add(run)
+            session.commit()
+            session.refresh(run)
+        except IntegrityError:
+            session.rollback()
+            run = session.exec(stmt).one()
+    if run.status == "done" and not force:
+        return None
+    now = datetime.utcnow()
+    claimed = session.execute(
+        update(TaxRun)
+        .where(TaxRun.id==run.id, or_(TaxRun.locked_until == None, TaxRun.locked_until < now))
+        .values(locked_until=now + LEASE)
+    ).rowcount
+    session.commit()
+    if not claimed:
+        return None
+    session.refresh(run)
+    if run.status == "done":
+        # forced re-run starts from the beginning
+        run.status, run.last_user_id, run.users_processed, run.records_written, run.finished_at = "running", 0, 0, 0, None
+        session.add(run)
+        session.commit()
+    return run
+
+def run_month_end(year: int, month: int, chunk_size: int = None, force: bool = False, engine: Engine = None, verbose: bool = True) -> Dict:
+    """
+    returns {"status": "done"|"skipped", "users": n, "records": n, "seconds": s}
+    """
+    chunk_size = chunk_size or settings.TAX_BATCH_CHUNK_SIZE
+    started = time.monotonic()
+    with Session(engine or default_engine) as session:
+        run = _claim_run(session, year, month, force)
+        if run is None:
+            return {"status": "skipped", "users": 0, "records": 0, "seconds": 0.0}
+        configs = load_tax_configs(session, year)
+        total = session.exec(select(func.count(func.distinct(MonthlyRollup.user_id))).where(*_income_filter(year, month))).one()
+        while True:
+            stmt = (
+                select(MonthlyRollup.user_id, func.sum(MonthlyRollup.total))
+                .where(*_income_filter(year, month), MonthlyRollup.user_id > run.last_user_id)
+                .group_by(MonthlyRollup.user_id)
+                .order_by(MonthlyRollup.user_id)
+                .limit(chunk_size)
+            )
+            chunk = session.exec(stmt).all()
+            if not chunk:
+                break
+            periods = [(uid, month) for uid, _ in chunk]
+            taxable = np.array([float(v or 0.0) for _, v in chunk], dtype=float)
+            rows = upsert_tax_records(session, year, periods, taxable, configs)
+            run.last_user_id = chunk[-1][0]
+            run.users_processed += len(chunk)
+            run.records_written += len(rows)
+            run.locked_until = datetime.utcnow() + LEASE
+            session.add(run)
+            session.commit()
+            for uid, _ in chunk:
+                invalidate(uid, ("summary",))
+            if verbose:
+                elapsed = time.monotonic() - started
+                print(f"[TaxRun {year}-{month:02d}] {run.users_processed}/{total} users, {run.records_written} records, {run.users_processed / max(elapsed, 1e-9):.0f} users/s")
+        run.status = "done"
+        run.finished_at = datetime.utcnow()
+        run.locked_until = None
+        session.add(run)
+        session.commit()
+        return {"status": "done", "users": run.users_processed, "records": run.records_written, "seconds": round(time.monotonic() - started, 3)}
+
+def run_previous_month():
+    """Scheduler entry point: close the month that just ended."""
+    last_day = date.today().replace(day=1) - timedelta(days=1)
+    return run_month_end(last_day.year, last_day.month)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate monthly tax records for all users")
+    parser.add_argument("--year", type=int, required=True)
+    parser.add_argument("--month", type=int, help="default: every month of the year in one pass")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="re-run a period that already finished")
+    args = parser.parse_args()
+    create_db_and_tables()
+    if args.month:
+        print(run_month_end(args.year, args.month, args.chunk_size, args.force))
+    else:
+        with Session(default_engine) as session:
+            results = generate_tax_records(session, args.year, range(1, 13))
+        print(f"Generated {len(results)} tax records for {len({r['user_id'] for r in results})} users.")
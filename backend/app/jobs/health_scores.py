@@ -0,0 +1,61 @@
+# app/jobs/health_scores.py
+"""
+Nightly health scores for every user.
+Users are streamed from the DB in chunks; each chunk is scored in a single
+vectorized call from the same inputs /dashboard/summary uses, so results
+match the dashboard exactly. Writes "user_id,score" CSV lines.
+Usage: python -m app.jobs.health_scores [--chunk-size 1000] [--output scores.csv]
+"""
+from typing import Iterator, List, Tuple
+from datetime import date
+import argparse
+import sys
+import numpy as np
+from sqlmodel import Session, select
+from ..database import engine
+from ..models.user import User
+from ..services.aggregation import last_month_starts, monthly_net_by_user, unpaid_tax_by_user
+from ..services.scoring import compute_health_scores, split_net
+
+def iter_user_chunks(session: Session, chunk_size: int) -> Iterator[List[int]]:
+    last_id = 0
+    while True:
+        stmt = select(User.id).where(User.id > last_id).order_by(User.id).limit(chunk_size)
+        ids = list(session.exec(stmt))
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+def score_users(session: Session, user_ids: List[int], today: date) -> List[Tuple[int, int]]:
+    months = last_month_starts(today, 12)
+    monthly = monthly_net_by_user(session, user_ids, months[0])
+    taxes = unpaid_tax_by_user(session, user_ids)
+    net = np.array([[monthly.get((uid, m.year, m.month), 0.0) for m in months] for uid in user_ids], dtype=float)
+    income, expense = split_net(net)
+    tax_due = np.array([taxes.get(uid, 0.0) for uid in user_ids], dtype=float)
+    scores = compute_health_scores(income, expense, tax_due)
+    return list(zip(user_ids, scores.tolist()))
+
+def run(chunk_size: int = 1000, out=sys.stdout, today: date = None) -> int:
+    today = today or date.today()
+    scored = 0
+    with Session(engine) as session:
+        out.write("user_id,score\n")
+        for user_ids in iter_user_chunks(session, chunk_size):
+            for user_id, score in score_users(session, user_ids, today):
+                out.write(f"{user_id},{score}\n")
+            scored += len(user_ids)
+    return scored
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute business health scores for all users")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--output", help="CSV file (default: stdout)")
+    args = parser.parse_args()
+    if args.output:
+        with open(args.output, "w") as f:
+            n = run(args.chunk_size, f)
+    else:
+        n = run(args.chunk_size)
+    print(f"Scored {n} users.", file=sys.stderr)
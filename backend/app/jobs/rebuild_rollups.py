@@ -0,0 +1,16 @@
+# app/jobs/rebuild_rollups.py
+"""
+Rebuild the MonthlyRollup table from existing transactions.
+Usage: python -m app.jobs.rebuild_rollups [user_id]
+"""
+import sys
+from sqlmodel import Session
+from ..database import engine, create_db_and_tables
+from ..services.rollup import rebuild_rollups
+
+if __name__ == "__main__":
+    user_id = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    create_db_and_tables()
+    with Session(engine) as session:
+        n = rebuild_rollups(session, user_id)
+    print(f"Rebuilt {n} monthly rollup buckets.")
@@ -7,9 +7,11 @@ from typing import AsyncGenerator
 
 from app.core.config import Settings
 from app.database.session import engine
-from app.core.security import get_current_user
+from app.migrations import upgrade
 from app.routers import auth, transactions, dashboard, tax, reminders
-from app.utils.scheduler import start_scheduler
+from app.utils.scheduler import start_scheduler, stop_scheduler
+from app.services.notifications import notifier
+from app.utils.security import shutdown_password_pool, get_current_user_id
 
 settings = Settings()
 
@@ -18,10 +20,14 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     """Async context manager for FastAPI lifespan events"""
     # Startup
     SQLModel.metadata.create_all(engine)
-    start_scheduler(settings.REMINDER_CHECK_INTERVAL_SECONDS)
+    upgrade(engine)
+    await notifier.start()
+    start_scheduler(send=notifier.submit)
     yield
     # Shutdown
-    # Add cleanup code here
+    stop_scheduler()
+    await notifier.stop()
+    shutdown_password_pool()
 
 app = FastAPI(
     title="BizPilot AI Backend",
@@ -39,6 +45,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Routers
@@ -51,25 +58,25 @@ app.include_router(
     transactions.router,
     prefix="/transactions",
     tags=["Transactions"],
-    dependencies=[Depends(get_current_user)]
+    dependencies=[Depends(get_current_user_id)]
 )
 app.include_router(
     dashboard.router,
     prefix="/dashboard",
     tags=["Dashboard"],
-    dependencies=[Depends(get_current_user)]
+    dependencies=[Depends(get_current_user_id)]
 )
 app.include_router(
     tax.router,
     prefix="/tax",
     tags=["Tax Management"],
-    dependencies=[Depends(get_current_user)]
+    dependencies=[Depends(get_current_user_id)]
 )
 app.include_router(
     reminders.router,
     prefix="/reminders",
     tags=["Reminders"],
-    dependencies=[Depends(get_current_user)]
+    dependencies=[Depends(get_current_user_id)]
 )
 
 @app.get("/", tags=["Health Check"])
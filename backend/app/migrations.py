@@ -0,0 +1,94 @@
+# app/migrations.py
+"""
+Minimal forward-only schema upgrades for existing databases.
+create_all() only creates missing tables; this adds columns and indexes
+declared on models after their table was first created. New columns must be
+nullable or have a server_default. Data that would violate a new unique index
+is cleaned up first (see collapse_duplicate_tax_records). Derived tables that
+start out empty next to existing data are rebuilt (see backfill_rollups).
+Safe to run repeatedly.
+Usage: python -m app.migrations
+"""
+from typing import List
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateColumn
+from sqlmodel import SQLModel, Session
+
+def add_missing_columns(engine: Engine) -> List[str]:
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+                    added.append(f"{table.name}.{column.name}")
+    return added
+
+def create_missing_indexes(engine: Engine) -> List[str]:
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+    for table in SQLModel.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(engine)
+                created.append(index.name)
+    return created
+
+def collapse_duplicate_tax_records(engine: Engine) -> List[str]:
+    """
+    Before uq_taxrecord_period exists: keep the oldest TaxRecord per
+    (user_id, year, month), marked paid if any of its duplicates was.
+    """
+    inspector = inspect(engine)
+    if "taxrecord" not in inspector.get_table_names():
+        return []
+    if "uq_taxrecord_period" in {ix["name"] for ix in inspector.get_indexes("taxrecord")}:
+        return []
+    with engine.begin() as conn:
+        conn.execute(text(
+            "UPDATE taxrecord SET paid_boolean = :paid WHERE id IN ("
+            "SELECT MIN(id) FROM taxrecord GROUP BY user_id, year, month "
+            "HAVING COUNT(*) > 1 AND MAX(CASE WHEN paid_boolean THEN 1 ELSE 0 END) = 1)"
+        ), {"paid": True})
+        removed = conn.execute(text(
+            "DELETE FROM taxrecord WHERE id NOT IN (SELECT MIN(id) FROM taxrecord GROUP BY user_id, year, month)"
+        )).rowcount
+    return [f"taxrecord: removed {removed} duplicate(s)"] if removed else []
+
+def backfill_rollups(engine: Engine) -> List[str]:
+    """
+    The MonthlyRollup table is created empty on databases that already hold
+    transactions; rebuild it from the ledger so reports do not read zeros.
+    """
+    from .services.rollup import rebuild_rollups
+    if not {"monthlyrollup", "transaction"} <= set(inspect(engine).get_table_names()):
+        return []
+    with engine.connect() as conn:
+        if conn.exec_driver_sql("SELECT 1 FROM monthlyrollup LIMIT 1").first() is not None:
+            return []
+        if conn.exec_driver_sql('SELECT 1 FROM "transaction" LIMIT 1').first() is None:
+            return []
+    with Session(engine) as session:
+        buckets = rebuild_rollups(session)
+    return [f"monthlyrollup: rebuilt {buckets} bucket(s)"]
+
+def upgrade(engine: Engine) -> List[str]:
+    return add_missing_columns(engine) + collapse_duplicate_tax_records(engine) + create_missing_indexes(engine) + backfill_rollups(engine)
+
+if __name__ == "__main__":
+    from .database import engine
+    from .models import user, transaction, rollup, tax, reminder, token  # register tables
+    SQLModel.metadata.create_all(engine)
+    created = upgrade(engine)
+    print(f"Schema up to date ({len(created)} change(s): {', '.join(created) or '-'}).")
@@ -1,13 +1,23 @@
 # app/models/reminder.py
 from typing import Optional
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index, false
 from datetime import datetime
 
 class Reminder(SQLModel, table=True):
+    __table_args__ = (Index("ix_reminder_pending", "sent_boolean", "remind_at"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(index=True)
     related_type: str
     related_id: int
     remind_at: datetime
     sent_boolean: bool = False
+    # delivery lease: a worker owns the reminder while lease_expires is in the
+    # future; after a failed attempt lease_expires holds the retry time instead
+    claimed_by: Optional[str] = None
+    lease_expires: Optional[datetime] = None
+    attempts: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    dead_letter: bool = Field(default=False, sa_column_kwargs={"server_default": false()})
+    last_error: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,24 @@
+# app/models/rollup.py
+from typing import Optional
+from sqlmodel import SQLModel, Field
+from sqlalchemy import UniqueConstraint, Index
+
+class MonthlyRollup(SQLModel, table=True):
+    """
+    Per-user monthly totals by category and type, kept in step with the
+    Transaction table so reports never have to rescan the ledger.
+    """
+    __table_args__ = (
+        UniqueConstraint("user_id", "year", "month", "category", "type", name="uq_monthlyrollup_bucket"),
+        # all-users month queries (batch tax generation)
+        Index("ix_monthlyrollup_period", "year", "month", "type"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(index=True)
+    year: int
+    month: int
+    category: str
+    type: str  # "INCOME" or "EXPENSE"
+    total: float = 0.0
+    count: int = 0
@@ -1,10 +1,22 @@
 # app/models/tax.py
 from typing import Optional
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index, UniqueConstraint
 from datetime import datetime, date
 from typing import Dict, Any
+from functools import lru_cache
+import copy
 import json
 
+@lru_cache(maxsize=1024)
+def parse_thresholds(raw: str) -> Dict[str, Any]:
+    """Cached json.loads of thresholds_json; callers must not mutate the result."""
+    try:
+        parsed = json.loads(raw or "{}")
+    except ValueError:
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
 class TaxConfig(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(index=True)
@@ -14,12 +26,13 @@ class TaxConfig(SQLModel, table=True):
     thresholds_json: Optional[str] = Field(default='{}')
 
     def thresholds(self) -> Dict[str, Any]:
-        try:
-            return json.loads(self.thresholds_json or "{}")
-        except:
-            return {}
+        return copy.deepcopy(parse_thresholds(self.thresholds_json or "{}"))
 
 class TaxRecord(SQLModel, table=True):
+    # one record per period; a unique index rather than a constraint so
+    # app.migrations can add it to existing tables (after collapsing duplicates)
+    __table_args__ = (Index("uq_taxrecord_period", "user_id", "year", "month", unique=True),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(index=True)
     year: int
@@ -31,3 +44,22 @@ class TaxRecord(SQLModel, table=True):
     due_date: Optional[date] = None
     paid_boolean: bool = False
     generated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class TaxRun(SQLModel, table=True):
+    """
+    Checkpoint for the all-users month-end tax job. Users are processed in
+    user_id order, so last_user_id is enough to resume an interrupted run;
+    locked_until is a lease that keeps two workers off the same run.
+    """
+    __table_args__ = (UniqueConstraint("year", "month", name="uq_taxrun_period"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    year: int
+    month: int
+    status: str = "running"  # "running" or "done"
+    last_user_id: int = 0
+    users_processed: int = 0
+    records_written: int = 0
+    locked_until: Optional[datetime] = None
+    started_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,16 @@
+# app/models/token.py
+from typing import Optional
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+
+class RevokedToken(SQLModel, table=True):
+    """
+    Revoked JWT ids (logout, rotated refresh tokens). Rows are only needed
+    until the token would have expired anyway; see utils/revocation.py.
+    """
+    id: Optional[int] = Field(default=None, primary_key=True)
+    jti: str = Field(index=True, unique=True)
+    user_id: int = Field(index=True)
+    token_type: str = "access"  # "access" or "refresh"
+    expires_at: datetime = Field(index=True)
+    revoked_at: datetime = Field(default_factory=datetime.utcnow, index=True)
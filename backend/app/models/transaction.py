@@ -1,9 +1,18 @@
 # app/models/transaction.py
 from typing import Optional
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
 from datetime import date
 
 class Transaction(SQLModel, table=True):
+    # list/export filters and monthly range queries always lead with user_id;
+    # date last so ORDER BY date DESC is served from the index
+    __table_args__ = (
+        Index("ix_transaction_user_date", "user_id", "date"),
+        Index("ix_transaction_user_type_date", "user_id", "type", "date"),
+        Index("ix_transaction_user_category_date", "user_id", "category", "date"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(index=True)
     type: str  # "INCOME" or "EXPENSE"
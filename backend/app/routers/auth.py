@@ -1,33 +1,82 @@
 # app/routers/auth.py
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session, select
 from ..schemas.auth import SignupSchema, Token
 from ..models.user import User
 from ..database import get_session
-from ..utils.security import hash_password, verify_password, create_access_token
-from datetime import timedelta
-from ..core import settings
+from ..utils.security import hash_password_async, verify_and_update_async, issue_tokens, decode_token, get_current_principal, Principal
+from ..utils.revocation import revocations
+from datetime import datetime
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-@router.post("/signup", response_model=Token)
-def signup(payload: SignupSchema, session: Session = Depends(get_session)):
-    stmt = select(User).where(User.email==payload.email)
-    existing = session.exec(stmt).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already exists")
-    user = User(name=payload.name, email=payload.email, password_hash=hash_password(payload.password))
+# signup/login are async so password hashing can be awaited in the process
+# pool; their (blocking) database work goes to the threadpool instead.
+def find_user(session: Session, email: str):
+    return session.exec(select(User).where(User.email==email)).first()
+
+def save_user(session: Session, user: User) -> User:
     session.add(user)
     session.commit()
     session.refresh(user)
-    token = create_access_token(subject=str(user.id), expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
-    return {"access_token": token, "token_type": "bearer"}
+    return user
+
+@router.post("/signup", response_model=Token)
+async def signup(payload: SignupSchema, session: Session = Depends(get_session)):
+    if await run_in_threadpool(find_user, session, payload.email):
+        raise HTTPException(status_code=400, detail="Email already exists")
+    user = User(name=payload.name, email=payload.email, password_hash=await hash_password_async(payload.password))
+    user = await run_in_threadpool(save_user, session, user)
+    return issue_tokens(user.id)
 
 @router.post("/login", response_model=Token)
-def login(payload: SignupSchema, session: Session = Depends(get_session)):
-    stmt = select(User).where(User.email==payload.email)
-    user = session.exec(stmt).first()
-    if not user or not verify_password(payload.password, user.password_hash):
+async def login(payload: SignupSchema, session: Session = Depends(get_session)):
+    user = await run_in_threadpool(find_user, session, payload.email)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    valid, new_hash = await verify_and_update_async(payload.password, user.password_hash)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    token = create_access_token(subject=str(user.id), expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
-    return {"access_token": token, "token_type": "bearer"}
+    if new_hash:
+        # transparently move old hashes to the configured scheme/cost
+        user.password_hash = new_hash
+        await run_in_threadpool(save_user, session, user)
+    return issue_tokens(user.id)
+
+def decode_refresh_token(token: str):
+    payload = decode_token(token or "")
+    if not payload or payload.get("type") != "refresh" or not payload.get("jti") or payload.get("sub") is None:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    return payload
+
+@router.post("/refresh", response_model=Token)
+def refresh(payload: dict, session: Session = Depends(get_session)):
+    """
+    payload: {"refresh_token":"..."}
+    Rotates: the presented refresh token is revoked and a new pair is issued,
+    so each refresh token works exactly once.
+    """
+    claims = decode_refresh_token(payload.get("refresh_token"))
+    if revocations.is_revoked(session, claims["jti"]):
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    user_id = int(claims["sub"])
+    # the unique jti makes concurrent refreshes with the same token race-safe
+    if not revocations.revoke(session, claims["jti"], user_id, datetime.utcfromtimestamp(claims["exp"]), "refresh"):
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    return issue_tokens(user_id)
+
+@router.post("/logout")
+def logout(payload: dict = None, principal: Principal = Depends(get_current_principal), session: Session = Depends(get_session)):
+    """
+    payload (optional): {"refresh_token":"..."}
+    Revokes the current access token and, if given, the refresh token.
+    """
+    if principal.jti:
+        revocations.revoke(session, principal.jti, principal.user_id, datetime.utcfromtimestamp(principal.expires_at), "access")
+    refresh_token = (payload or {}).get("refresh_token")
+    if refresh_token:
+        claims = decode_refresh_token(refresh_token)
+        if int(claims["sub"]) == principal.user_id:
+            revocations.revoke(session, claims["jti"], principal.user_id, datetime.utcfromtimestamp(claims["exp"]), "refresh")
+    return {"ok": True}
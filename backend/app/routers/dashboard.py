@@ -1,66 +1,57 @@
 # app/routers/dashboard.py
-from fastapi import APIRouter, Depends, Request, HTTPException
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.responses import JSONResponse
+from sqlmodel import Session
 from ..database import get_session
-from ..models.transaction import Transaction
 from ..services.forecast import train_monthly_forecast
 from ..services.scoring import compute_health_score
-from collections import defaultdict
-from datetime import datetime, date, timedelta
+from ..services.aggregation import income_expense_totals, last_12_months, category_totals, unpaid_tax_total
+from ..services.cache import get_or_compute
+from ..utils.security import get_current_user_id
+from datetime import date
+from email.utils import formatdate, parsedate_to_datetime
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
-def get_current_user_id_from_request(request: Request):
-    auth = request.headers.get("authorization")
-    if not auth:
-        raise HTTPException(status_code=401, detail="Missing auth")
-    token = auth.split(" ")[1]
-    from ..utils.security import decode_token
-    payload = decode_token(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    return int(payload.get("sub"))
+def _not_modified(request: Request, entry: dict) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        return entry["etag"] in [t.strip() for t in if_none_match.split(",")] or if_none_match.strip() == "*"
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return entry["last_modified"] <= int(parsedate_to_datetime(if_modified_since).timestamp())
+        except (TypeError, ValueError):
+            return False
+    return False
 
-@router.get("/summary")
-def summary(request: Request, session: Session = Depends(get_session)):
-    user_id = get_current_user_id_from_request(request)
-    # totals for current month and year
+def cached_response(request: Request, user_id: int, endpoint: str, compute) -> Response:
+    """Serve from the per-user cache, answering 304 when the client copy is current."""
+    entry = get_or_compute(user_id, endpoint, compute)
+    headers = {
+        "ETag": entry["etag"],
+        "Last-Modified": formatdate(entry["last_modified"], usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+    if _not_modified(request, entry):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(entry["payload"], headers=headers)
+
+def build_summary(session: Session, user_id: int) -> dict:
     today = date.today()
-    start_month = date(today.year, today.month, 1)
-    start_year = date(today.year, 1, 1)
-    stmt = select(Transaction).where(Transaction.user_id==user_id)
-    txs = session.exec(stmt).all()
-    income_total = 0.0
-    expense_total = 0.0
-    # monthly aggregates for last 12 months
-    monthly = defaultdict(float)
-    for tx in txs:
-        key = datetime(tx.date.year, tx.date.month, 1)
-        if tx.type.upper() == "INCOME":
-            income_total += tx.amount
-            monthly[key] += tx.amount
-        else:
-            expense_total += tx.amount
-            monthly[key] -= tx.amount
+    # totals and monthly buckets are aggregated inside the database
+    income_total, expense_total = income_expense_totals(session, user_id)
     profit_total = income_total - expense_total
     # prepare time series last 12 months
-    series = []
-    last12 = []
-    for i in range(11, -1, -1):
-        m = (today.replace(day=1) - timedelta(days=30*i)).replace(day=1)
-        val = float(monthly.get(m, 0.0))
-        series.append({"date": m.strftime("%Y-%m-%d"), "value": val})
-        last12.append({"year": m.year, "month": m.month, "value": val})
+    last12 = last_12_months(session, user_id, today)
+    series = [{"date": date(d["year"], d["month"], 1).strftime("%Y-%m-%d"), "value": d["value"]} for d in last12]
     # forecasting
     forecast = train_monthly_forecast(user_id, last12)
     # health score: use monthly incomes and expenses arrays
     monthly_income = [max(0, x) for x in [d["value"] for d in last12]]
     monthly_expense = [max(0, -x) for x in [d["value"] for d in last12]]
     # tax due simple sum of unpaid tax records
-    from ..models.tax import TaxRecord
-    stmt_tax = select(TaxRecord).where(TaxRecord.user_id==user_id, TaxRecord.paid_boolean==False)
-    unpaid = session.exec(stmt_tax).all()
-    tax_due = sum([t.payable for t in unpaid]) if unpaid else 0.0
+    tax_due = unpaid_tax_total(session, user_id)
     score = compute_health_score(monthly_income, monthly_expense, tax_due)
     return {
         "totals": {"income_total": round(income_total,2), "expense_total": round(expense_total,2), "profit_total": round(profit_total,2)},
@@ -69,16 +60,16 @@ def summary(request: Request, session: Session = Depends(get_session)):
         "business_health_score": score
     }
 
-@router.get("/category-breakdown")
-def category_breakdown(request: Request, session: Session = Depends(get_session)):
-    user_id = get_current_user_id_from_request(request)
-    stmt = select(Transaction).where(Transaction.user_id==user_id)
-    txs = session.exec(stmt).all()
-    cat = {}
-    total_income = sum([t.amount for t in txs if t.type.upper()=="INCOME"])
-    totals = {}
-    for t in txs:
-        totals.setdefault(t.category, 0.0)
-        totals[t.category] += t.amount if t.type.upper()=="INCOME" else -t.amount
+def build_category_breakdown(session: Session, user_id: int) -> dict:
+    total_income, _ = income_expense_totals(session, user_id)
+    totals = category_totals(session, user_id)
     breakdown = [{"category": k, "amount": v, "percentage": round((v/total_income*100) if total_income else 0,2)} for k,v in totals.items()]
     return {"breakdown": breakdown}
+
+@router.get("/summary")
+def summary(request: Request, session: Session = Depends(get_session), user_id: int = Depends(get_current_user_id)):
+    return cached_response(request, user_id, "summary", lambda: build_summary(session, user_id))
+
+@router.get("/category-breakdown")
+def category_breakdown(request: Request, session: Session = Depends(get_session), user_id: int = Depends(get_current_user_id)):
+    return cached_response(request, user_id, "category-breakdown", lambda: build_category_breakdown(session, user_id))
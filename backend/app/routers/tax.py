@@ -1,46 +1,89 @@
 # app/routers/tax.py
-from fastapi import APIRouter, Request, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select
 from ..database import get_session
-from ..services.tax_service import compute_tax_for_period
+from ..services.tax_service import compute_tax_for_period, generate_tax_records, taxable_income, load_tax_configs
+from ..services.tax_rules import rules_for_config, simulate
+from ..services.aggregation import monthly_income
+from ..services.cache import invalidate
 from ..models.tax import TaxRecord
-from ..models.transaction import Transaction
+from ..utils.security import get_current_user_id
 from datetime import datetime
+import numpy as np
 
 router = APIRouter(prefix="/tax", tags=["tax"])
 
-def get_user_id_from_request(request: Request):
-    auth = request.headers.get("authorization")
-    if not auth:
-        raise HTTPException(status_code=401, detail="Missing auth")
-    token = auth.split(" ")[1]
-    from ..utils.security import decode_token
-    payload = decode_token(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    return int(payload.get("sub"))
+MAX_SCENARIOS = 10000
 
 @router.post("/generate")
-def generate_tax(payload: dict, request: Request, session: Session = Depends(get_session)):
+def generate_tax(payload: dict, session: Session = Depends(get_session), user_id: int = Depends(get_current_user_id)):
     """
     payload: {"year":2024,"month":5}
     """
-    user_id = get_user_id_from_request(request)
     year = int(payload.get("year"))
     month = int(payload.get("month"))
     # compute taxable_amount as sum of income for that month
-    stmt = select(Transaction).where(Transaction.user_id==user_id)
-    txs = session.exec(stmt).all()
-    taxable = 0.0
-    for tx in txs:
-        if tx.date.year==year and tx.date.month==month and tx.type.upper()=="INCOME":
-            taxable += tx.amount
+    taxable = monthly_income(session, user_id, year, month)
     result = compute_tax_for_period(user_id, year, month, taxable, session)
+    invalidate(user_id, ("summary",))
     return {"status":"ok","summary": result}
 
+@router.post("/generate-year")
+def generate_tax_year(payload: dict, session: Session = Depends(get_session), user_id: int = Depends(get_current_user_id)):
+    """
+    payload: {"year":2024}
+    Generates (or refreshes) all twelve monthly records in one pass.
+    """
+    year = int(payload.get("year"))
+    results = generate_tax_records(session, year, range(1, 13), [user_id])
+    invalidate(user_id, ("summary",))
+    return {"status":"ok","records": [{k: v for k, v in r.items() if k != "user_id"} for r in results]}
+
+def scenario_grid(payload: dict) -> np.ndarray:
+    if payload.get("adjustments") is not None:
+        adjustments = np.asarray(payload["adjustments"], dtype=float).reshape(-1)
+    else:
+        steps = int(payload.get("steps", 21))
+        if steps < 1:
+            raise HTTPException(status_code=400, detail="steps must be positive")
+        if steps > MAX_SCENARIOS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_SCENARIOS} scenarios")
+        adjustments = np.linspace(float(payload.get("min", -0.5)), float(payload.get("max", 0.5)), steps)
+    if len(adjustments) > MAX_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SCENARIOS} scenarios")
+    return adjustments
+
+@router.post("/simulate")
+def simulate_tax(payload: dict, session: Session = Depends(get_session), user_id: int = Depends(get_current_user_id)):
+    """
+    payload: {"year":2024,"month":5,"adjustments":[-0.1,0,0.1]}
+    or {"year":2024,"min":-0.5,"max":0.5,"steps":1001}; month is optional (whole year).
+    Each adjustment scales the user's monthly income by (1 + adjustment).
+    Read-only: nothing is written.
+    """
+    try:
+        year = int(payload["year"])
+        months = [int(payload["month"])] if payload.get("month") is not None else list(range(1, 13))
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid year or month")
+    if not all(1 <= m <= 12 for m in months):
+        raise HTTPException(status_code=400, detail="Invalid year or month")
+    try:
+        adjustments = scenario_grid(payload)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid scenario grid")
+    income = taxable_income(session, year, months, [user_id])
+    monthly = [income.get((user_id, m), 0.0) for m in months]
+    rules = rules_for_config(load_tax_configs(session, year, [user_id]).get(user_id))
+    totals = simulate(rules, monthly, adjustments)
+    scenarios = [
+        {"adjustment": float(adj), **{key: float(values[i]) for key, values in totals.items()}}
+        for i, adj in enumerate(adjustments)
+    ]
+    return {"year": year, "months": months, "monthly_income": monthly, "scenarios": scenarios}
+
 @router.get("/{year}/{month}")
-def get_tax(year: int, month: int, request: Request, session: Session = Depends(get_session)):
-    user_id = get_user_id_from_request(request)
+def get_tax(year: int, month: int, session: Session = Depends(get_session), user_id: int = Depends(get_current_user_id)):
     stmt = select(TaxRecord).where(TaxRecord.user_id==user_id, TaxRecord.year==year, TaxRecord.month==month)
     rec = session.exec(stmt).first()
     if not rec:
@@ -48,8 +91,7 @@ def get_tax(year: int, month: int, request: Request, session: Session = Depends(
     return rec
 
 @router.get("/due")
-def due(request: Request, days: int = 30, session: Session = Depends(get_session)):
-    user_id = get_user_id_from_request(request)
+def due(days: int = 30, session: Session = Depends(get_session), user_id: int = Depends(get_current_user_id)):
     from datetime import date, timedelta
     today = date.today()
     end = today + timedelta(days=days)
@@ -58,8 +100,7 @@ def due(request: Request, days: int = 30, session: Session = Depends(get_session
     return {"due": recs}
 
 @router.post("/mark-paid")
-def mark_paid(payload: dict, request: Request, session: Session = Depends(get_session)):
-    user_id = get_user_id_from_request(request)
+def mark_paid(payload: dict, session: Session = Depends(get_session), user_id: int = Depends(get_current_user_id)):
     tr_id = int(payload.get("tax_id"))
     stmt = select(TaxRecord).where(TaxRecord.id==tr_id, TaxRecord.user_id==user_id)
     rec = session.exec(stmt).first()
@@ -68,4 +109,5 @@ def mark_paid(payload: dict, request: Request, session: Session = Depends(get_se
     rec.paid_boolean = True
     session.add(rec)
     session.commit()
+    invalidate(user_id, ("summary",))
     return {"ok": True}
@@ -1,38 +1,37 @@
 # app/routers/transactions.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, UploadFile, File
+from typing import List, Tuple
 from sqlmodel import Session, select
+from sqlalchemy import or_, and_
+from datetime import date
+import base64
 from ..schemas.transaction import TransactionCreate, TransactionRead
 from ..models.transaction import Transaction
 from ..database import get_session
-from ..utils.security import decode_token
-from fastapi import Request
+from ..services.rollup import add_transaction, remove_transaction
+from ..services.importer import import_transactions, detect_format, FORMATS
+from ..services.cache import invalidate
+from ..services.exporter import export_chunks, export_columns, parquet_available, MEDIA_TYPES
+from fastapi.responses import StreamingResponse
+from ..utils.security import get_current_user_id
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 
-def get_current_user_id(request: Request):
-    auth = request.headers.get("authorization")
-    if not auth:
-        raise HTTPException(status_code=401, detail="Missing auth")
-    token = auth.split(" ")[1]
-    payload = decode_token(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    return int(payload.get("sub"))
+MAX_PAGE_SIZE = 500
 
-@router.post("", response_model=TransactionRead)
-def create_transaction(payload: TransactionCreate, session: Session = Depends(get_session), request: Request = None):
-    user_id = get_current_user_id(request)
-    tx = Transaction(user_id=user_id, type=payload.type.upper(), amount=payload.amount, date=payload.date, category=payload.category, description=payload.description, currency=payload.currency)
-    session.add(tx)
-    session.commit()
-    session.refresh(tx)
-    return tx
+def encode_cursor(tx_date: date, tx_id: int) -> str:
+    raw = f"{tx_date.isoformat()}|{tx_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
 
-@router.get("", response_model=List[TransactionRead])
-def list_transactions(page: int = 1, page_size: int = 50, date_from: str = Query(None), date_to: str = Query(None), type: str = Query(None), category: str = Query(None), session: Session = Depends(get_session), request: Request = None):
-    user_id = get_current_user_id(request)
-    stmt = select(Transaction).where(Transaction.user_id==user_id)
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        tx_date, tx_id = raw.split("|")
+        return date.fromisoformat(tx_date), int(tx_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def apply_filters(stmt, date_from: str = None, date_to: str = None, type: str = None, category: str = None):
     if type:
         stmt = stmt.where(Transaction.type==type.upper())
     if category:
@@ -41,13 +40,78 @@ def list_transactions(page: int = 1, page_size: int = 50, date_from: str = Query
         stmt = stmt.where(Transaction.date >= date_from)
     if date_to:
         stmt = stmt.where(Transaction.date <= date_to)
-    stmt = stmt.order_by(Transaction.date.desc()).offset((page-1)*page_size).limit(page_size)
-    results = session.exec(stmt).all()
+    return stmt
+
+@router.post("", response_model=TransactionRead)
+def create_transaction(payload: TransactionCreate, session: Session = Depends(get_session), user_id: int = Depends(get_current_user_id)):
+    tx = Transaction(user_id=user_id, type=payload.type.upper(), amount=payload.amount, date=payload.date, category=payload.category, description=payload.description, currency=payload.currency)
+    session.add(tx)
+    add_transaction(session, tx)
+    session.commit()
+    invalidate(user_id)
+    session.refresh(tx)
+    return tx
+
+@router.post("/bulk")
+def bulk_import(file: UploadFile = File(...), format: str = Query(None), session: Session = Depends(get_session), user_id: int = Depends(get_current_user_id)):
+    """
+    Upload a CSV (header row with TransactionCreate fields) or JSONL file.
+    Format is taken from `format`, else from the file name / content type.
+    Valid rows are inserted in batches; invalid ones are reported by line.
+    """
+    fmt = (format or detect_format(file.filename, file.content_type)).lower()
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+    try:
+        return import_transactions(session, user_id, file.file, fmt)
+    finally:
+        # earlier chunks may have committed even if a later one failed
+        invalidate(user_id)
+
+@router.get("", response_model=List[TransactionRead])
+def list_transactions(response: Response, page: int = Query(1, ge=1), page_size: int = Query(50, ge=1, le=MAX_PAGE_SIZE), cursor: str = Query(None), date_from: str = Query(None), date_to: str = Query(None), type: str = Query(None), category: str = Query(None), session: Session = Depends(get_session), user_id: int = Depends(get_current_user_id)):
+    """
+    Newest first. Two paging modes:
+    - page/page_size: classic OFFSET paging
+    - cursor: keyset paging on (date, id). Pass an empty `cursor=` for the
+      first page, then the X-Next-Cursor response header; the header is absent
+      on the last page. Cost does not grow with depth.
+    """
+    stmt = select(Transaction).where(Transaction.user_id==user_id)
+    stmt = apply_filters(stmt, date_from, date_to, type, category)
+    stmt = stmt.order_by(Transaction.date.desc(), Transaction.id.desc())
+    if cursor is None:
+        return session.exec(stmt.offset((page-1)*page_size).limit(page_size)).all()
+    if cursor:
+        after_date, after_id = decode_cursor(cursor)
+        # the plain range bound lets the (user_id, date) index seek straight to the cursor
+        stmt = stmt.where(Transaction.date <= after_date, or_(Transaction.date < after_date, and_(Transaction.date == after_date, Transaction.id < after_id)))
+    # fetch one extra row to know whether another page exists
+    results = session.exec(stmt.limit(page_size + 1)).all()
+    if len(results) > page_size:
+        results = results[:page_size]
+        response.headers["X-Next-Cursor"] = encode_cursor(results[-1].date, results[-1].id)
     return results
 
+@router.get("/export")
+def export_transactions(format: str = "csv", date_from: str = Query(None), date_to: str = Query(None), type: str = Query(None), category: str = Query(None), session: Session = Depends(get_session), user_id: int = Depends(get_current_user_id)):
+    """
+    Stream the whole filtered ledger (same filters as the list endpoint) as
+    csv, ndjson or parquet, oldest first.
+    """
+    fmt = format.lower()
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(MEDIA_TYPES)}")
+    if fmt == "parquet" and not parquet_available():
+        raise HTTPException(status_code=400, detail="parquet export requires pyarrow")
+    stmt = select(*export_columns()).where(Transaction.user_id==user_id)
+    stmt = apply_filters(stmt, date_from, date_to, type, category)
+    stmt = stmt.order_by(Transaction.date, Transaction.id)
+    headers = {"Content-Disposition": f'attachment; filename="transactions.{fmt}"'}
+    return StreamingResponse(export_chunks(session.get_bind(), stmt, fmt), media_type=MEDIA_TYPES[fmt], headers=headers)
+
 @router.get("/{id}", response_model=TransactionRead)
-def get_transaction(id: int, session: Session = Depends(get_session), request: Request = None):
-    user_id = get_current_user_id(request)
+def get_transaction(id: int, session: Session = Depends(get_session), user_id: int = Depends(get_current_user_id)):
     stmt = select(Transaction).where(Transaction.id==id, Transaction.user_id==user_id)
     tx = session.exec(stmt).first()
     if not tx:
@@ -55,12 +119,12 @@ def get_transaction(id: int, session: Session = Depends(get_session), request: R
     return tx
 
 @router.put("/{id}", response_model=TransactionRead)
-def update_transaction(id: int, payload: TransactionCreate, session: Session = Depends(get_session), request: Request = None):
-    user_id = get_current_user_id(request)
+def update_transaction(id: int, payload: TransactionCreate, session: Session = Depends(get_session), user_id: int = Depends(get_current_user_id)):
     stmt = select(Transaction).where(Transaction.id==id, Transaction.user_id==user_id)
     tx = session.exec(stmt).first()
     if not tx:
         raise HTTPException(status_code=404, detail="Not found")
+    remove_transaction(session, tx)
     tx.type = payload.type.upper()
     tx.amount = payload.amount
     tx.date = payload.date
@@ -68,17 +132,20 @@ def update_transaction(id: int, payload: TransactionCreate, session: Session = D
     tx.description = payload.description
     tx.currency = payload.currency
     session.add(tx)
+    add_transaction(session, tx)
     session.commit()
+    invalidate(user_id)
     session.refresh(tx)
     return tx
 
 @router.delete("/{id}")
-def delete_transaction(id: int, session: Session = Depends(get_session), request: Request = None):
-    user_id = get_current_user_id(request)
+def delete_transaction(id: int, session: Session = Depends(get_session), user_id: int = Depends(get_current_user_id)):
     stmt = select(Transaction).where(Transaction.id==id, Transaction.user_id==user_id)
     tx = session.exec(stmt).first()
     if not tx:
         raise HTTPException(status_code=404, detail="Not found")
+    remove_transaction(session, tx)
     session.delete(tx)
     session.commit()
+    invalidate(user_id)
     return {"ok": True}
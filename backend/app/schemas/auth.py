@@ -1,4 +1,5 @@
 # app/schemas/auth.py
+from typing import Optional
 from pydantic import BaseModel, EmailStr
 
 class SignupSchema(BaseModel):
@@ -9,3 +10,5 @@ class SignupSchema(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
@@ -0,0 +1,86 @@
+# app/services/aggregation.py
+"""
+SQL-side aggregation for dashboard, tax and forecast endpoints.
+Everything reads the MonthlyRollup table (see services/rollup.py), so the cost
+is proportional to the number of months and categories, not transactions.
+Anything that is not INCOME counts as an expense, matching the routers.
+"""
+from typing import List, Dict, Tuple
+from datetime import date
+from sqlalchemy import func, case, or_, and_
+from sqlmodel import Session, select
+from ..models.rollup import MonthlyRollup
+from ..models.tax import TaxRecord
+
+def _is_income():
+    return MonthlyRollup.type == "INCOME"
+
+def _since(since: date):
+    return or_(MonthlyRollup.year > since.year, and_(MonthlyRollup.year == since.year, MonthlyRollup.month >= since.month))
+
+def last_month_starts(today: date, n: int = 12) -> List[date]:
+    """
+    First day of each of the last `n` calendar months, oldest first.
+    The current month is the last element.
+    """
+    months = []
+    year, month = today.year, today.month
+    for _ in range(n):
+        months.append(date(year, month, 1))
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+    return months[::-1]
+
+def income_expense_totals(session: Session, user_id: int) -> Tuple[float, float]:
+    """All-time (income_total, expense_total) for a user as a single row."""
+    income = func.sum(case((_is_income(), MonthlyRollup.total), else_=0.0))
+    expense = func.sum(case((_is_income(), 0.0), else_=MonthlyRollup.total))
+    stmt = select(income, expense).where(MonthlyRollup.user_id==user_id)
+    income_total, expense_total = session.exec(stmt).one()
+    return float(income_total or 0.0), float(expense_total or 0.0)
+
+def monthly_net(session: Session, user_id: int, since: date) -> Dict[Tuple[int, int], float]:
+    """
+    Net amount (income minus expense) per (year, month) from `since` onwards.
+    """
+    net = func.sum(case((_is_income(), MonthlyRollup.total), else_=-MonthlyRollup.total))
+    stmt = select(MonthlyRollup.year, MonthlyRollup.month, net).where(MonthlyRollup.user_id==user_id, _since(since)).group_by(MonthlyRollup.year, MonthlyRollup.month)
+    return {(int(y), int(m)): float(v or 0.0) for y, m, v in session.exec(stmt)}
+
+def last_12_months(session: Session, user_id: int, today: date) -> List[Dict]:
+    """
+    returns [{"year":2024,"month":1,"value":1000}, ...] for the last 12 months,
+    oldest first, with 0.0 for months without transactions
+    """
+    months = last_month_starts(today, 12)
+    monthly = monthly_net(session, user_id, months[0])
+    return [{"year": m.year, "month": m.month, "value": monthly.get((m.year, m.month), 0.0)} for m in months]
+
+def category_totals(session: Session, user_id: int) -> Dict[str, float]:
+    """Net amount per category (income positive, expenses negative)."""
+    net = func.sum(case((_is_income(), MonthlyRollup.total), else_=-MonthlyRollup.total))
+    stmt = select(MonthlyRollup.category, net).where(MonthlyRollup.user_id==user_id).group_by(MonthlyRollup.category)
+    return {category: float(v or 0.0) for category, v in session.exec(stmt)}
+
+def monthly_income(session: Session, user_id: int, year: int, month: int) -> float:
+    """Total INCOME for one month, used as the taxable amount."""
+    stmt = select(func.sum(MonthlyRollup.total)).where(MonthlyRollup.user_id==user_id, MonthlyRollup.year==year, MonthlyRollup.month==month, _is_income())
+    return float(session.exec(stmt).one() or 0.0)
+
+def monthly_net_by_user(session: Session, user_ids: List[int], since: date) -> Dict[Tuple[int, int, int], float]:
+    """
+    Same as monthly_net() for many users in one grouped query.
+    returns {(user_id, year, month): net}
+    """
+    net = func.sum(case((_is_income(), MonthlyRollup.total), else_=-MonthlyRollup.total))
+    stmt = select(MonthlyRollup.user_id, MonthlyRollup.year, MonthlyRollup.month, net).where(MonthlyRollup.user_id.in_(user_ids), _since(since)).group_by(MonthlyRollup.user_id, MonthlyRollup.year, MonthlyRollup.month)
+    return {(uid, int(y), int(m)): float(v or 0.0) for uid, y, m, v in session.exec(stmt)}
+
+def unpaid_tax_by_user(session: Session, user_ids: List[int]) -> Dict[int, float]:
+    stmt = select(TaxRecord.user_id, func.sum(TaxRecord.payable)).where(TaxRecord.user_id.in_(user_ids), TaxRecord.paid_boolean==False).group_by(TaxRecord.user_id)
+    return {uid: float(v or 0.0) for uid, v in session.exec(stmt)}
+
+def unpaid_tax_total(session: Session, user_id: int) -> float:
+    stmt = select(func.sum(TaxRecord.payable)).where(TaxRecord.user_id==user_id, TaxRecord.paid_boolean==False)
+    return float(session.exec(stmt).one() or 0.0)
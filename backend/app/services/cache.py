@@ -0,0 +1,143 @@
+# app/services/cache.py
+"""
+Per-user result cache for dashboard endpoints.
+Entries are keyed by (user_id, endpoint) and hold the JSON payload plus an
+ETag and Last-Modified timestamp. The default backend is an in-process
+LRU with TTL; anything implementing CacheBackend (e.g. a Redis wrapper) can
+be plugged in with set_backend(). Routers that change the data behind an
+endpoint call invalidate() after committing.
+
+Bookkeeping outside the backend stays bounded: invalidation counters exist
+only for users with a compute in flight, and write times only for the current
+second (Last-Modified has one-second resolution, so an entry recomputed in the
+same second as a write is stamped a second later, keeping If-Modified-Since
+from matching the pre-write copy).
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+import time
+from ..core import settings
+
+DASHBOARD_ENDPOINTS = ("summary", "category-breakdown")
+
+class CacheBackend:
+    """Minimal interface for pluggable backends. Values are JSON-serializable dicts."""
+
+    def get(self, key: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Dict, ttl: float):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+class LRUCache(CacheBackend):
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict, ttl: float):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+_backend: CacheBackend = LRUCache(settings.DASHBOARD_CACHE_MAX_ENTRIES)
+# user_id -> [computes in flight, invalidations seen]; a result computed across
+# a write is never stored after it
+_inflight: Dict[int, List[int]] = {}
+# user_id -> newest Last-Modified a pre-invalidation entry can carry, only
+# kept until the clock passes it
+_written_at: Dict[int, int] = {}
+_state_lock = threading.Lock()
+
+def set_backend(backend: CacheBackend):
+    global _backend
+    _backend = backend
+    with _state_lock:
+        _written_at.clear()
+
+def get_backend() -> CacheBackend:
+    return _backend
+
+def _key(user_id: int, endpoint: str) -> str:
+    return f"dashboard:{user_id}:{endpoint}"
+
+def make_etag(payload: Any) -> str:
+    raw = json.dumps(payload, sort_keys=True, default=str).encode()
+    return '"' + hashlib.sha1(raw).hexdigest() + '"'
+
+def get_or_compute(user_id: int, endpoint: str, compute: Callable[[], Any], ttl: float = None) -> Dict:
+    """
+    returns {"payload": ..., "etag": '"..."', "last_modified": <epoch seconds>}
+    """
+    key = _key(user_id, endpoint)
+    entry = _backend.get(key)
+    if entry is not None:
+        return entry
+    with _state_lock:
+        state = _inflight.setdefault(user_id, [0, 0])
+        state[0] += 1
+        seen = state[1]
+    try:
+        payload = compute()
+        etag = make_etag(payload)
+    except BaseException:
+        with _state_lock:
+            _release(user_id, state)
+        raise
+    with _state_lock:
+        now = int(time.time())
+        entry = {"payload": payload, "etag": etag, "last_modified": max(now, _written_at.get(user_id, now - 1) + 1)}
+        if state[1] == seen:
+            _backend.set(key, entry, ttl if ttl is not None else settings.DASHBOARD_CACHE_TTL_SECONDS)
+        _release(user_id, state)
+    return entry
+
+def _release(user_id: int, state: List[int]) -> None:
+    state[0] -= 1
+    if not state[0]:
+        del _inflight[user_id]
+
+def tracked_users() -> int:
+    with _state_lock:
+        return len(_inflight) + len(_written_at)
+
+def invalidate(user_id: int, endpoints: Iterable[str] = DASHBOARD_ENDPOINTS):
+    now = int(time.time())
+    with _state_lock:
+        state = _inflight.get(user_id)
+        if state is not None:
+            state[1] += 1
+        # older writes can no longer share a second with a recompute
+        for uid in [uid for uid, second in _written_at.items() if second < now]:
+            del _written_at[uid]
+        # entries handed out so far are stamped at most this; later ones must be newer
+        _written_at[user_id] = max(now, _written_at.get(user_id, now - 1) + 1)
+    for endpoint in endpoints:
+        _backend.delete(_key(user_id, endpoint))
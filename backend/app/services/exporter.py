@@ -0,0 +1,118 @@
+# app/services/exporter.py
+"""
+Streaming export of a user's ledger as CSV, NDJSON or Parquet.
+Rows come from a server-side cursor (yield_per) in fixed-size batches and
+each batch is encoded and yielded before the next is fetched, so memory use
+does not depend on the number of rows. Parquet needs the optional pyarrow
+package; each batch becomes one row group.
+"""
+from typing import Iterator, List, Dict
+import csv
+import io
+import json
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+from ..models.transaction import Transaction
+
+EXPORT_BATCH_SIZE = 5000
+COLUMNS = ("id", "date", "type", "amount", "currency", "category", "description")
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+def export_columns():
+    return [getattr(Transaction, name) for name in COLUMNS]
+
+def iter_batches(engine: Engine, stmt, batch_size: int = None) -> Iterator[List[Dict]]:
+    """
+    Runs `stmt` (a select of export_columns()) in its own session, since the
+    request session is gone by the time a streaming body is consumed.
+    """
+    batch_size = batch_size or EXPORT_BATCH_SIZE
+    with Session(engine) as session:
+        result = session.exec(stmt.execution_options(yield_per=batch_size))
+        for partition in result.partitions(batch_size):
+            yield [dict(zip(COLUMNS, row)) for row in partition]
+
+def csv_chunks(batches: Iterator[List[Dict]]) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=COLUMNS)
+    writer.writeheader()
+    for batch in batches:
+        writer.writerows(batch)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    yield buf.getvalue()
+
+def ndjson_chunks(batches: Iterator[List[Dict]]) -> Iterator[str]:
+    for batch in batches:
+        yield "".join(json.dumps(row, default=str) + "\n" for row in batch)
+
+class _DrainableSink:
+    """Write-only file object whose contents are handed out as they arrive."""
+
+    def __init__(self):
+        self._chunks = []
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def parquet_chunks(batches: Iterator[List[Dict]]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("date", pa.date32()),
+        ("type", pa.string()),
+        ("amount", pa.float64()),
+        ("currency", pa.string()),
+        ("category", pa.string()),
+        ("description", pa.string()),
+    ])
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in batches:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def export_chunks(engine: Engine, stmt, fmt: str) -> Iterator:
+    batches = iter_batches(engine, stmt)
+    if fmt == "csv":
+        return csv_chunks(batches)
+    if fmt == "ndjson":
+        return ndjson_chunks(batches)
+    if fmt == "parquet":
+        return parquet_chunks(batches)
+    raise ValueError(f"Unsupported format: {fmt}")
@@ -1,57 +1,92 @@
 # app/services/forecast.py
 """
-Simple forecasting service using sklearn LinearRegression on monthly aggregates.
-Saves minimal artifacts in-memory (or can persist per-user if needed).
+Simple forecasting service: a least-squares line through monthly aggregates,
+solved in closed form with NumPy. Gives the same fit as sklearn's
+LinearRegression without building a DataFrame or estimator per request, and
+forecast_batch() fits many equal-length series in one matrix operation.
+Fitted coefficients go to a bounded ForecastModelStore; an unchanged series
+is served from the store without refitting.
 Fallback: return None if <6 months data.
 """
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional
+import hashlib
 import numpy as np
-import pandas as pd
-from sklearn.linear_model import LinearRegression
-import pickle
 from datetime import datetime
+from ..core import settings
+from .model_store import ForecastModelStore
 
-# minimal in-memory store for demo; for production persist to DB or files
-_model_store = {}
+MIN_POINTS = 6
+HORIZON = 3
+
+_model_store = ForecastModelStore(settings.FORECAST_STORE_MAX_ENTRIES, settings.FORECAST_STORE_PATH or None)
+
+def series_hash(ordered_series: List[Dict]) -> str:
+    points = np.array([[d["year"], d["month"], d["value"]] for d in ordered_series], dtype=np.float64)
+    return hashlib.sha1(points.tobytes()).hexdigest()
+
+def fit_lines(Y: np.ndarray):
+    """
+    Y: (series, points) matrix, time index 0..points-1 along axis 1.
+    returns (intercept, slope) arrays of shape (series,)
+    """
+    Y = np.asarray(Y, dtype=float)
+    n = Y.shape[1]
+    t = np.arange(n, dtype=float)
+    t_centered = t - t.mean()
+    denom = float(t_centered @ t_centered)
+    y_mean = Y.mean(axis=1)
+    slope = (Y @ t_centered) / denom if denom > 0 else np.zeros(Y.shape[0])
+    intercept = y_mean - slope * t.mean()
+    return intercept, slope
+
+def forecast_batch(Y: np.ndarray, horizon: int = HORIZON) -> Dict[str, np.ndarray]:
+    """
+    Fits every row of Y (series x points) at once.
+    returns {"predictions": (series, horizon), "confidence": (series,),
+             "intercept": (series,), "slope": (series,)}
+    confidence is 1 - std(residuals) / mean(|y|), clipped to [0, 1].
+    """
+    Y = np.asarray(Y, dtype=float)
+    n = Y.shape[1]
+    intercept, slope = fit_lines(Y)
+    t = np.arange(n, dtype=float)
+    residuals = Y - (intercept[:, None] + slope[:, None] * t)
+    std = residuals.std(axis=1)
+    mean_abs = np.abs(Y).mean(axis=1)
+    mean = np.where(mean_abs > 0, mean_abs, 1.0)
+    confidence = np.clip(1 - std / mean, 0.0, 1.0)
+    future_t = np.arange(n, n + horizon, dtype=float)
+    predictions = intercept[:, None] + slope[:, None] * future_t
+    return {"predictions": predictions, "confidence": confidence, "intercept": intercept, "slope": slope}
 
 def train_monthly_forecast(user_id: int, monthly_series: List[Dict]) -> Optional[dict]:
     """
     monthly_series: list of {"year":2024,"month":1,"value":1000}
     returns forecast for next 3 months and simple confidence estimate
     """
-    if len(monthly_series) < 6:
+    if len(monthly_series) < MIN_POINTS:
         return None
-    # create DataFrame sorted by year,month
-    df = pd.DataFrame(monthly_series)
-    df['date'] = pd.to_datetime(df.assign(day=1)[['year','month','day']])
-    df = df.sort_values('date')
-    df['t'] = np.arange(len(df))  # time index
-    X = df[['t']].values
-    y = df['value'].values
-    model = LinearRegression()
-    model.fit(X, y)
-    # forecast next 3 points
-    last_t = int(df['t'].iloc[-1])
-    future_t = np.array([[last_t + i] for i in range(1,4)])
-    preds = model.predict(future_t).tolist()
-    # simple confidence: 1 - (std of residuals / mean)
-    residuals = y - model.predict(X)
-    std = float(np.std(residuals))
-    mean = float(np.mean(np.abs(y))) if len(y)>0 and np.mean(np.abs(y))>0 else 1.0
-    confidence = max(0.0, min(1.0, 1 - std/mean))
-    # store artifact
-    _model_store[user_id] = pickle.dumps(model)
+    ordered = sorted(monthly_series, key=lambda d: (d["year"], d["month"]))
+    digest = series_hash(ordered)
+    entry = _model_store.get(user_id)
+    if entry is None or entry.series_hash != digest:
+        y = np.array([[d["value"] for d in ordered]], dtype=float)
+        result = forecast_batch(y)
+        entry = _model_store.put(
+            user_id,
+            digest,
+            [result["intercept"][0], result["slope"][0]],
+            result["predictions"][0].tolist(),
+            result["confidence"][0],
+            datetime.utcnow().isoformat(),
+        )
     return {
-        "predictions": [{"month_offset": i, "value": float(preds[i-1])} for i in range(1,4)],
-        "confidence": confidence,
-        "trained_at": datetime.utcnow().isoformat()
+        "predictions": [{"month_offset": i, "value": entry.predictions[i-1]} for i in range(1, HORIZON+1)],
+        "confidence": entry.confidence,
+        "trained_at": entry.trained_at
     }
 
 def load_model(user_id: int):
-    raw = _model_store.get(user_id)
-    if not raw:
-        return None
-    try:
-        return pickle.loads(raw)
-    except:
-        return None
+    """returns np.array([intercept, slope]) of the last fit, or None"""
+    entry = _model_store.get(user_id)
+    return None if entry is None else entry.coef.copy()
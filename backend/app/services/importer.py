@@ -0,0 +1,118 @@
+# app/services/importer.py
+"""
+Streaming bulk import of transactions from CSV or JSONL uploads.
+Rows are read one at a time, validated against TransactionCreate and
+inserted in executemany batches, committing once per chunk together with
+the matching MonthlyRollup deltas. Memory stays flat regardless of file size;
+only the first MAX_REPORTED_ERRORS row errors are kept. Lines that are not
+valid UTF-8 or that the CSV parser rejects (e.g. NUL bytes) are reported as
+row errors like any other bad row and the import carries on.
+"""
+from typing import Dict, Iterator, Tuple, Union, BinaryIO
+from collections import defaultdict
+import codecs
+import csv
+import json
+from sqlmodel import Session
+from ..models.transaction import Transaction
+from ..schemas.transaction import TransactionCreate
+from .rollup import apply_delta
+
+BULK_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+FORMATS = ("csv", "jsonl")
+
+def detect_format(filename: str = None, content_type: str = None) -> str:
+    name = (filename or "").lower()
+    ctype = (content_type or "").lower()
+    if name.endswith((".jsonl", ".ndjson")) or "ndjson" in ctype or "jsonl" in ctype:
+        return "jsonl"
+    return "csv"
+
+def iter_rows(stream: BinaryIO, fmt: str) -> Iterator[Tuple[int, Union[dict, Exception]]]:
+    """
+    Yields (line_number, row) pairs; row is the parse error for broken lines.
+    Lines are decoded one at a time, so an undecodable line only loses itself.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    undecodable = []
+    line_no = 0
+
+    def lines() -> Iterator[str]:
+        nonlocal line_no
+        for line_no, raw in enumerate(stream, start=1):
+            if line_no == 1 and raw.startswith(codecs.BOM_UTF8):
+                raw = raw[len(codecs.BOM_UTF8):]
+            try:
+                yield raw.decode("utf-8")
+            except UnicodeDecodeError as e:
+                undecodable.append((line_no, ValueError(f"line is not valid UTF-8 ({e.reason} at byte {e.start})")))
+
+    if fmt == "csv":
+        reader = csv.DictReader(lines())
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                break
+            except csv.Error as e:
+                row = e
+            yield from undecodable
+            undecodable.clear()
+            yield line_no, row
+    else:
+        for line in lines():
+            yield from undecodable
+            undecodable.clear()
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError as e:
+                yield line_no, e
+    yield from undecodable
+
+def _to_row(user_id: int, payload: TransactionCreate) -> dict:
+    return {"user_id": user_id, "type": payload.type.upper(), "amount": payload.amount, "currency": payload.currency, "date": payload.date, "category": payload.category, "description": payload.description}
+
+def _flush(session: Session, user_id: int, rows: list):
+    if not rows:
+        return
+    session.execute(Transaction.__table__.insert(), rows)
+    # one rollup delta per (month, category, type) rather than per row
+    buckets = defaultdict(lambda: [0.0, 0])
+    for row in rows:
+        bucket = buckets[(row["date"].replace(day=1), row["category"], row["type"])]
+        bucket[0] += row["amount"]
+        bucket[1] += 1
+    for (month_start, category, t), (total, count) in buckets.items():
+        apply_delta(session, user_id, month_start, category, t, total, count)
+    session.commit()
+
+def import_transactions(session: Session, user_id: int, stream: BinaryIO, fmt: str, chunk_size: int = BULK_CHUNK_SIZE) -> Dict:
+    inserted = 0
+    failed = 0
+    errors = []
+    batch = []
+    for line_no, row in iter_rows(stream, fmt):
+        try:
+            if isinstance(row, Exception):
+                raise row
+            if not isinstance(row, dict):
+                raise ValueError("row must be an object")
+            # empty CSV cells fall back to the schema defaults
+            payload = TransactionCreate(**{k: v for k, v in row.items() if k and v not in ("", None)})
+        except Exception as e:
+            failed += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"line": line_no, "error": str(e)})
+            continue
+        batch.append(_to_row(user_id, payload))
+        if len(batch) >= chunk_size:
+            _flush(session, user_id, batch)
+            inserted += len(batch)
+            batch = []
+    _flush(session, user_id, batch)
+    inserted += len(batch)
+    return {"inserted": inserted, "failed": failed, "errors": errors, "errors_truncated": failed > len(errors)}
@@ -0,0 +1,99 @@
+# app/services/model_store.py
+"""
+Bounded store for per-user forecast models.
+Each entry keeps only the line coefficients, the last forecast and a hash of
+the series it was trained on, so callers can skip retraining when nothing
+changed. Entries carry a version that increases on every retrain.
+Hot entries live in an in-process LRU; with a path set, entries are also
+written to a small SQLite file shared by every worker on the host and
+survive restarts.
+"""
+from typing import List, NamedTuple, Optional
+from collections import OrderedDict
+import sqlite3
+import threading
+import numpy as np
+
+class ForecastEntry(NamedTuple):
+    version: int
+    series_hash: str
+    coef: np.ndarray  # [intercept, slope]
+    predictions: List[float]
+    confidence: float
+    trained_at: str
+
+class ForecastModelStore:
+    def __init__(self, max_entries: int = 1024, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS forecast_model ("
+                "user_id INTEGER PRIMARY KEY, version INTEGER NOT NULL, series_hash TEXT NOT NULL, "
+                "coef BLOB NOT NULL, predictions BLOB NOT NULL, confidence REAL NOT NULL, trained_at TEXT NOT NULL)"
+            )
+            self._db.commit()
+
+    def _remember(self, user_id: int, entry: ForecastEntry):
+        self._memory[user_id] = entry
+        self._memory.move_to_end(user_id)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _load(self, user_id: int) -> Optional[ForecastEntry]:
+        row = self._db.execute(
+            "SELECT version, series_hash, coef, predictions, confidence, trained_at FROM forecast_model WHERE user_id = ?",
+            (user_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        version, series_hash, coef, predictions, confidence, trained_at = row
+        return ForecastEntry(version, series_hash, np.frombuffer(coef, dtype=np.float64).copy(), np.frombuffer(predictions, dtype=np.float64).tolist(), confidence, trained_at)
+
+    def get(self, user_id: int) -> Optional[ForecastEntry]:
+        with self._lock:
+            entry = self._memory.get(user_id)
+            if entry is not None:
+                self._memory.move_to_end(user_id)
+                return entry
+            if self._db is None:
+                return None
+            entry = self._load(user_id)
+            if entry is not None:
+                self._remember(user_id, entry)
+            return entry
+
+    def put(self, user_id: int, series_hash: str, coef, predictions: List[float], confidence: float, trained_at: str) -> ForecastEntry:
+        with self._lock:
+            previous = self._memory.get(user_id)
+            if previous is None and self._db is not None:
+                previous = self._load(user_id)
+            entry = ForecastEntry(
+                version=previous.version + 1 if previous else 1,
+                series_hash=series_hash,
+                coef=np.asarray(coef, dtype=np.float64),
+                predictions=[float(p) for p in predictions],
+                confidence=float(confidence),
+                trained_at=trained_at,
+            )
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO forecast_model VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (user_id, entry.version, series_hash, entry.coef.tobytes(), np.asarray(entry.predictions, dtype=np.float64).tobytes(), entry.confidence, trained_at),
+                )
+                self._db.commit()
+            self._remember(user_id, entry)
+            return entry
+
+    def delete(self, user_id: int):
+        with self._lock:
+            self._memory.pop(user_id, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM forecast_model WHERE user_id = ?", (user_id,))
+                self._db.commit()
+
+    def __len__(self):
+        return len(self._memory)
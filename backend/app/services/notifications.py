@@ -0,0 +1,295 @@
+# app/services/notifications.py
+"""
+Asynchronous reminder notifications.
+The reminder dispatcher (a background thread) hands reminders to submit(),
+which queues them on the API event loop and returns a concurrent Future the
+dispatcher waits on, so send failures still drive its retry/dead-letter logic.
+
+Worker tasks drain the queue in batches, resolve recipients with one query per
+batch, apply a per-user token bucket (over-limit messages are re-queued for
+when a token is available, not dropped; ones the dispatcher has cancelled in
+the meantime are skipped), render the template and send the
+whole batch over a persistent SMTP connection in a worker thread, keeping the
+event loop free. Without SMTP_HOST messages are only logged.
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+from collections import defaultdict
+from concurrent.futures import Future
+from email.message import EmailMessage
+from string import Template
+import asyncio
+import smtplib
+import threading
+import time
+from sqlmodel import Session, select
+from ..models.reminder import Reminder
+from ..models.user import User
+from ..core import settings
+
+TEMPLATES = {
+    "tax": (
+        Template("Tax reminder for $name"),
+        Template("Hi $name,\n\nThis is a reminder about your tax record #$related_id, due for attention at $remind_at UTC.\n\n- BizPilot AI"),
+    ),
+    "default": (
+        Template("Reminder from BizPilot AI"),
+        Template("Hi $name,\n\nThis is your reminder for $related_type #$related_id, scheduled for $remind_at UTC.\n\n- BizPilot AI"),
+    ),
+}
+
+def render(reminder: Reminder, recipient: Tuple[str, str]) -> EmailMessage:
+    name, email = recipient
+    subject, body = TEMPLATES.get(reminder.related_type, TEMPLATES["default"])
+    fields = {
+        "name": name,
+        "related_type": reminder.related_type,
+        "related_id": reminder.related_id,
+        "remind_at": reminder.remind_at.strftime("%Y-%m-%d %H:%M"),
+    }
+    message = EmailMessage()
+    message["From"] = settings.SMTP_FROM
+    message["To"] = email
+    message["Subject"] = subject.safe_substitute(fields)
+    message.set_content(body.safe_substitute(fields))
+    return message
+
+class TokenBucket:
+    """
+    Per-key token bucket: `rate` tokens per second, up to `burst`.
+    Keys whose bucket has refilled completely are indistinguishable from new
+    ones, so they are dropped by a periodic prune.
+    """
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._state: Dict[int, Tuple[float, float]] = {}
+        self._refill_seconds = burst / rate if rate > 0 else float("inf")
+        self._pruned_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._state)
+
+    def prune(self, now: float) -> None:
+        self._state = {key: (tokens, stamp) for key, (tokens, stamp) in self._state.items()
+                       if tokens + (now - stamp) * self.rate < self.burst}
+        self._pruned_at = now
+
+    def take(self, key: int, now: Optional[float] = None) -> float:
+        """Consumes a token and returns 0, or returns the seconds until one is available."""
+        now = time.monotonic() if now is None else now
+        if self._pruned_at is None:
+            self._pruned_at = now
+        elif now - self._pruned_at >= self._refill_seconds:
+            self.prune(now)
+        tokens, stamp = self._state.get(key, (float(self.burst), now))
+        tokens = min(self.burst, tokens + (now - stamp) * self.rate)
+        if tokens >= 1:
+            self._state[key] = (tokens - 1, now)
+            return 0.0
+        self._state[key] = (tokens, now)
+        return (1 - tokens) / self.rate if self.rate > 0 else float("inf")
+
+class SMTPTransport:
+    """
+    One persistent SMTP session, reused across batches and reconnected when
+    the server drops it. Blocking; called from a worker thread.
+    """
+    def __init__(self, host: str, port: int, user: str = "", password: str = "", starttls: bool = False, timeout: float = 30.0):
+        self.host, self.port = host, port
+        self.user, self.password = user, password
+        self.starttls = starttls
+        self.timeout = timeout
+        self._smtp: Optional[smtplib.SMTP] = None
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            smtp.starttls()
+        if self.user:
+            smtp.login(self.user, self.password)
+        return smtp
+
+    def send_batch(self, messages: List[EmailMessage]) -> List[Optional[Exception]]:
+        """Sends each message; returns one error (or None) per message."""
+        results = []
+        for message in messages:
+            for attempt in range(2):
+                try:
+                    if self._smtp is None:
+                        self._smtp = self._connect()
+                    self._smtp.send_message(message)
+                    results.append(None)
+                    break
+                except smtplib.SMTPServerDisconnected as exc:
+                    # stale pooled connection: reconnect once
+                    self._smtp = None
+                    if attempt:
+                        results.append(exc)
+                except (smtplib.SMTPException, OSError) as exc:
+                    if isinstance(exc, OSError):
+                        self.close()
+                    results.append(exc)
+                    break
+        return results
+
+    def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+class LogTransport:
+    def send_batch(self, messages: List[EmailMessage]) -> List[Optional[Exception]]:
+        for message in messages:
+            print(f"[Notify] to={message['To']} subject={message['Subject']!r}")
+        return [None] * len(messages)
+
+    def close(self) -> None:
+        pass
+
+def default_transport():
+    if not settings.SMTP_HOST:
+        return LogTransport()
+    return SMTPTransport(settings.SMTP_HOST, settings.SMTP_PORT, settings.SMTP_USER, settings.SMTP_PASSWORD, settings.SMTP_TLS)
+
+def load_recipients(user_ids: List[int]) -> Dict[int, Tuple[str, str]]:
+    from ..database import engine
+    with Session(engine) as session:
+        stmt = select(User.id, User.name, User.email).where(User.id.in_(user_ids))
+        return {uid: (name, email) for uid, name, email in session.exec(stmt)}
+
+class NotificationPipeline:
+    def __init__(self, transport_factory: Callable = default_transport, recipients: Callable[[List[int]], Dict[int, Tuple[str, str]]] = load_recipients,
+                 workers: Optional[int] = None, batch_size: Optional[int] = None, per_user_per_minute: Optional[float] = None,
+                 burst: Optional[int] = None, queue_size: Optional[int] = None):
+        self._transport_factory = transport_factory
+        self._recipients = recipients
+        self.workers = workers or settings.NOTIFY_WORKERS
+        self.batch_size = batch_size or settings.NOTIFY_BATCH_SIZE
+        self.queue_size = queue_size or settings.NOTIFY_QUEUE_SIZE
+        rate = per_user_per_minute if per_user_per_minute is not None else settings.NOTIFY_PER_USER_PER_MINUTE
+        self._bucket = TokenBucket(rate / 60.0, burst or settings.NOTIFY_PER_USER_BURST)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._transports = []
+        self._metrics = defaultdict(float)
+        self._metrics_lock = threading.Lock()
+
+    def _count(self, key: str, value: float = 1) -> None:
+        with self._metrics_lock:
+            self._metrics[key] += value
+
+    def metrics(self) -> Dict[str, float]:
+        with self._metrics_lock:
+            snapshot = dict(self._metrics)
+        snapshot["queue_depth"] = self._queue.qsize() if self._queue is not None else 0
+        if snapshot.get("sent"):
+            snapshot["avg_latency_seconds"] = snapshot.get("latency_seconds", 0.0) / snapshot["sent"]
+        return snapshot
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(self.queue_size)
+        for i in range(self.workers):
+            transport = self._transport_factory()
+            self._transports.append(transport)
+            self._tasks.append(asyncio.create_task(self._worker(transport), name=f"notify-{i}"))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for transport in self._transports:
+            await asyncio.to_thread(transport.close)
+        self._transports = []
+
+    async def enqueue(self, reminder: Reminder) -> None:
+        """Queues a reminder and waits until it has been sent (raises if sending failed)."""
+        done = self._loop.create_future()
+        await self._queue.put((reminder, done, time.monotonic()))
+        self._count("queued")
+        await done
+
+    def submit(self, reminder: Reminder) -> Future:
+        """Thread-safe entry point for the reminder dispatcher."""
+        if not self.running:
+            raise RuntimeError("notification pipeline is not running")
+        return asyncio.run_coroutine_threadsafe(self.enqueue(reminder), self._loop)
+
+    def _requeue(self, item) -> None:
+        if item[1].done():
+            # cancelled by the dispatcher while waiting for a token
+            self._count("cancelled")
+            return
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            item[1].set_exception(RuntimeError("notification queue full"))
+
+    async def _worker(self, transport) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._send(transport, batch)
+            except Exception as exc:
+                for _, done, _ in batch:
+                    if not done.done():
+                        done.set_exception(exc)
+                self._count("failed", len(batch))
+
+    async def _send(self, transport, batch) -> None:
+        ready = []
+        for item in batch:
+            if item[1].done():
+                self._count("cancelled")
+                continue
+            wait = self._bucket.take(item[0].user_id)
+            if wait:
+                self._count("rate_limited")
+                self._loop.call_later(wait, self._requeue, item)
+            else:
+                ready.append(item)
+        if not ready:
+            return
+        recipients = await asyncio.to_thread(self._recipients, sorted({item[0].user_id for item in ready}))
+        messages, sendable = [], []
+        for item in ready:
+            if item[1].done():
+                self._count("cancelled")
+                continue
+            recipient = recipients.get(item[0].user_id)
+            if recipient is None:
+                item[1].set_exception(LookupError(f"no recipient for user {item[0].user_id}"))
+                self._count("failed")
+                continue
+            messages.append(render(item[0], recipient))
+            sendable.append(item)
+        if not messages:
+            return
+        results = await asyncio.to_thread(transport.send_batch, messages)
+        self._count("batches")
+        now = time.monotonic()
+        for (reminder, done, queued_at), error in zip(sendable, results):
+            if done.done():
+                continue
+            if error is None:
+                done.set_result(None)
+                self._count("sent")
+                self._count("latency_seconds", now - queued_at)
+            else:
+                done.set_exception(error)
+                self._count("failed")
+
+notifier = NotificationPipeline()
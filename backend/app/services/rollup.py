@@ -0,0 +1,67 @@
+# app/services/rollup.py
+"""
+Incremental maintenance of the MonthlyRollup table.
+Writers call apply_delta() before committing so the rollup moves in the same
+DB transaction as the Transaction row. rebuild_rollups() recomputes the table
+from the ledger for existing data.
+"""
+from typing import Optional
+from datetime import date
+from sqlalchemy import func, extract, delete, update, insert, and_
+from sqlmodel import Session, select
+from ..models.rollup import MonthlyRollup
+from ..models.transaction import Transaction
+from .upsert import upsert_insert
+
+BUCKET_KEY = ("user_id", "year", "month", "category", "type")
+
+def apply_delta(session: Session, user_id: int, tx_date: date, category: str, type: str, amount: float, count: int = 1):
+    """
+    Add `amount`/`count` to the bucket of a transaction (negative to remove it).
+    The increment happens inside the database (INSERT ... ON CONFLICT DO UPDATE
+    where supported), so concurrent writers to one bucket never lose updates.
+    Does not commit.
+    """
+    key = {"user_id": user_id, "year": tx_date.year, "month": tx_date.month, "category": category, "type": type.upper()}
+    in_bucket = and_(*(getattr(MonthlyRollup, k)==v for k, v in key.items()))
+    dialect_insert = upsert_insert(session)
+    if dialect_insert is not None:
+        stmt = dialect_insert(MonthlyRollup).values(**key, total=amount, count=count)
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=list(BUCKET_KEY),
+            set_={"total": MonthlyRollup.total + stmt.excluded.total, "count": MonthlyRollup.count + stmt.excluded.count},
+        ))
+    else:
+        bumped = session.execute(update(MonthlyRollup).where(in_bucket).values(
+            total=MonthlyRollup.total + amount, count=MonthlyRollup.count + count,
+        ).execution_options(synchronize_session=False)).rowcount
+        if not bumped:
+            session.execute(insert(MonthlyRollup).values(**key, total=amount, count=count))
+    if count < 0:
+        session.execute(delete(MonthlyRollup).where(in_bucket, MonthlyRollup.count <= 0).execution_options(synchronize_session=False))
+
+def add_transaction(session: Session, tx: Transaction):
+    apply_delta(session, tx.user_id, tx.date, tx.category, tx.type, tx.amount, 1)
+
+def remove_transaction(session: Session, tx: Transaction):
+    apply_delta(session, tx.user_id, tx.date, tx.category, tx.type, -tx.amount, -1)
+
+def rebuild_rollups(session: Session, user_id: Optional[int] = None) -> int:
+    """
+    Recompute rollups from the Transaction table, for one user or everyone.
+    Returns the number of buckets written. Commits.
+    """
+    year = extract("year", Transaction.date)
+    month = extract("month", Transaction.date)
+    tx_type = func.upper(Transaction.type)
+    stmt = select(Transaction.user_id, year, month, Transaction.category, tx_type, func.sum(Transaction.amount), func.count(Transaction.id))
+    clear = delete(MonthlyRollup)
+    if user_id is not None:
+        stmt = stmt.where(Transaction.user_id==user_id)
+        clear = clear.where(MonthlyRollup.user_id==user_id)
+    stmt = stmt.group_by(Transaction.user_id, year, month, Transaction.category, tx_type)
+    buckets = [MonthlyRollup(user_id=uid, year=int(y), month=int(m), category=category, type=t, total=float(total or 0.0), count=int(count)) for uid, y, m, category, t, total, count in session.exec(stmt)]
+    session.execute(clear)
+    session.add_all(buckets)
+    session.commit()
+    return len(buckets)
@@ -6,37 +6,59 @@ Business health scoring:
 - tax_due_ratio (20%)
 - expense_volatility (10%)
 All normalized to 0-100
+compute_health_scores() scores a whole (users x months) matrix in one
+vectorized pass; the single-user function is a one-row call into it, so both
+always agree exactly.
 """
-from typing import List, Dict
+from typing import List
 import numpy as np
 
-def compute_health_score(monthly_income: List[float], monthly_expense: List[float], tax_due: float) -> int:
-    # ensure same length
-    n = min(len(monthly_income), len(monthly_expense))
+MIN_DATA_SCORE = 20
+
+def split_net(monthly_net) -> tuple:
+    """Monthly net values -> (income, expense) arrays as the dashboard feeds them."""
+    net = np.asarray(monthly_net, dtype=float)
+    return np.maximum(0, net), np.maximum(0, -net)
+
+def compute_health_scores(monthly_income, monthly_expense, tax_due) -> np.ndarray:
+    """
+    monthly_income, monthly_expense: (users, months) matrices
+    tax_due: (users,) vector
+    returns int scores of shape (users,)
+    """
+    income = np.atleast_2d(np.asarray(monthly_income, dtype=float))
+    expense = np.atleast_2d(np.asarray(monthly_expense, dtype=float))
+    tax_due = np.asarray(tax_due, dtype=float).reshape(-1)
+    users, n = income.shape
     if n == 0:
-        return 20  # minimal data
-    income = np.array(monthly_income[-n:])
-    expense = np.array(monthly_expense[-n:])
+        return np.full(users, MIN_DATA_SCORE, dtype=int)
     profit = income - expense
-    # profit margin trend: slope of profit over time normalized
-    t = np.arange(len(profit)).reshape(-1,1)
-    # simple linear slope
-    try:
-        coef = np.polyfit(np.arange(len(profit)), profit, 1)[0]
-    except:
-        coef = 0.0
+    # profit margin trend: least-squares slope of profit over time
+    # (row-wise sums rather than a matrix product so every row is reduced identically)
+    t = np.arange(n, dtype=float)
+    t_centered = t - t.mean()
+    denom = float((t_centered * t_centered).sum())
+    coef = (profit * t_centered).sum(axis=1) / denom if denom > 0 else np.zeros(users)
     # normalize coef to score between 0-100 (heuristic)
-    profit_trend_score = min(100, max(0, 50 + coef))  # heuristic
+    profit_trend_score = np.clip(50 + coef, 0, 100)
     # current month liquidity (current profit relative to average)
-    current_profit = float(profit[-1])
-    avg_profit = float(np.mean(profit)) if np.mean(profit)!=0 else 1.0
-    liquidity_score = min(100, max(0, 50 + (current_profit - avg_profit) / (abs(avg_profit)+1) * 50))
+    current_profit = profit[:, -1]
+    mean_profit = profit.mean(axis=1)
+    avg_profit = np.where(mean_profit != 0, mean_profit, 1.0)
+    liquidity_score = np.clip(50 + (current_profit - avg_profit) / (np.abs(avg_profit)+1) * 50, 0, 100)
     # tax due ratio (lower due -> higher score)
-    tax_ratio = tax_due / (income.sum() + 1)
-    tax_score = min(100, max(0, 100 - tax_ratio*100))
+    tax_ratio = tax_due / (income.sum(axis=1) + 1)
+    tax_score = np.clip(100 - tax_ratio*100, 0, 100)
     # expense volatility (lower vol -> higher score)
-    vol = float(np.std(expense))
-    vol_score = min(100, max(0, 100 - vol/ (np.mean(expense)+1) * 50))
+    vol = expense.std(axis=1)
+    vol_score = np.clip(100 - vol / (expense.mean(axis=1)+1) * 50, 0, 100)
     # weighted
     total = 0.4*profit_trend_score + 0.3*liquidity_score + 0.2*tax_score + 0.1*vol_score
-    return int(round(total))
+    return np.rint(total).astype(int)
+
+def compute_health_score(monthly_income: List[float], monthly_expense: List[float], tax_due: float) -> int:
+    # ensure same length
+    n = min(len(monthly_income), len(monthly_expense))
+    if n == 0:
+        return MIN_DATA_SCORE  # minimal data
+    return int(compute_health_scores([monthly_income[-n:]], [monthly_expense[-n:]], [tax_due])[0])
@@ -0,0 +1,163 @@
+# app/services/tax_rules.py
+"""
+Compiled tax rules.
+A TaxConfig is compiled once into an immutable CompiledTaxRules (bracket
+bounds and rates as NumPy arrays, rebate, VAT exemption) and cached by
+(user_id, year, config version), where the version is a hash of the config's
+rates and thresholds_json, so an edited config compiles to a new entry.
+evaluate() then prices any number of amounts in one vectorized call.
+
+thresholds_json (all keys optional):
+{
+  "brackets": [{"upto": 350000, "rate": 0.0}, {"upto": 700000, "rate": 0.10}, {"rate": 0.15}],
+  "rebate": {"rate": 0.15, "max": 10000},
+  "vat_exempt_upto": 3000000
+}
+Brackets are progressive over the evaluated amount; the last bracket's rate
+continues above its bound. Without brackets the flat tax_rate applies, which
+gives exactly the previous flat-rate results. A malformed thresholds_json is
+logged and ignored (flat tax_rate, no rebate or exemption) rather than failing
+every tax run that includes the user.
+"""
+from typing import Dict, NamedTuple, Optional
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+import numpy as np
+from ..models.tax import TaxConfig, parse_thresholds
+
+DEFAULT_VAT_RATE = 0.15
+DEFAULT_TAX_RATE = 0.0
+RULES_CACHE_SIZE = 4096
+
+class CompiledTaxRules(NamedTuple):
+    version: str
+    vat_rate: float
+    lower: np.ndarray   # bracket lower bounds
+    width: np.ndarray   # bracket widths (inf for the top bracket)
+    rates: np.ndarray
+    rebate_rate: float = 0.0
+    rebate_max: float = float("inf")
+    vat_exempt_upto: Optional[float] = None
+
+    def evaluate(self, amounts) -> Dict[str, np.ndarray]:
+        """
+        returns {"vat_amount", "tax_amount", "payable"} arrays shaped like `amounts`,
+        each rounded to 2 decimals
+        """
+        amounts = np.asarray(amounts, dtype=float)
+        flat = amounts.reshape(-1)
+        in_bracket = np.clip(flat[:, None] - self.lower, 0, self.width)
+        tax = (in_bracket * self.rates).sum(axis=1)
+        if self.rebate_rate:
+            tax = np.maximum(tax - np.minimum(tax * self.rebate_rate, self.rebate_max), 0)
+        vat = flat * self.vat_rate
+        if self.vat_exempt_upto is not None:
+            vat = np.where(flat <= self.vat_exempt_upto, 0.0, vat)
+        vat_amount = np.round(vat, 2)
+        tax_amount = np.round(tax, 2)
+        payable = np.round(flat + vat_amount + tax_amount, 2)
+        return {
+            "vat_amount": vat_amount.reshape(amounts.shape),
+            "tax_amount": tax_amount.reshape(amounts.shape),
+            "payable": payable.reshape(amounts.shape),
+        }
+
+def _readonly(values) -> np.ndarray:
+    arr = np.array(values, dtype=float)
+    arr.setflags(write=False)
+    return arr
+
+def config_version(vat_rate: float, tax_rate: float, thresholds_json: Optional[str]) -> str:
+    raw = json.dumps([vat_rate, tax_rate, thresholds_json or "{}"])
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+def _number(value, what: str, default: Optional[float] = None) -> Optional[float]:
+    if value is None:
+        return default
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{what} must be a number, got {value!r}")
+    return float(value)
+
+def _mapping(value, what: str) -> dict:
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise ValueError(f"{what} must be an object, got {value!r}")
+    return value
+
+def _compile_thresholds(thresholds: dict, tax_rate: float) -> dict:
+    """CompiledTaxRules fields from parsed thresholds; ValueError if they are malformed."""
+    brackets = thresholds.get("brackets") or [{"rate": tax_rate}]
+    if not isinstance(brackets, list):
+        raise ValueError("brackets must be a list")
+    lower, width, rates = [], [], []
+    start = 0.0
+    for i, bracket in enumerate(brackets):
+        bracket = _mapping(bracket, f"bracket {i}")
+        upto = _number(bracket.get("upto"), f"bracket {i} upto")
+        top = i == len(brackets) - 1 or upto is None
+        end = float("inf") if top else upto
+        if end <= start:
+            raise ValueError("tax brackets must have increasing 'upto' bounds")
+        lower.append(start)
+        width.append(end - start)
+        rates.append(_number(bracket.get("rate"), f"bracket {i} rate", 0.0))
+        start = end
+        if top:
+            break
+    rebate = _mapping(thresholds.get("rebate"), "rebate")
+    return {
+        "lower": _readonly(lower),
+        "width": _readonly(width),
+        "rates": _readonly(rates),
+        "rebate_rate": _number(rebate.get("rate"), "rebate rate", 0.0),
+        "rebate_max": _number(rebate.get("max"), "rebate max", float("inf")),
+        "vat_exempt_upto": _number(thresholds.get("vat_exempt_upto"), "vat_exempt_upto"),
+    }
+
+def compile_rules(vat_rate: float, tax_rate: float, thresholds_json: Optional[str] = None) -> CompiledTaxRules:
+    try:
+        fields = _compile_thresholds(parse_thresholds(thresholds_json or "{}"), tax_rate)
+    except ValueError as exc:
+        print(f"[TaxRules] ignoring invalid thresholds_json, using flat tax_rate={tax_rate}: {exc}")
+        fields = _compile_thresholds({}, tax_rate)
+    return CompiledTaxRules(version=config_version(vat_rate, tax_rate, thresholds_json), vat_rate=float(vat_rate), **fields)
+
+DEFAULT_RULES = compile_rules(DEFAULT_VAT_RATE, DEFAULT_TAX_RATE)
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def rules_for_config(cfg: Optional[TaxConfig]) -> CompiledTaxRules:
+    """Compiled rules for a TaxConfig (or the defaults when there is none), cached."""
+    if cfg is None:
+        return DEFAULT_RULES
+    key = (cfg.user_id, cfg.year, config_version(cfg.vat_rate, cfg.tax_rate, cfg.thresholds_json))
+    with _cache_lock:
+        rules = _cache.get(key)
+        if rules is not None:
+            _cache.move_to_end(key)
+            return rules
+    rules = compile_rules(cfg.vat_rate, cfg.tax_rate, cfg.thresholds_json)
+    with _cache_lock:
+        _cache[key] = rules
+        while len(_cache) > RULES_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return rules
+
+def simulate(rules: CompiledTaxRules, monthly_amounts, adjustments) -> Dict[str, np.ndarray]:
+    """
+    What-if grid: every month's amount scaled by (1 + adjustment) for each
+    adjustment, evaluated in one call. Returns per-scenario yearly totals
+    ("taxable_amount", "vat_amount", "tax_amount", "payable"), one entry per adjustment.
+    """
+    monthly_amounts = np.asarray(monthly_amounts, dtype=float)
+    adjustments = np.asarray(adjustments, dtype=float)
+    grid = np.maximum(np.outer(1.0 + adjustments, monthly_amounts), 0.0)
+    result = rules.evaluate(grid)
+    totals = {"taxable_amount": np.round(grid.sum(axis=1), 2)}
+    for key in ("vat_amount", "tax_amount", "payable"):
+        totals[key] = np.round(result[key].sum(axis=1), 2)
+    return totals
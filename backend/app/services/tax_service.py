@@ -1,50 +1,156 @@
 # app/services/tax_service.py
 from datetime import date, datetime, timedelta
-from typing import Tuple, Dict
+from typing import Tuple, Dict, List, Optional, Iterable
+import numpy as np
 from ..models.tax import TaxConfig, TaxRecord
+from ..models.rollup import MonthlyRollup
+from sqlalchemy import func
 from sqlmodel import Session, select
 from ..database import engine
+from .upsert import upsert_insert
+from .tax_rules import rules_for_config
 
-def compute_tax_for_period(user_id: int, year: int, month: int, taxable_amount: float, session: Session) -> Dict:
-    # load tax config if exists
-    stmt = select(TaxConfig).where(TaxConfig.user_id==user_id, TaxConfig.year==year)
-    cfg = session.exec(stmt).first()
-    if cfg:
-        vat_rate = cfg.vat_rate
-        tax_rate = cfg.tax_rate
-    else:
-        vat_rate = 0.15
-        tax_rate = 0.0
-    vat_amount = round(taxable_amount * vat_rate, 2)
-    tax_amount = round(taxable_amount * tax_rate, 2)
-    payable = round(taxable_amount + vat_amount + tax_amount, 2)
+def taxable_income(session: Session, year: int, months: Iterable[int], user_ids: Optional[List[int]] = None) -> Dict[Tuple[int, int], float]:
+    """
+    INCOME per (user_id, month) for the given months of `year`, in one grouped
+    query over the monthly rollup (indexed by user and by period).
+    """
+    stmt = select(MonthlyRollup.user_id, MonthlyRollup.month, func.sum(MonthlyRollup.total)).where(
+        MonthlyRollup.year==year,
+        MonthlyRollup.month.in_(list(months)),
+        MonthlyRollup.type=="INCOME",
+    )
+    if user_ids is not None:
+        stmt = stmt.where(MonthlyRollup.user_id.in_(user_ids))
+    stmt = stmt.group_by(MonthlyRollup.user_id, MonthlyRollup.month)
+    return {(uid, int(m)): float(v or 0.0) for uid, m, v in session.exec(stmt)}
+
+def load_tax_configs(session: Session, year: int, user_ids: Optional[List[int]] = None) -> Dict[int, TaxConfig]:
+    stmt = select(TaxConfig).where(TaxConfig.year==year)
+    if user_ids is not None:
+        stmt = stmt.where(TaxConfig.user_id.in_(user_ids))
+    configs = {}
+    for cfg in session.exec(stmt):
+        configs.setdefault(cfg.user_id, cfg)
+    return configs
+
+def due_date_for(year: int, month: int) -> date:
     # due date: 15th next month (simple rule)
-    due_date = None
     try:
         if month < 12:
-            due_date = date(year, month+1, 15)
-        else:
-            due_date = date(year+1, 1, 15)
+            return date(year, month+1, 15)
+        return date(year+1, 1, 15)
     except Exception:
-        due_date = date.today() + timedelta(days=30)
-    # create TaxRecord
-    record = TaxRecord(
-        user_id=user_id,
-        year=year,
-        month=month,
-        taxable_amount=taxable_amount,
-        vat_amount=vat_amount,
-        tax_amount=tax_amount,
-        payable=payable,
-        due_date=due_date
-    )
-    session.add(record)
-    session.commit()
-    session.refresh(record)
+        return date.today() + timedelta(days=30)
+
+def evaluate_periods(periods: List[Tuple[int, int]], taxable: np.ndarray, configs: Dict[int, TaxConfig]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (vat_amount, tax_amount, payable) for each (user_id, month) in `periods`.
+    Periods sharing the same compiled rules are evaluated in one vectorized call.
+    """
+    taxable = np.asarray(taxable, dtype=float)
+    groups = {}
+    for i, (uid, _) in enumerate(periods):
+        rules = rules_for_config(configs.get(uid))
+        groups.setdefault(rules.version, (rules, []))[1].append(i)
+    vat_amount, tax_amount, payable = np.zeros(len(periods)), np.zeros(len(periods)), np.zeros(len(periods))
+    for rules, idx in groups.values():
+        result = rules.evaluate(taxable[idx])
+        vat_amount[idx] = result["vat_amount"]
+        tax_amount[idx] = result["tax_amount"]
+        payable[idx] = result["payable"]
+    return vat_amount, tax_amount, payable
+
+def upsert_tax_records(session: Session, year: int, periods: List[Tuple[int, int]], taxable: np.ndarray, configs: Dict[int, TaxConfig]) -> List[Dict]:
+    """
+    Writes one TaxRecord per (user_id, month) in `periods` with an executemany
+    INSERT ... ON CONFLICT (user_id, year, month) DO UPDATE, so concurrent runs
+    for the same period cannot create duplicates; existing records keep their
+    id and paid_boolean. Does not commit. Returns the written rows.
+    """
+    if not periods:
+        return []
+    vat_amount, tax_amount, payable = evaluate_periods(periods, taxable, configs)
+    now = datetime.utcnow()
+    rows, inserts, updates = [], [], []
+    for i, (uid, m) in enumerate(periods):
+        row = {
+            "user_id": uid,
+            "year": year,
+            "month": m,
+            "taxable_amount": float(taxable[i]),
+            "vat_amount": float(vat_amount[i]),
+            "tax_amount": float(tax_amount[i]),
+            "payable": float(payable[i]),
+            "due_date": due_date_for(year, m),
+            "generated_at": now,
+        }
+        rows.append(row)
+    dialect_insert = upsert_insert(session)
+    if dialect_insert is not None:
+        stmt = dialect_insert(TaxRecord)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "year", "month"],
+            set_={key: stmt.excluded[key] for key in rows[0] if key not in ("user_id", "year", "month")},
+        )
+        session.execute(stmt, [{"paid_boolean": False, **row} for row in rows])
+        return rows
+    user_ids = sorted({uid for uid, _ in periods})
+    months = sorted({m for _, m in periods})
+    stmt = select(TaxRecord.id, TaxRecord.user_id, TaxRecord.month).where(TaxRecord.year==year, TaxRecord.month.in_(months), TaxRecord.user_id.in_(user_ids))
+    existing = {(uid, m): rid for rid, uid, m in session.exec(stmt)}
+    for row in rows:
+        if (row["user_id"], row["month"]) in existing:
+            updates.append({"id": existing[(row["user_id"], row["month"])], **row})
+        else:
+            inserts.append({"paid_boolean": False, **row})
+    if inserts:
+        session.execute(TaxRecord.__table__.insert(), inserts)
+    if updates:
+        session.bulk_update_mappings(TaxRecord, updates)
+    return rows
+
+def _summary(row: Dict) -> Dict:
     return {
-        "taxable_amount": taxable_amount,
-        "vat_amount": vat_amount,
-        "tax_amount": tax_amount,
-        "payable": payable,
-        "due_date": due_date.isoformat()
+        "year": row["year"],
+        "month": row["month"],
+        "taxable_amount": row["taxable_amount"],
+        "vat_amount": row["vat_amount"],
+        "tax_amount": row["tax_amount"],
+        "payable": row["payable"],
+        "due_date": row["due_date"].isoformat()
     }
+
+def compute_tax_for_period(user_id: int, year: int, month: int, taxable_amount: float, session: Session) -> Dict:
+    """
+    Upserts the TaxRecord for (user_id, year, month); re-running replaces the
+    amounts instead of adding a duplicate record. paid_boolean is kept.
+    """
+    # load tax config if exists
+    configs = load_tax_configs(session, year, [user_id])
+    rows = upsert_tax_records(session, year, [(user_id, month)], np.array([taxable_amount], dtype=float), configs)
+    session.commit()
+    return _summary(rows[0])
+
+def generate_tax_records(session: Session, year: int, months: Iterable[int], user_ids: Optional[List[int]] = None, configs: Optional[Dict[int, TaxConfig]] = None) -> List[Dict]:
+    """
+    Batch version of compute_tax_for_period.
+    - with user_ids: every listed user gets a record for every month (zero if no income)
+    - without: every user with income in one of the months
+    Income, configs and existing records are each loaded with one query and
+    everything is committed once. Returns one summary dict (plus user_id) per record.
+    """
+    months = sorted(set(months))
+    income = taxable_income(session, year, months, user_ids)
+    if user_ids is None:
+        periods = sorted(income)
+    else:
+        periods = [(uid, m) for uid in user_ids for m in months]
+    if not periods:
+        return []
+    if configs is None:
+        configs = load_tax_configs(session, year, sorted({uid for uid, _ in periods}))
+    taxable = np.array([income.get(p, 0.0) for p in periods], dtype=float)
+    rows = upsert_tax_records(session, year, periods, taxable, configs)
+    session.commit()
+    return [{"user_id": row["user_id"], **_summary(row)} for row in rows]
@@ -0,0 +1,14 @@
+# app/services/upsert.py
+"""
+INSERT ... ON CONFLICT DO UPDATE for the dialects that have it, so counters
+and per-period records are written atomically instead of select-then-write.
+"""
+from typing import Callable, Optional
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session
+
+UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+def upsert_insert(session: Session) -> Optional[Callable]:
+    """The dialect's insert() supporting on_conflict_do_update, or None."""
+    return UPSERT_DIALECTS.get(session.get_bind().dialect.name)
@@ -0,0 +1,232 @@
+# app/utils/reminder_dispatcher.py
+"""
+Event-driven, multi-worker-safe reminder delivery.
+Each process keeps an in-memory min-heap of upcoming remind_at times (loaded
+on start, fed by /reminders/schedule) and sleeps on a Condition until the
+earliest one is due. It then claims due reminders from the database with a
+single UPDATE ... RETURNING that sets claimed_by/lease_expires, so when several
+workers or nodes wake together each reminder is claimed by exactly one of them.
+
+- success: the batch is marked sent with one UPDATE
+- failure: the lease is released and lease_expires becomes the retry time
+  (exponential backoff); after REMINDER_MAX_ATTEMPTS it is dead-lettered
+- a worker that dies mid-send leaves a lease that expires; the periodic sweep
+  (REMINDER_SWEEP_SECONDS, 0 disables) picks those up, along with reminders
+  scheduled through another worker
+
+`send` may return a concurrent.futures.Future (see services/notifications.py);
+the batch is then submitted first and the outcomes awaited together, for at
+most the lease; outcomes still pending after that are cancelled and retried.
+"""
+from typing import Callable, List, Optional, Tuple
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+import heapq
+import os
+import socket
+import threading
+import time
+import uuid
+from sqlalchemy import update, and_, or_
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+from ..models.reminder import Reminder
+from ..core import settings
+
+MAX_RETRY_DELAY_SECONDS = 3600
+
+def log_reminder(reminder: Reminder) -> None:
+    # for demo, "send" by logging to console
+    print(f"[Reminder] sending reminder id={reminder.id} for user={reminder.user_id} related={reminder.related_type}/{reminder.related_id}")
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def claimable(now: datetime):
+    """Unsent, not dead-lettered, due, and not leased (or the lease/backoff has expired)."""
+    return and_(
+        Reminder.sent_boolean==False,
+        Reminder.dead_letter==False,
+        Reminder.remind_at <= now,
+        or_(Reminder.lease_expires.is_(None), Reminder.lease_expires <= now),
+    )
+
+class ReminderDispatcher:
+    def __init__(self, engine: Optional[Engine] = None, send: Callable[[Reminder], None] = log_reminder,
+                 worker_id: Optional[str] = None, lease_seconds: Optional[int] = None, max_attempts: Optional[int] = None,
+                 retry_base_seconds: Optional[int] = None, batch_size: Optional[int] = None, sweep_seconds: Optional[int] = None):
+        self._engine = engine
+        self._send = send
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds if lease_seconds is not None else settings.REMINDER_LEASE_SECONDS
+        self.max_attempts = max_attempts if max_attempts is not None else settings.REMINDER_MAX_ATTEMPTS
+        self.retry_base_seconds = retry_base_seconds if retry_base_seconds is not None else settings.REMINDER_RETRY_BASE_SECONDS
+        self.batch_size = batch_size or settings.REMINDER_CLAIM_BATCH_SIZE
+        self.sweep_seconds = sweep_seconds if sweep_seconds is not None else settings.REMINDER_SWEEP_SECONDS
+        self._heap: List[Tuple[datetime, int]] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            from ..database import engine
+            self._engine = engine
+        return self._engine
+
+    def load(self) -> int:
+        """(Re)build the heap from all pending reminders; returns how many are pending."""
+        with Session(self.engine) as session:
+            stmt = select(Reminder.remind_at, Reminder.lease_expires, Reminder.id).where(Reminder.sent_boolean==False, Reminder.dead_letter==False)
+            pending = [(max(remind_at, lease_expires or remind_at), rid) for remind_at, lease_expires, rid in session.exec(stmt)]
+        heapq.heapify(pending)
+        with self._cond:
+            self._heap = pending
+            self._cond.notify()
+        return len(pending)
+
+    def push(self, reminder_id: int, remind_at: datetime) -> None:
+        with self._cond:
+            heapq.heappush(self._heap, (remind_at, reminder_id))
+            if self._heap[0][1] == reminder_id:
+                self._cond.notify()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def _wait_until_due(self) -> bool:
+        """Blocks until a reminder is due or the sweep interval passes; False on stop."""
+        sweep_at = time.monotonic() + self.sweep_seconds if self.sweep_seconds else None
+        with self._cond:
+            while not self._stopping:
+                now = datetime.utcnow()
+                if self._heap and self._heap[0][0] <= now:
+                    while self._heap and self._heap[0][0] <= now:
+                        heapq.heappop(self._heap)
+                    return True
+                delays = []
+                if self._heap:
+                    delays.append((self._heap[0][0] - now).total_seconds())
+                if sweep_at is not None:
+                    remaining = sweep_at - time.monotonic()
+                    if remaining <= 0:
+                        return True
+                    delays.append(remaining)
+                self._cond.wait(min(delays) if delays else None)
+            return False
+
+    def claim(self) -> List[Reminder]:
+        """
+        Atomically leases up to batch_size due reminders to this worker.
+        The claimable conditions are repeated on the outer UPDATE so a row taken
+        by a concurrent worker between the subquery and the update is skipped.
+        """
+        now = datetime.utcnow()
+        lease = now + timedelta(seconds=self.lease_seconds)
+        due = select(Reminder.id).where(claimable(now)).order_by(Reminder.remind_at).limit(self.batch_size).with_for_update(skip_locked=True)
+        stmt = update(Reminder).where(Reminder.id.in_(due), claimable(now)).values(
+            claimed_by=self.worker_id, lease_expires=lease, attempts=Reminder.attempts + 1,
+        ).execution_options(synchronize_session=False)
+        with Session(self.engine) as session:
+            if self.engine.dialect.update_returning:
+                ids = [rid for (rid,) in session.execute(stmt.returning(Reminder.id))]
+                session.commit()
+                if not ids:
+                    return []
+                query = select(Reminder).where(Reminder.id.in_(ids), Reminder.claimed_by==self.worker_id)
+            else:
+                session.execute(stmt)
+                session.commit()
+                query = select(Reminder).where(Reminder.claimed_by==self.worker_id, Reminder.lease_expires==lease)
+            return list(session.exec(query.order_by(Reminder.remind_at)).all())
+
+    def retry_delay(self, attempts: int) -> float:
+        return min(self.retry_base_seconds * 2 ** max(attempts - 1, 0), MAX_RETRY_DELAY_SECONDS)
+
+    def dispatch(self, reminders: List[Reminder]) -> List[int]:
+        """
+        Sends claimed reminders; returns the ids sent. Every write is fenced on
+        claimed_by, so a worker whose lease was taken over cannot overwrite it.
+        """
+        sent, failed, pending = [], [], []
+        for reminder in reminders:
+            try:
+                outcome = self._send(reminder)
+            except Exception as exc:
+                failed.append((reminder, str(exc)))
+                continue
+            if isinstance(outcome, Future):
+                pending.append((reminder, outcome))
+            else:
+                sent.append(reminder.id)
+        deadline = time.monotonic() + self.lease_seconds
+        for reminder, outcome in pending:
+            try:
+                outcome.result(timeout=max(deadline - time.monotonic(), 0))
+            except Exception as exc:
+                # still queued (e.g. rate limited past the lease): withdraw it so the
+                # retry scheduled below is the only delivery
+                outcome.cancel()
+                failed.append((reminder, str(exc) or type(exc).__name__))
+                continue
+            sent.append(reminder.id)
+        now = datetime.utcnow()
+        retries = []
+        with Session(self.engine) as session:
+            if sent:
+                session.execute(update(Reminder).where(Reminder.id.in_(sent), Reminder.claimed_by==self.worker_id).values(
+                    sent_boolean=True, claimed_by=None, lease_expires=None, last_error=None,
+                ).execution_options(synchronize_session=False))
+            for reminder, error in failed:
+                values = {"claimed_by": None, "last_error": error[:500]}
+                if reminder.attempts >= self.max_attempts:
+                    print(f"[Reminder] dead-lettering reminder id={reminder.id} after {reminder.attempts} attempts: {error}")
+                    values.update(dead_letter=True, lease_expires=None)
+                else:
+                    retry_at = now + timedelta(seconds=self.retry_delay(reminder.attempts))
+                    values["lease_expires"] = retry_at
+                    retries.append((reminder.id, retry_at))
+                session.execute(update(Reminder).where(Reminder.id==reminder.id, Reminder.claimed_by==self.worker_id).values(**values).execution_options(synchronize_session=False))
+            session.commit()
+        for reminder_id, retry_at in retries:
+            self.push(reminder_id, retry_at)
+        return sent
+
+    def run_once(self) -> List[int]:
+        """Claims and dispatches until nothing is due; returns the ids sent."""
+        sent = []
+        while True:
+            batch = self.claim()
+            if not batch:
+                return sent
+            sent.extend(self.dispatch(batch))
+
+    def _run(self) -> None:
+        while self._wait_until_due():
+            try:
+                self.run_once()
+            except Exception as exc:
+                print(f"[Reminder] dispatch failed: {exc}")
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping = False
+        self.load()
+        self._thread = threading.Thread(target=self._run, name="reminder-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def set_sender(self, send: Callable[[Reminder], None]) -> None:
+        self._send = send
+
+dispatcher = ReminderDispatcher()
@@ -0,0 +1,137 @@
+# app/utils/revocation.py
+"""
+Token revocation list.
+Revoked jtis are stored in the RevokedToken table and mirrored into an
+in-memory Bloom filter, so checking a token that was never revoked (nearly
+every request) costs a few hashes and no query. A filter hit is confirmed
+against the table, which makes false positives harmless.
+
+Other workers' revocations are picked up incrementally at most every
+REVOCATION_SYNC_SECONDS by re-reading rows revoked since the previous sync
+minus REVOCATION_SYNC_MARGIN_SECONDS. Ids are not used as a high-water mark:
+a transaction holding a lower id can commit after a higher one. Syncing
+only reads; prune() runs on the scheduler every REVOCATION_PRUNE_SECONDS with
+its own session, deletes expired rows and has the next sync rebuild the filter.
+"""
+from typing import Optional
+from datetime import datetime, timedelta
+import hashlib
+import math
+import threading
+import time
+from sqlalchemy import delete
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from ..models.token import RevokedToken
+from ..core import settings
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(capacity, 1)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+class RevocationList:
+    def __init__(self, capacity: Optional[int] = None, sync_seconds: Optional[float] = None,
+                 margin_seconds: Optional[float] = None, engine: Optional[Engine] = None):
+        self.capacity = capacity or settings.REVOCATION_BLOOM_CAPACITY
+        self.sync_seconds = sync_seconds if sync_seconds is not None else settings.REVOCATION_SYNC_SECONDS
+        self.margin = timedelta(seconds=margin_seconds if margin_seconds is not None else settings.REVOCATION_SYNC_MARGIN_SECONDS)
+        self._engine = engine
+        self._lock = threading.Lock()
+        self.reset()
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            from ..database import engine
+            self._engine = engine
+        return self._engine
+
+    def reset(self) -> None:
+        with self._lock:
+            self._bloom = BloomFilter(self.capacity)
+            self._since: Optional[datetime] = None  # wall-clock start of the last sync
+            self._synced_at = None  # None: full reload needed
+
+    def _load(self, session: Session) -> None:
+        now = time.monotonic()
+        full = self._synced_at is None
+        started = datetime.utcnow()
+        stmt = select(RevokedToken.jti)
+        if full:
+            stmt = stmt.where(RevokedToken.expires_at >= started)
+        else:
+            stmt = stmt.where(RevokedToken.revoked_at >= self._since - self.margin)
+        jtis = session.exec(stmt).all()
+        with self._lock:
+            if full:
+                self._bloom = BloomFilter(max(self.capacity, 2 * len(jtis)))
+            for jti in jtis:
+                # the margin re-reads recent rows; only count new ones
+                if jti not in self._bloom:
+                    self._bloom.add(jti)
+            self._since = started
+            if self._bloom.count > self._bloom.capacity:
+                # past capacity the error rate climbs: rebuild larger next time
+                self.capacity = 2 * self._bloom.count
+                self._synced_at = None
+            else:
+                self._synced_at = now
+
+    def sync(self, session: Session, force: bool = False) -> None:
+        synced_at = self._synced_at
+        if force or synced_at is None or time.monotonic() - synced_at >= self.sync_seconds:
+            self._load(session)
+
+    def prune(self) -> int:
+        """Deletes expired revocations in a session of its own; returns how many went."""
+        with Session(self.engine) as session:
+            result = session.execute(delete(RevokedToken).where(RevokedToken.expires_at < datetime.utcnow()))
+            session.commit()
+        if result.rowcount:
+            with self._lock:
+                # expired jtis still set bits in the filter: rebuild it on the next sync
+                self._synced_at = None
+        return result.rowcount
+
+    def is_revoked(self, session: Session, jti: Optional[str]) -> bool:
+        if not jti:
+            return False
+        self.sync(session)
+        with self._lock:
+            if jti not in self._bloom:
+                return False
+        stmt = select(RevokedToken.id).where(RevokedToken.jti==jti)
+        return session.exec(stmt).first() is not None
+
+    def revoke(self, session: Session, jti: str, user_id: int, expires_at: datetime, token_type: str = "access") -> bool:
+        """Records the revocation (committing); False if the jti was already revoked."""
+        session.add(RevokedToken(jti=jti, user_id=user_id, token_type=token_type, expires_at=expires_at))
+        try:
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+            return False
+        with self._lock:
+            self._bloom.add(jti)
+        return True
+
+revocations = RevocationList()
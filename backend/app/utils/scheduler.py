@@ -1,24 +1,22 @@
 # app/utils/scheduler.py
 from apscheduler.schedulers.background import BackgroundScheduler
-from datetime import datetime
-from sqlmodel import Session, select
-from ..database import engine
-from ..models.reminder import Reminder
+from ..core import settings
+from ..jobs.generate_tax import run_previous_month
+from .reminder_dispatcher import dispatcher
+from .revocation import revocations
 
 _scheduler = BackgroundScheduler()
 
-def check_reminders():
-    with Session(engine) as session:
-        now = datetime.utcnow()
-        stmt = select(Reminder).where(Reminder.sent_boolean==False, Reminder.remind_at <= now)
-        reminders = session.exec(stmt).all()
-        for r in reminders:
-            # for demo, "send" by logging to console
-            print(f"[Reminder] sending reminder id={r.id} for user={r.user_id} related={r.related_type}/{r.related_id}")
-            r.sent_boolean = True
-            session.add(r)
-        session.commit()
-
-def start_scheduler(interval_seconds: int = 30):
-    _scheduler.add_job(check_reminders, 'interval', seconds=interval_seconds, id="reminder_check", replace_existing=True)
+def start_scheduler(send=None):
+    # reminders are delivered by the event-driven dispatcher, not polled
+    if send is not None:
+        dispatcher.set_sender(send)
+    dispatcher.start()
+    _scheduler.add_job(run_previous_month, 'cron', day=settings.TAX_MONTH_END_DAY, hour=settings.TAX_MONTH_END_HOUR, id="tax_month_end", replace_existing=True)
+    _scheduler.add_job(revocations.prune, 'interval', seconds=settings.REVOCATION_PRUNE_SECONDS, id="revocation_prune", replace_existing=True)
     _scheduler.start()
+
+def stop_scheduler():
+    dispatcher.stop()
+    if _scheduler.running:
+        _scheduler.shutdown(wait=False)
@@ -1,11 +1,41 @@
 # app/utils/security.py
 from passlib.context import CryptContext
+from passlib.hash import argon2
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from fastapi import Depends, HTTPException, Request
+from sqlmodel import Session
+import asyncio
+import multiprocessing
+import threading
+import time
+import uuid
+import weakref
 import jwt
-from typing import Optional
+from typing import NamedTuple, Optional, Tuple
 from ..core import settings
+from ..database import get_session
+from .revocation import revocations
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def build_pwd_context(scheme: str = settings.PASSWORD_SCHEME, bcrypt_rounds: int = settings.BCRYPT_ROUNDS) -> CryptContext:
+    """
+    `scheme` is the default for new hashes; every other scheme, and bcrypt
+    hashes below `bcrypt_rounds`, are reported by verify_and_update for rehashing.
+    """
+    if scheme == "argon2" and not argon2.has_backend():
+        scheme = "bcrypt"
+    schemes = ["argon2", "bcrypt"] if scheme == "argon2" else ["bcrypt"]
+    return CryptContext(
+        schemes=schemes,
+        default=scheme,
+        deprecated="auto",
+        bcrypt__rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        argon2__type="ID",
+    )
+
+pwd_context = build_pwd_context()
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -13,15 +43,139 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """(valid, new_hash); new_hash is set when the stored hash should be replaced."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+# bcrypt/argon2 are CPU bound; a process pool uses every core without pinning
+# the server's threadpool. A semaphore per event loop (asyncio primitives are
+# bound to one loop) bounds how many requests may queue.
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_pending: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(settings.PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def shutdown_password_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def _pending_slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    with _pool_lock:
+        slots = _pending.get(loop)
+        if slots is None:
+            slots = _pending[loop] = asyncio.Semaphore(settings.PASSWORD_HASH_MAX_PENDING)
+        return slots
+
+async def _offload(func, *args):
+    async with _pending_slots():
+        pool = _get_pool()
+        if pool is None:
+            return await asyncio.to_thread(func, *args)
+        return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+
+async def hash_password_async(password: str) -> str:
+    return await _offload(hash_password, password)
+
+async def verify_and_update_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await _offload(verify_and_update, plain_password, hashed_password)
+
 def create_access_token(subject: str, expires_delta: Optional[timedelta] = None) -> str:
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode = {"sub": subject, "exp": expire}
+    to_encode = {"sub": subject, "exp": expire, "jti": uuid.uuid4().hex, "type": "access"}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
     return encoded_jwt
 
+def create_refresh_token(subject: str, expires_delta: Optional[timedelta] = None) -> str:
+    expire = datetime.utcnow() + (expires_delta or timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
+    to_encode = {"sub": subject, "exp": expire, "jti": uuid.uuid4().hex, "type": "refresh"}
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
+
+def issue_tokens(user_id: int) -> dict:
+    """Short-lived access token plus a rotating refresh token."""
+    return {
+        "access_token": create_access_token(subject=str(user_id)),
+        "refresh_token": create_refresh_token(subject=str(user_id)),
+        "token_type": "bearer",
+        "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
 def decode_token(token: str) -> Optional[dict]:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
         return payload
     except Exception:
         return None
+
+class Principal(NamedTuple):
+    user_id: int
+    expires_at: float  # token exp, unix time
+    jti: Optional[str] = None
+
+# verified token -> (principal, cache deadline); the deadline never passes the
+# token's own exp, so cached entries expire exactly like the JWT would
+_token_cache = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+def clear_token_cache() -> None:
+    with _token_cache_lock:
+        _token_cache.clear()
+
+def authenticate_token(token: str) -> Optional[Principal]:
+    now = time.time()
+    with _token_cache_lock:
+        cached = _token_cache.get(token)
+        if cached is not None:
+            principal, deadline = cached
+            if deadline > now:
+                _token_cache.move_to_end(token)
+                return principal
+            del _token_cache[token]
+    payload = decode_token(token)
+    if not payload or payload.get("sub") is None or payload.get("type", "access") != "access":
+        return None
+    try:
+        principal = Principal(int(payload["sub"]), float(payload.get("exp", now)), payload.get("jti"))
+    except (TypeError, ValueError):
+        return None
+    deadline = min(now + settings.AUTH_TOKEN_CACHE_TTL_SECONDS, principal.expires_at)
+    with _token_cache_lock:
+        _token_cache[token] = (principal, deadline)
+        while len(_token_cache) > settings.AUTH_TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return principal
+
+def get_current_principal(request: Request, session: Session = Depends(get_session)) -> Principal:
+    """
+    FastAPI dependency: the authenticated principal, resolved once per request
+    (kept on request.state). The revocation check is a Bloom filter lookup;
+    the database is only consulted on a filter hit.
+    """
+    principal = getattr(request.state, "principal", None)
+    if principal is not None:
+        return principal
+    auth = request.headers.get("authorization")
+    if not auth:
+        raise HTTPException(status_code=401, detail="Missing auth")
+    scheme, _, token = auth.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    principal = authenticate_token(token.strip())
+    if principal is None or revocations.is_revoked(session, principal.jti):
+        raise HTTPException(status_code=401, detail="Invalid token")
+    request.state.principal = principal
+    return principal
+
+def get_current_user_id(principal: Principal = Depends(get_current_principal)) -> int:
+    return principal.user_id
@@ -7,6 +7,7 @@ from app.models.user import User
 from app.models.transaction import Transaction
 from app.utils.security import hash_password
 from app.create_db import create_db_and_tables
+from app.services.rollup import rebuild_rollups
 
 def seed():
     create_db_and_tables()
@@ -29,6 +30,7 @@ def seed():
             tx_exp = Transaction(user_id=user.id, type="EXPENSE", amount=round(expense_val,2), date=d, category="operations", description="Monthly ops")
             session.add(tx_exp)
         session.commit()
+        rebuild_rollups(session, user.id)
         print("Seeded demo user and transactions. email=demo@example.com password=password")
 
 if __name__ == "__main__":
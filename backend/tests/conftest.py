@@ -0,0 +1,58 @@
+# tests/conftest.py
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.pool import StaticPool
+from app.database import get_session
+from app.models.user import User
+from app.routers import auth, transactions, dashboard, tax, reminders
+from app.services.cache import LRUCache, set_backend
+from app.utils.security import create_access_token, clear_token_cache
+from app.utils.revocation import revocations
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    """Dashboard, token and revocation caches are process-wide; user ids repeat across test databases"""
+    set_backend(LRUCache())
+    clear_token_cache()
+    revocations.reset()
+
+@pytest.fixture
+def engine():
+    """Fresh in-memory SQLite database per test"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def session(engine):
+    with Session(engine) as session:
+        yield session
+
+@pytest.fixture
+def user(session):
+    user = User(name="Test User", email="test@example.com", password_hash="x")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    return user
+
+@pytest.fixture
+def auth_headers(user):
+    return {"Authorization": f"Bearer {create_access_token(subject=str(user.id))}"}
+
+@pytest.fixture
+def client(engine):
+    """Routers mounted on a bare app, bound to the in-memory database"""
+    app = FastAPI()
+    for module in (auth, transactions, dashboard, tax, reminders):
+        app.include_router(module.router)
+
+    def override_session():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_session
+    return TestClient(app)
@@ -0,0 +1,59 @@
+# tests/test_aggregation.py
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+from app.models.transaction import Transaction
+from app.services.aggregation import income_expense_totals, last_12_months, last_month_starts, category_totals
+from app.services.rollup import rebuild_rollups
+
+def seed_ledger(session, user_id, n=500):
+    rng = random.Random(42)
+    today = date.today()
+    rows = []
+    for _ in range(n):
+        d = today - timedelta(days=rng.randint(0, 800))
+        rows.append(Transaction(user_id=user_id, type=rng.choice(["INCOME", "EXPENSE", "income"]), amount=round(rng.uniform(1, 5000), 2), date=d, category=rng.choice(["sales", "rent", "ops"])))
+    session.add_all(rows)
+    # another user's rows must never leak into the aggregates
+    session.add(Transaction(user_id=user_id + 1, type="INCOME", amount=1e9, date=today, category="sales"))
+    session.commit()
+    rebuild_rollups(session)
+    return rows
+
+def test_last_month_starts_is_contiguous():
+    months = last_month_starts(date(2024, 3, 31), 12)
+    assert months[0] == date(2023, 4, 1)
+    assert months[-1] == date(2024, 3, 1)
+    assert len({(m.year, m.month) for m in months}) == 12
+
+def test_aggregates_match_python_loop(session, user):
+    rows = seed_ledger(session, user.id)
+    income = sum(r.amount for r in rows if r.type.upper() == "INCOME")
+    expense = sum(r.amount for r in rows if r.type.upper() != "INCOME")
+    monthly = defaultdict(float)
+    for r in rows:
+        monthly[(r.date.year, r.date.month)] += r.amount if r.type.upper() == "INCOME" else -r.amount
+
+    income_total, expense_total = income_expense_totals(session, user.id)
+    assert round(income_total, 2) == round(income, 2)
+    assert round(expense_total, 2) == round(expense, 2)
+    for d in last_12_months(session, user.id, date.today()):
+        assert round(d["value"], 2) == round(monthly.get((d["year"], d["month"]), 0.0), 2)
+
+def test_summary_endpoint(client, session, user, auth_headers):
+    seed_ledger(session, user.id, n=50)
+    income_total, expense_total = income_expense_totals(session, user.id)
+    response = client.get("/dashboard/summary", headers=auth_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["totals"]["income_total"] == round(income_total, 2)
+    assert body["totals"]["expense_total"] == round(expense_total, 2)
+    assert len(body["time_series"]) == 12
+
+def test_category_totals(session, user):
+    rows = seed_ledger(session, user.id)
+    expected = defaultdict(float)
+    for r in rows:
+        expected[r.category] += r.amount if r.type.upper() == "INCOME" else -r.amount
+    totals = category_totals(session, user.id)
+    assert {k: round(v, 2) for k, v in totals.items()} == {k: round(v, 2) for k, v in expected.items()}
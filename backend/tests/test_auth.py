@@ -0,0 +1,124 @@
+# tests/test_auth.py
+import asyncio
+from datetime import datetime, timedelta
+from sqlmodel import select
+from app.core import settings
+from app.models.token import RevokedToken
+from app.models.user import User
+from app.utils import security
+from app.utils.revocation import BloomFilter, RevocationList
+
+def test_signup_login_and_hash_upgrade(client, session, monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", 0)
+    monkeypatch.setattr(security, "pwd_context", security.build_pwd_context(bcrypt_rounds=4))
+    assert client.post("/auth/signup", json={"name": "A", "email": "a@example.com", "password": "s3cret"}).status_code == 200
+    old_hash = session.exec(select(User).where(User.email=="a@example.com")).one().password_hash
+    assert old_hash.startswith("$2b$04$")
+    assert client.post("/auth/login", json={"name": "A", "email": "a@example.com", "password": "wrong"}).status_code == 401
+    # raising the configured cost rehashes on the next successful login
+    monkeypatch.setattr(security, "pwd_context", security.build_pwd_context(bcrypt_rounds=5))
+    assert "access_token" in client.post("/auth/login", json={"name": "A", "email": "a@example.com", "password": "s3cret"}).json()
+    session.expire_all()
+    new_hash = session.exec(select(User).where(User.email=="a@example.com")).one().password_hash
+    assert new_hash.startswith("$2b$05$")
+    assert security.verify_password("s3cret", new_hash)
+
+def test_process_pool_hashing(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", 1)
+    async def roundtrip():
+        hashed = await security.hash_password_async("pw")
+        return await security.verify_and_update_async("pw", hashed)
+    try:
+        valid, new_hash = asyncio.run(roundtrip())
+    finally:
+        security.shutdown_password_pool()
+    assert valid and new_hash is None
+
+def test_token_decoded_once_and_cached(client, auth_headers, monkeypatch):
+    calls = []
+    decode = security.decode_token
+    monkeypatch.setattr(security, "decode_token", lambda token: calls.append(token) or decode(token))
+    assert client.get("/reminders", headers=auth_headers).status_code == 200
+    assert client.get("/tax/due", headers=auth_headers).status_code == 200
+    assert len(calls) == 1
+    assert client.get("/reminders").status_code == 401
+    assert client.get("/reminders", headers={"Authorization": "Bearer nope"}).status_code == 401
+    assert client.get("/reminders", headers={"Authorization": "Basic abc"}).status_code == 401
+
+def signup(client, monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", 0)
+    monkeypatch.setattr(security, "pwd_context", security.build_pwd_context(bcrypt_rounds=4))
+    return client.post("/auth/signup", json={"name": "A", "email": "a@example.com", "password": "s3cret"}).json()
+
+def bearer(tokens):
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+def test_refresh_rotates_tokens(client, monkeypatch):
+    tokens = signup(client, monkeypatch)
+    assert tokens["refresh_token"] and tokens["expires_in"] == settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    # a refresh token is not an access token
+    assert client.get("/reminders", headers={"Authorization": f"Bearer {tokens['refresh_token']}"}).status_code == 401
+    rotated = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    assert client.get("/reminders", headers=bearer(rotated)).status_code == 200
+    # reuse of a rotated refresh token is rejected
+    assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": tokens["access_token"]}).status_code == 401
+
+def test_logout_revokes_cached_token(client, monkeypatch):
+    tokens = signup(client, monkeypatch)
+    assert client.get("/reminders", headers=bearer(tokens)).status_code == 200
+    assert client.post("/auth/logout", headers=bearer(tokens), json={"refresh_token": tokens["refresh_token"]}).json() == {"ok": True}
+    assert client.get("/reminders", headers=bearer(tokens)).status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+def test_bloom_filter():
+    bloom = BloomFilter(1000, 0.01)
+    for i in range(1000):
+        bloom.add(f"revoked-{i}")
+    assert all(f"revoked-{i}" in bloom for i in range(1000))
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+def test_hashing_works_across_event_loops(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", 0)
+    monkeypatch.setattr(settings, "PASSWORD_HASH_MAX_PENDING", 1)
+    monkeypatch.setattr(security, "pwd_context", security.build_pwd_context(bcrypt_rounds=4))
+    async def concurrent():
+        return await asyncio.gather(*(security.hash_password_async("pw") for _ in range(3)))
+    # the pending-slots semaphore must not stay bound to the first loop
+    for _ in range(2):
+        assert len(asyncio.run(concurrent())) == 3
+
+def test_revocation_sync_sees_late_commits(session, user):
+    later = datetime.utcnow() + timedelta(hours=1)
+    worker = RevocationList(capacity=100, sync_seconds=0)
+    session.add(RevokedToken(id=10, jti="high", user_id=user.id, expires_at=later))
+    session.commit()
+    worker.sync(session)
+    assert worker.is_revoked(session, "high")
+    # another worker's transaction took a lower id but committed after our sync
+    session.add(RevokedToken(id=5, jti="low", user_id=user.id, expires_at=later, revoked_at=datetime.utcnow() - timedelta(seconds=1)))
+    session.commit()
+    assert worker.is_revoked(session, "low")
+
+def test_revocation_prunes_expired_rows(engine, session, user):
+    worker = RevocationList(capacity=100, sync_seconds=0, engine=engine)
+    worker.sync(session)
+    session.add(RevokedToken(jti="old", user_id=user.id, expires_at=datetime.utcnow() - timedelta(minutes=1)))
+    session.commit()
+    worker.sync(session)
+    assert "old" in worker._bloom
+    assert worker.prune() == 1
+    session.expire_all()
+    assert session.exec(select(RevokedToken)).all() == []
+    assert not worker.is_revoked(session, "old")
+    assert "old" not in worker._bloom
+
+def test_revocation_sync_never_writes(session, user):
+    worker = RevocationList(capacity=100, sync_seconds=0)
+    session.add(RevokedToken(jti="old", user_id=user.id, expires_at=datetime.utcnow() - timedelta(minutes=1)))
+    session.commit()
+    # a full reload only reads; deleting is left to prune() on the timer
+    worker.sync(session)
+    assert session.exec(select(RevokedToken.jti)).all() == ["old"]
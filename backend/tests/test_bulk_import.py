@@ -0,0 +1,61 @@
+# tests/test_bulk_import.py
+import io
+import json
+from sqlmodel import select
+from app.models.transaction import Transaction
+from app.services.importer import import_transactions
+from app.services.aggregation import income_expense_totals
+
+CSV = """type,amount,date,category,description,currency
+income,100.5,2024-05-01,sales,first,
+EXPENSE,40,2024-05-02,rent,,BDT
+INCOME,not-a-number,2024-05-03,sales,bad,
+INCOME,10,2024-06-01,sales,,
+"""
+
+def test_csv_upload_reports_bad_rows(client, session, user, auth_headers):
+    response = client.post("/transactions/bulk", headers=auth_headers, files={"file": ("ledger.csv", CSV, "text/csv")})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["inserted"] == 3
+    assert body["failed"] == 1
+    assert body["errors"][0]["line"] == 4
+    assert income_expense_totals(session, user.id) == (110.5, 40.0)
+
+def test_jsonl_in_small_chunks(session, user):
+    lines = [json.dumps({"type": "INCOME", "amount": i, "date": "2024-01-%02d" % (i % 28 + 1), "category": "sales"}) for i in range(1, 26)]
+    lines.insert(5, "{broken")
+    result = import_transactions(session, user.id, io.BytesIO("\n".join(lines).encode()), "jsonl", chunk_size=4)
+    assert result["inserted"] == 25
+    assert result["errors"] == [{"line": 6, "error": result["errors"][0]["error"]}]
+    rows = session.exec(select(Transaction).where(Transaction.user_id==user.id)).all()
+    assert len(rows) == 25
+    assert income_expense_totals(session, user.id)[0] == sum(range(1, 26))
+
+def test_unknown_format(client, user, auth_headers):
+    response = client.post("/transactions/bulk?format=xml", headers=auth_headers, files={"file": ("a.xml", "<a/>", "text/xml")})
+    assert response.status_code == 400
+
+def test_undecodable_lines_are_row_errors(client, session, user, auth_headers):
+    latin1 = "type,amount,date,category,description\nINCOME,10,2024-05-01,sales,ok\nINCOME,20,2024-05-02,sales,Caf\xe9\nINCOME,30,2024-05-03,sales,ok\n".encode("latin-1")
+    response = client.post("/transactions/bulk", headers=auth_headers, files={"file": ("ledger.csv", latin1, "text/csv")})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["inserted"], body["failed"]) == (2, 1)
+    assert body["errors"][0]["line"] == 3 and "UTF-8" in body["errors"][0]["error"]
+    assert income_expense_totals(session, user.id) == (40.0, 0.0)
+
+def test_nul_byte_is_a_row_error(session, user):
+    data = b"type,amount,date,category\nINCOME,10,2024-05-01,sales\nINCOME,2\x000,2024-05-02,sales\nINCOME,30,2024-05-03,sales\n"
+    result = import_transactions(session, user.id, io.BytesIO(data), "csv", chunk_size=1)
+    assert (result["inserted"], result["failed"]) == (2, 1)
+    assert result["errors"][0]["line"] == 3
+    # csv.Error from the parser itself
+    oversized = b"type,amount,date,category,description\nINCOME,10,2024-05-01,sales,\"" + b"x" * 200000 + b"\"\nINCOME,30,2024-05-03,sales,ok\n"
+    result = import_transactions(session, user.id, io.BytesIO(oversized), "csv")
+    assert (result["inserted"], result["failed"]) == (1, 1)
+    assert "field larger" in result["errors"][0]["error"]
+    jsonl = b'{"type": "INCOME", "amount": 5, "date": "2024-05-01", "category": "a"}\n\xff\xfe\n'
+    result = import_transactions(session, user.id, io.BytesIO(jsonl), "jsonl")
+    assert (result["inserted"], result["failed"]) == (1, 1)
+    assert result["errors"][0]["line"] == 2
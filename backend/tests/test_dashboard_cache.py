@@ -0,0 +1,68 @@
+# tests/test_dashboard_cache.py
+import time
+from app.services import cache as cache_module
+from app.services.cache import LRUCache
+
+def add_income(client, headers, amount):
+    return client.post("/transactions", headers=headers, json={"type": "INCOME", "amount": amount, "date": "2024-05-10", "category": "sales"}).json()
+
+def test_etag_and_304(client, user, auth_headers):
+    add_income(client, auth_headers, 100.0)
+    first = client.get("/dashboard/summary", headers=auth_headers)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    again = client.get("/dashboard/summary", headers={**auth_headers, "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    since = client.get("/dashboard/summary", headers={**auth_headers, "If-Modified-Since": first.headers["Last-Modified"]})
+    assert since.status_code == 304
+
+def test_transaction_write_invalidates(client, user, auth_headers):
+    tx = add_income(client, auth_headers, 100.0)
+    first = client.get("/dashboard/category-breakdown", headers=auth_headers)
+    client.put(f"/transactions/{tx['id']}", headers=auth_headers, json={"type": "INCOME", "amount": 250.0, "date": "2024-05-10", "category": "sales"})
+    second = client.get("/dashboard/category-breakdown", headers={**auth_headers, "If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 200
+    assert second.json()["breakdown"][0]["amount"] == 250.0
+
+def test_tax_write_only_invalidates_summary(client, user, auth_headers):
+    add_income(client, auth_headers, 100.0)
+    summary = client.get("/dashboard/summary", headers=auth_headers)
+    breakdown = client.get("/dashboard/category-breakdown", headers=auth_headers)
+    client.post("/tax/generate", headers=auth_headers, json={"year": 2024, "month": 5})
+    assert client.get("/dashboard/summary", headers={**auth_headers, "If-None-Match": summary.headers["ETag"]}).status_code == 200
+    assert client.get("/dashboard/category-breakdown", headers={**auth_headers, "If-None-Match": breakdown.headers["ETag"]}).status_code == 304
+
+def test_lru_ttl_and_eviction():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", {"v": 1}, ttl=60)
+    cache.set("b", {"v": 2}, ttl=60)
+    cache.get("a")
+    cache.set("c", {"v": 3}, ttl=60)
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    cache.set("d", {"v": 4}, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("d") is None
+
+def test_recompute_in_the_write_second_is_newer(client, user, auth_headers, monkeypatch):
+    monkeypatch.setattr(cache_module.time, "time", lambda: 1_700_000_000.5)
+    add_income(client, auth_headers, 100.0)
+    first = client.get("/dashboard/summary", headers=auth_headers)
+    add_income(client, auth_headers, 50.0)
+    # same wall-clock second as the first response
+    second = client.get("/dashboard/summary", headers={**auth_headers, "If-Modified-Since": first.headers["Last-Modified"]})
+    assert second.status_code == 200
+    assert second.json()["totals"]["income_total"] == 150.0
+    assert client.get("/dashboard/summary", headers={**auth_headers, "If-Modified-Since": second.headers["Last-Modified"]}).status_code == 304
+
+def test_bookkeeping_is_bounded(monkeypatch):
+    clock = [1_700_000_000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: clock[0])
+    for uid in range(1000):
+        cache_module.get_or_compute(uid, "summary", lambda: {"v": uid})
+        cache_module.invalidate(uid)
+    assert cache_module.tracked_users() == 1000
+    clock[0] += 1
+    cache_module.invalidate(0)
+    assert cache_module.tracked_users() == 1
@@ -0,0 +1,44 @@
+# tests/test_export.py
+import csv
+import io
+import json
+import pytest
+from datetime import date, timedelta
+from app.models.transaction import Transaction
+from app.services import exporter
+
+def seed(session, user_id, n=23):
+    start = date(2024, 1, 1)
+    session.add_all([Transaction(user_id=user_id, type="INCOME" if i % 3 else "EXPENSE", amount=float(i), date=start + timedelta(days=i), category="sales") for i in range(n)])
+    session.commit()
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    monkeypatch.setattr(exporter, "EXPORT_BATCH_SIZE", 5)
+
+def test_csv_export_with_filters(client, session, user, auth_headers):
+    seed(session, user.id)
+    response = client.get("/transactions/export", headers=auth_headers, params={"format": "csv", "type": "income"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 15
+    assert all(r["type"] == "INCOME" for r in rows)
+    assert rows[0]["date"] == "2024-01-02"
+
+def test_ndjson_export(client, session, user, auth_headers):
+    seed(session, user.id)
+    response = client.get("/transactions/export", headers=auth_headers, params={"format": "ndjson"})
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["amount"] for r in rows] == [float(i) for i in range(23)]
+
+def test_parquet_export(client, session, user, auth_headers):
+    pq = pytest.importorskip("pyarrow.parquet")
+    seed(session, user.id)
+    response = client.get("/transactions/export", headers=auth_headers, params={"format": "parquet"})
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.num_rows == 23
+    assert table.column("amount").to_pylist() == [float(i) for i in range(23)]
+
+def test_unknown_export_format(client, user, auth_headers):
+    assert client.get("/transactions/export", headers=auth_headers, params={"format": "xlsx"}).status_code == 400
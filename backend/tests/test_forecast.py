@@ -0,0 +1,70 @@
+# tests/test_forecast.py
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+from app.services.forecast import train_monthly_forecast, forecast_batch, load_model
+
+def series(values, start_year=2024):
+    return [{"year": start_year + i // 12, "month": i % 12 + 1, "value": v} for i, v in enumerate(values)]
+
+def test_matches_sklearn_linear_regression():
+    LinearRegression = pytest.importorskip("sklearn.linear_model").LinearRegression
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        y = rng.normal(50000, 20000, size=12)
+        t = np.arange(12).reshape(-1, 1)
+        model = LinearRegression().fit(t, y)
+        expected = model.predict(np.array([[12], [13], [14]]))
+        std = np.std(y - model.predict(t))
+        expected_conf = max(0.0, min(1.0, 1 - std / np.mean(np.abs(y))))
+        # shuffled input: the service sorts by (year, month)
+        points = series(y.tolist())
+        rng.shuffle(points)
+        result = train_monthly_forecast(1, points)
+        np.testing.assert_allclose([p["value"] for p in result["predictions"]], expected, rtol=1e-9)
+        assert result["confidence"] == pytest.approx(expected_conf, abs=1e-9)
+        np.testing.assert_allclose(load_model(1), [model.intercept_, model.coef_[0]], rtol=1e-9)
+
+def test_batch_matches_single():
+    rng = np.random.default_rng(1)
+    Y = rng.normal(0, 1000, size=(50, 12))
+    Y[3] = 0.0
+    batch = forecast_batch(Y)
+    for i in (0, 3, 49):
+        single = train_monthly_forecast(i, series(Y[i].tolist()))
+        assert [p["value"] for p in single["predictions"]] == pytest.approx(batch["predictions"][i].tolist())
+        assert single["confidence"] == pytest.approx(batch["confidence"][i])
+
+def test_too_short():
+    assert train_monthly_forecast(1, series([1.0] * 5)) is None
+
+def test_import_does_not_load_pandas_or_sklearn():
+    code = "import sys, app.services.forecast; print('pandas' in sys.modules or 'sklearn' in sys.modules)"
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=backend_dir)
+    assert out.stdout.strip() == "False"
+
+def test_unchanged_series_is_not_refit(monkeypatch):
+    from app.services import forecast
+    points = series([float(v) for v in range(100, 112)])
+    first = train_monthly_forecast(7, points)
+    version = forecast._model_store.get(7).version
+    monkeypatch.setattr(forecast, "forecast_batch", lambda *a, **k: pytest.fail("refit on unchanged series"))
+    assert train_monthly_forecast(7, list(reversed(points))) == first
+    assert forecast._model_store.get(7).version == version
+
+def test_model_store_lru_and_persistence(tmp_path):
+    from app.services.model_store import ForecastModelStore
+    path = str(tmp_path / "models.db")
+    store = ForecastModelStore(max_entries=2, path=path)
+    for user_id in (1, 2, 3):
+        store.put(user_id, "h%d" % user_id, [1.0, 2.0], [3.0, 4.0, 5.0], 0.5, "t")
+    assert len(store) == 2
+    assert store.put(1, "h1b", [0.0, 1.0], [1.0, 1.0, 1.0], 0.9, "t2").version == 2
+    reopened = ForecastModelStore(max_entries=2, path=path)
+    entry = reopened.get(1)
+    assert entry.version == 2 and entry.series_hash == "h1b"
+    np.testing.assert_array_equal(entry.coef, [0.0, 1.0])
+    assert reopened.get(3).predictions == [3.0, 4.0, 5.0]
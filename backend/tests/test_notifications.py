@@ -0,0 +1,133 @@
+# tests/test_notifications.py
+import asyncio
+import socket
+import threading
+import time
+from datetime import datetime
+import pytest
+from sqlmodel import select
+from app.models.reminder import Reminder
+from app.services.notifications import NotificationPipeline, SMTPTransport, TokenBucket
+from app.utils.reminder_dispatcher import ReminderDispatcher
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield loop
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+def run(loop, coro):
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(10)
+
+def reminder(i, user_id=1):
+    return Reminder(id=i, user_id=user_id, related_type="tax", related_id=i, remind_at=datetime(2024, 7, 10, 10, 0))
+
+def recipients(user_ids):
+    return {uid: (f"user{uid}", f"user{uid}@example.com") for uid in user_ids}
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=1.0, burst=2)
+    assert bucket.take(1, now=0) == 0 and bucket.take(1, now=0) == 0
+    assert bucket.take(1, now=0) == pytest.approx(1.0)
+    assert bucket.take(2, now=0) == 0
+    assert bucket.take(1, now=1.0) == 0
+
+def test_smtp_batches_over_persistent_connections(loop):
+    aiosmtpd = pytest.importorskip("aiosmtpd.controller")
+
+    class Sink:
+        def __init__(self):
+            self.messages, self.sessions = [], set()
+        async def handle_DATA(self, server, session, envelope):
+            self.sessions.add(id(session))
+            self.messages.append((envelope.rcpt_tos, envelope.content.decode()))
+            return "250 OK"
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    sink = Sink()
+    controller = aiosmtpd.Controller(sink, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        pipeline = NotificationPipeline(lambda: SMTPTransport("127.0.0.1", port), recipients, workers=2, batch_size=50, per_user_per_minute=6000, burst=1000)
+        run(loop, pipeline.start())
+        futures = [pipeline.submit(reminder(i, user_id=i % 10)) for i in range(300)]
+        for f in futures:
+            f.result(10)
+        run(loop, pipeline.stop())
+    finally:
+        controller.stop()
+    assert len(sink.messages) == 300
+    assert len(sink.sessions) <= 2
+    assert "Tax reminder for user3" in next(content for rcpt, content in sink.messages if rcpt == ["user3@example.com"])
+    metrics = pipeline.metrics()
+    assert metrics["sent"] == 300 and metrics["batches"] < 300
+
+class FakeTransport:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = []
+    def send_batch(self, messages):
+        if self.fail:
+            return [RuntimeError("mailbox unavailable")] * len(messages)
+        self.sent.extend(m["To"] for m in messages)
+        return [None] * len(messages)
+    def close(self):
+        pass
+
+def test_rate_limit_delays_instead_of_dropping(loop):
+    transport = FakeTransport()
+    pipeline = NotificationPipeline(lambda: transport, recipients, workers=1, per_user_per_minute=600, burst=2)
+    run(loop, pipeline.start())
+    futures = [pipeline.submit(reminder(i)) for i in range(4)]
+    for f in futures:
+        f.result(5)
+    run(loop, pipeline.stop())
+    assert len(transport.sent) == 4
+    assert pipeline.metrics()["rate_limited"] >= 2
+
+def test_dispatcher_retries_failed_notifications(loop, engine, session, user):
+    session.add(Reminder(user_id=user.id, related_type="tax", related_id=1, remind_at=datetime.utcnow()))
+    session.commit()
+    pipeline = NotificationPipeline(lambda: FakeTransport(fail=True), recipients, workers=1)
+    run(loop, pipeline.start())
+    worker = ReminderDispatcher(engine, send=pipeline.submit, sweep_seconds=0)
+    assert worker.run_once() == []
+    run(loop, pipeline.stop())
+    session.expire_all()
+    r = session.exec(select(Reminder)).one()
+    assert not r.sent_boolean and r.attempts == 1 and r.last_error == "mailbox unavailable"
+
+def test_token_bucket_prunes_refilled_keys():
+    bucket = TokenBucket(rate=1.0, burst=2)
+    for key in range(100):
+        bucket.take(key, now=0)
+    assert len(bucket) == 100
+    bucket.take(0, now=1.0)
+    assert len(bucket) == 100
+    bucket.take(0, now=2.0)
+    assert len(bucket) == 1
+
+def test_rate_limit_past_lease_is_not_sent_twice(loop, engine, session, user):
+    now = datetime.utcnow()
+    session.add_all([Reminder(user_id=user.id, related_type="tax", related_id=i, remind_at=now) for i in range(3)])
+    session.commit()
+    transport = FakeTransport()
+    # one token every 0.5 s, longer than the 0.2 s lease
+    pipeline = NotificationPipeline(lambda: transport, recipients, workers=1, per_user_per_minute=120, burst=1)
+    run(loop, pipeline.start())
+    worker = ReminderDispatcher(engine, send=pipeline.submit, lease_seconds=0.2, retry_base_seconds=60, sweep_seconds=0)
+    assert len(worker.run_once()) == 1
+    time.sleep(1.5)
+    run(loop, pipeline.stop())
+    assert len(transport.sent) == 1
+    assert pipeline.metrics()["cancelled"] >= 2
+    session.expire_all()
+    rows = session.exec(select(Reminder)).all()
+    assert sum(r.sent_boolean for r in rows) == 1
+    assert all(r.last_error == "TimeoutError" for r in rows if not r.sent_boolean)
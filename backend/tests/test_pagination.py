@@ -0,0 +1,45 @@
+# tests/test_pagination.py
+from datetime import date, timedelta
+from app.models.transaction import Transaction
+
+def seed(session, user_id, n=25):
+    start = date(2024, 1, 1)
+    # two rows per day so (date, id) ties are exercised
+    session.add_all([Transaction(user_id=user_id, type="INCOME", amount=float(i), date=start + timedelta(days=i // 2), category="sales") for i in range(n)])
+    session.commit()
+
+def walk(client, headers, page_size, **params):
+    seen, cursor = [], ""
+    while cursor is not None:
+        response = client.get("/transactions", headers=headers, params={"cursor": cursor, "page_size": page_size, **params})
+        assert response.status_code == 200
+        seen.extend(tx["id"] for tx in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+    return seen
+
+def test_cursor_walk_matches_offset_order(client, session, user, auth_headers):
+    seed(session, user.id)
+    offset_ids = [tx["id"] for tx in client.get("/transactions", headers=auth_headers, params={"page_size": 100}).json()]
+    assert walk(client, auth_headers, page_size=4) == offset_ids
+    assert len(offset_ids) == 25
+
+def test_cursor_is_stable_under_inserts(client, session, user, auth_headers):
+    seed(session, user.id, n=10)
+    first = client.get("/transactions", headers=auth_headers, params={"cursor": "", "page_size": 5})
+    page1 = [tx["id"] for tx in first.json()]
+    client.post("/transactions", headers=auth_headers, json={"type": "INCOME", "amount": 1.0, "date": "2025-01-01", "category": "sales"})
+    second = client.get("/transactions", headers=auth_headers, params={"cursor": first.headers["X-Next-Cursor"], "page_size": 5})
+    page2 = [tx["id"] for tx in second.json()]
+    assert not set(page1) & set(page2)
+    assert len(page2) == 5
+    assert "X-Next-Cursor" not in second.headers
+
+def test_invalid_cursor(client, user, auth_headers):
+    response = client.get("/transactions", headers=auth_headers, params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+def test_page_bounds_are_validated(client, session, user, auth_headers):
+    seed(session, user.id, n=3)
+    for params in ({"cursor": "", "page_size": 0}, {"page_size": -1}, {"page_size": 501}, {"page": 0}):
+        assert client.get("/transactions", headers=auth_headers, params=params).status_code == 422
+    assert len(client.get("/transactions", headers=auth_headers, params={"page_size": 500}).json()) == 3
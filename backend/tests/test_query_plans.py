@@ -0,0 +1,104 @@
+# tests/test_query_plans.py
+"""
+Runs every router endpoint against SQLite, records the SQL it emits and
+checks EXPLAIN QUERY PLAN for each statement. Any plan step that scans a
+whole table (instead of searching an index) fails the test.
+"""
+import re
+import pytest
+from datetime import date
+from sqlalchemy import event
+from app.migrations import upgrade
+from app.routers.transactions import encode_cursor
+
+FULL_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)")
+
+@pytest.fixture
+def recorded(engine):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")) and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+def exercise_routers(client, headers):
+    tx = client.post("/transactions", headers=headers, json={"type": "INCOME", "amount": 10.0, "date": "2024-05-10", "category": "sales"}).json()
+    client.get("/transactions", headers=headers)
+    client.get("/transactions?type=income&page=3", headers=headers)
+    client.get("/transactions?category=sales", headers=headers)
+    client.get("/transactions?date_from=2024-01-01&date_to=2024-12-31", headers=headers)
+    client.get("/transactions?type=expense&date_from=2024-01-01", headers=headers)
+    client.get("/transactions", headers=headers, params={"cursor": encode_cursor(date(2024, 5, 10), tx["id"] + 1)})
+    client.get("/transactions", headers=headers, params={"cursor": encode_cursor(date(2024, 5, 10), tx["id"] + 1), "type": "income"})
+    client.get("/transactions/export?format=ndjson&type=income&date_from=2024-01-01", headers=headers)
+    client.get(f"/transactions/{tx['id']}", headers=headers)
+    client.put(f"/transactions/{tx['id']}", headers=headers, json={"type": "EXPENSE", "amount": 5.0, "date": "2024-06-10", "category": "rent"})
+    client.get("/dashboard/summary", headers=headers)
+    client.get("/dashboard/category-breakdown", headers=headers)
+    client.post("/tax/generate", headers=headers, json={"year": 2024, "month": 6})
+    client.post("/tax/generate-year", headers=headers, json={"year": 2024})
+    client.post("/tax/simulate", headers=headers, json={"year": 2024, "steps": 5})
+    client.get("/tax/2024/6", headers=headers)
+    client.get("/tax/due", headers=headers)
+    client.post("/tax/mark-paid", headers=headers, json={"tax_id": 1})
+    client.post("/reminders/schedule", headers=headers, json={"related_type": "tax", "related_id": 1, "remind_at": "2024-07-10T10:00:00"})
+    client.get("/reminders", headers=headers)
+    client.delete(f"/transactions/{tx['id']}", headers=headers)
+
+def test_upgrade_is_idempotent(engine):
+    assert upgrade(engine) == []
+
+def test_upgrade_adds_missing_indexes(engine):
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX ix_transaction_user_type_date")
+    assert upgrade(engine) == ["ix_transaction_user_type_date"]
+
+def test_upgrade_adds_missing_columns(engine):
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE reminder")
+        conn.exec_driver_sql("CREATE TABLE reminder (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, related_type VARCHAR NOT NULL, related_id INTEGER NOT NULL, remind_at DATETIME NOT NULL, sent_boolean BOOLEAN NOT NULL, created_at DATETIME NOT NULL)")
+        conn.exec_driver_sql("INSERT INTO reminder VALUES (1, 1, 'tax', 1, '2024-01-01 00:00:00', 0, '2024-01-01 00:00:00')")
+    changes = upgrade(engine)
+    assert {"reminder.claimed_by", "reminder.attempts", "reminder.dead_letter", "ix_reminder_pending"} <= set(changes)
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT attempts, dead_letter FROM reminder").one() == (0, 0)
+
+def test_upgrade_backfills_empty_rollups(engine, client, auth_headers):
+    client.post("/transactions", headers=auth_headers, json={"type": "INCOME", "amount": 100.0, "date": "2024-05-10", "category": "sales"})
+    client.post("/transactions", headers=auth_headers, json={"type": "INCOME", "amount": 50.0, "date": "2024-05-20", "category": "sales"})
+    with engine.begin() as conn:
+        # a database from before MonthlyRollup: create_all() made the table empty
+        conn.exec_driver_sql("DELETE FROM monthlyrollup")
+    assert upgrade(engine) == ["monthlyrollup: rebuilt 1 bucket(s)"]
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT month, total, count FROM monthlyrollup").all() == [(5, 150.0, 2)]
+    assert upgrade(engine) == []
+
+def test_router_queries_use_indexes(engine, client, auth_headers, recorded):
+    exercise_routers(client, auth_headers)
+    assert recorded
+    offenders = []
+    with engine.connect() as conn:
+        for statement, parameters in recorded:
+            plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+            scans = [row[-1] for row in plan if FULL_SCAN.match(row[-1])]
+            if scans:
+                offenders.append((statement, scans))
+    assert not offenders, "\n\n".join(f"{s}\n  -> {scans}" for s, scans in offenders)
+
+def test_upgrade_collapses_duplicate_tax_records(engine):
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX uq_taxrecord_period")
+        conn.exec_driver_sql("CREATE INDEX ix_taxrecord_user_period ON taxrecord (user_id, year, month)")
+        for rid, month, paid in ((1, 5, 0), (2, 5, 1), (3, 5, 0), (4, 6, 0)):
+            conn.exec_driver_sql(
+                "INSERT INTO taxrecord (id, user_id, year, month, taxable_amount, vat_amount, tax_amount, payable, paid_boolean, generated_at) "
+                f"VALUES ({rid}, 1, 2024, {month}, 100, 15, 0, 115, {paid}, '2024-01-01 00:00:00')"
+            )
+    assert upgrade(engine) == ["taxrecord: removed 2 duplicate(s)", "uq_taxrecord_period"]
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT id, month, paid_boolean FROM taxrecord ORDER BY id").all() == [(1, 5, 1), (4, 6, 0)]
@@ -0,0 +1,87 @@
+# tests/test_reminders.py
+import time
+from datetime import datetime, timedelta
+from sqlmodel import select
+from app.models.reminder import Reminder
+from app.utils.reminder_dispatcher import ReminderDispatcher
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+def test_dispatcher_sends_due_reminders_in_order(engine, session, user):
+    now = datetime.utcnow()
+    session.add(Reminder(user_id=user.id, related_type="tax", related_id=1, remind_at=now - timedelta(minutes=1)))
+    session.add(Reminder(user_id=user.id, related_type="tax", related_id=2, remind_at=now + timedelta(days=1)))
+    session.commit()
+    sent = []
+    dispatcher = ReminderDispatcher(engine, send=lambda r: sent.append(r.related_id), sweep_seconds=0)
+    dispatcher.start()
+    try:
+        assert wait_for(lambda: sent == [1])
+        soon = Reminder(user_id=user.id, related_type="tax", related_id=3, remind_at=datetime.utcnow() + timedelta(milliseconds=200))
+        session.add(soon)
+        session.commit()
+        dispatcher.push(soon.id, soon.remind_at)
+        assert wait_for(lambda: sent == [1, 3])
+        assert dispatcher.pending() == 1
+    finally:
+        dispatcher.stop()
+    session.expire_all()
+    flags = {r.related_id: r.sent_boolean for r in session.exec(select(Reminder))}
+    assert flags == {1: True, 2: False, 3: True}
+
+def add_due(session, user, n):
+    now = datetime.utcnow() - timedelta(seconds=1)
+    for i in range(n):
+        session.add(Reminder(user_id=user.id, related_type="tax", related_id=i, remind_at=now))
+    session.commit()
+
+def test_workers_claim_disjoint_batches(engine, session, user):
+    add_due(session, user, 5)
+    a = ReminderDispatcher(engine, worker_id="a", batch_size=3, sweep_seconds=0)
+    b = ReminderDispatcher(engine, worker_id="b", batch_size=3, sweep_seconds=0)
+    first, second = a.claim(), b.claim()
+    assert len(first) == 3 and len(second) == 2
+    assert not {r.id for r in first} & {r.id for r in second}
+    assert a.claim() == [] and b.claim() == []
+    # a stale worker cannot mark another worker's claim as sent
+    assert a.dispatch(second) == [r.id for r in second]
+    session.expire_all()
+    assert not any(r.sent_boolean for r in session.exec(select(Reminder).where(Reminder.claimed_by=="b")))
+
+def test_expired_lease_is_reclaimed(engine, session, user):
+    add_due(session, user, 1)
+    crashed = ReminderDispatcher(engine, worker_id="crashed", lease_seconds=0, sweep_seconds=0)
+    assert len(crashed.claim()) == 1
+    sent = []
+    other = ReminderDispatcher(engine, worker_id="other", send=lambda r: sent.append(r.id), sweep_seconds=0)
+    assert other.run_once() == sent and len(sent) == 1
+    session.expire_all()
+    r = session.exec(select(Reminder)).one()
+    assert r.sent_boolean and r.attempts == 2 and r.claimed_by is None
+
+def test_retry_with_backoff_then_dead_letter(engine, session, user):
+    add_due(session, user, 1)
+    def fail(reminder):
+        raise RuntimeError("smtp down")
+    worker = ReminderDispatcher(engine, send=fail, max_attempts=3, retry_base_seconds=60, sweep_seconds=0)
+    assert worker.run_once() == []
+    session.expire_all()
+    r = session.exec(select(Reminder)).one()
+    assert r.attempts == 1 and not r.dead_letter and r.last_error == "smtp down"
+    assert r.lease_expires > datetime.utcnow() + timedelta(seconds=50)
+    assert worker.claim() == []  # backing off
+    worker.retry_base_seconds = 0
+    r.lease_expires = None
+    session.add(r)
+    session.commit()
+    worker.run_once()
+    session.expire_all()
+    r = session.exec(select(Reminder)).one()
+    assert r.attempts == 3 and r.dead_letter and not r.sent_boolean
+    assert worker.claim() == []
@@ -0,0 +1,47 @@
+# tests/test_rollup.py
+from datetime import date
+from sqlmodel import Session, select
+from app.models.rollup import MonthlyRollup
+from app.services.rollup import apply_delta, rebuild_rollups
+
+def snapshot(session, user_id):
+    rows = session.exec(select(MonthlyRollup).where(MonthlyRollup.user_id==user_id)).all()
+    return {(r.year, r.month, r.category, r.type): (round(r.total, 2), r.count) for r in rows}
+
+def test_writes_keep_rollup_in_sync(client, session, user, auth_headers):
+    first = client.post("/transactions", headers=auth_headers, json={"type": "income", "amount": 100.0, "date": "2024-05-10", "category": "sales"}).json()
+    client.post("/transactions", headers=auth_headers, json={"type": "EXPENSE", "amount": 40.0, "date": "2024-05-12", "category": "rent"})
+    second = client.post("/transactions", headers=auth_headers, json={"type": "INCOME", "amount": 60.0, "date": "2024-05-20", "category": "sales"}).json()
+    # move one income to another month, drop another
+    client.put(f"/transactions/{first['id']}", headers=auth_headers, json={"type": "INCOME", "amount": 150.0, "date": "2024-06-01", "category": "sales"})
+    client.delete(f"/transactions/{second['id']}", headers=auth_headers)
+
+    session.expire_all()
+    incremental = snapshot(session, user.id)
+    assert incremental == {(2024, 6, "sales", "INCOME"): (150.0, 1), (2024, 5, "rent", "EXPENSE"): (40.0, 1)}
+    rebuild_rollups(session, user.id)
+    assert snapshot(session, user.id) == incremental
+
+def test_tax_generate_reads_rollup(client, user, auth_headers):
+    client.post("/transactions", headers=auth_headers, json={"type": "INCOME", "amount": 1000.0, "date": "2024-05-10", "category": "sales"})
+    client.post("/transactions", headers=auth_headers, json={"type": "INCOME", "amount": 500.0, "date": "2024-06-10", "category": "sales"})
+    response = client.post("/tax/generate", headers=auth_headers, json={"year": 2024, "month": 5})
+    assert response.status_code == 200
+    assert response.json()["summary"]["taxable_amount"] == 1000.0
+
+def test_apply_delta_increments_in_the_database(engine, user):
+    with Session(engine) as first, Session(engine) as second:
+        apply_delta(first, user.id, date(2024, 5, 1), "sales", "income", 100.0)
+        first.commit()
+        stale = second.exec(select(MonthlyRollup)).one()
+        assert stale.total == 100.0
+        apply_delta(first, user.id, date(2024, 5, 2), "sales", "INCOME", 50.0)
+        first.commit()
+        # second still holds the bucket it read before first's update
+        apply_delta(second, user.id, date(2024, 5, 3), "sales", "INCOME", 25.0)
+        second.commit()
+        assert snapshot(second, user.id) == {(2024, 5, "sales", "INCOME"): (175.0, 3)}
+        for amount in (100.0, 50.0, 25.0):
+            apply_delta(first, user.id, date(2024, 5, 1), "sales", "INCOME", -amount, -1)
+        first.commit()
+        assert snapshot(first, user.id) == {}
@@ -0,0 +1,52 @@
+# tests/test_scoring.py
+import random
+from datetime import date, timedelta
+import numpy as np
+from app.models.user import User
+from app.models.transaction import Transaction
+from app.models.tax import TaxRecord
+from app.services.scoring import compute_health_score, compute_health_scores, split_net
+from app.services.rollup import rebuild_rollups
+from app.jobs.health_scores import iter_user_chunks, score_users
+from app.routers.dashboard import build_summary
+
+def test_batch_matches_single_exactly():
+    rng = np.random.default_rng(3)
+    income = rng.uniform(0, 150000, size=(500, 12))
+    expense = rng.uniform(0, 120000, size=(500, 12))
+    income[:10] = 0.0
+    expense[10:20] = expense[10:20, :1]  # flat expenses
+    tax_due = rng.uniform(0, 50000, size=500)
+    batch = compute_health_scores(income, expense, tax_due)
+    single = [compute_health_score(income[i].tolist(), expense[i].tolist(), float(tax_due[i])) for i in range(500)]
+    assert batch.tolist() == single
+
+def test_edge_cases():
+    assert compute_health_score([], [], 0.0) == 20
+    assert compute_health_score([100.0], [50.0], 0.0) == compute_health_scores([[100.0]], [[50.0]], [0.0])[0]
+    # uneven lengths use the most recent overlapping months
+    assert compute_health_score([1.0, 2.0, 3.0], [1.0, 1.0], 0.0) == compute_health_score([2.0, 3.0], [1.0, 1.0], 0.0)
+
+def test_job_matches_dashboard(session):
+    rng = random.Random(5)
+    today = date.today()
+    users = [User(name=f"u{i}", email=f"u{i}@example.com", password_hash="x") for i in range(7)]
+    session.add_all(users)
+    session.commit()
+    for u in users:
+        for _ in range(40):
+            d = today - timedelta(days=rng.randint(0, 400))
+            session.add(Transaction(user_id=u.id, type=rng.choice(["INCOME", "EXPENSE"]), amount=rng.uniform(10, 9000), date=d, category="sales"))
+        session.add(TaxRecord(user_id=u.id, year=2024, month=1, taxable_amount=1, vat_amount=0, tax_amount=0, payable=rng.uniform(0, 5000)))
+    session.commit()
+    rebuild_rollups(session)
+    chunks = list(iter_user_chunks(session, chunk_size=3))
+    assert [len(c) for c in chunks] == [3, 3, 1]
+    scored = dict(pair for chunk in chunks for pair in score_users(session, chunk, today))
+    for u in users:
+        assert scored[u.id] == build_summary(session, u.id)["business_health_score"]
+
+def test_split_net():
+    income, expense = split_net([5.0, -3.0, 0.0])
+    assert income.tolist() == [5.0, 0.0, 0.0]
+    assert expense.tolist() == [0.0, 3.0, 0.0]
@@ -0,0 +1,147 @@
+# tests/test_tax.py
+from datetime import date
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import SQLModel, Session, create_engine, select
+from app.models.user import User
+from app.models.tax import TaxConfig, TaxRecord, TaxRun
+from app.models.transaction import Transaction
+from app.services.rollup import rebuild_rollups
+from app.services.tax_service import generate_tax_records
+from app.jobs.generate_tax import run_month_end, _claim_run
+
+def add(client, headers, amount, day, type="INCOME"):
+    client.post("/transactions", headers=headers, json={"type": type, "amount": amount, "date": day, "category": "sales"})
+
+def records(session, user_id):
+    session.expire_all()
+    return session.exec(select(TaxRecord).where(TaxRecord.user_id==user_id).order_by(TaxRecord.month)).all()
+
+def test_generate_is_idempotent(client, session, user, auth_headers):
+    add(client, auth_headers, 1000.0, "2024-05-10")
+    add(client, auth_headers, 300.0, "2024-05-11", "EXPENSE")
+    first = client.post("/tax/generate", headers=auth_headers, json={"year": 2024, "month": 5}).json()["summary"]
+    add(client, auth_headers, 500.0, "2024-05-20")
+    second = client.post("/tax/generate", headers=auth_headers, json={"year": 2024, "month": 5}).json()["summary"]
+    assert first["taxable_amount"] == 1000.0
+    assert second["taxable_amount"] == 1500.0
+    assert second["vat_amount"] == 225.0
+    assert len(records(session, user.id)) == 1
+
+def test_generate_year(client, session, user, auth_headers):
+    session.add(TaxConfig(user_id=user.id, year=2024, vat_rate=0.1, tax_rate=0.05))
+    session.commit()
+    add(client, auth_headers, 1000.0, "2024-02-10")
+    add(client, auth_headers, 2000.0, "2024-11-10")
+    client.post("/tax/generate", headers=auth_headers, json={"year": 2024, "month": 2})
+    body = client.post("/tax/generate-year", headers=auth_headers, json={"year": 2024}).json()
+    assert len(body["records"]) == 12
+    recs = records(session, user.id)
+    assert [r.month for r in recs] == list(range(1, 13))
+    assert recs[1].taxable_amount == 1000.0 and recs[1].vat_amount == 100.0 and recs[1].tax_amount == 50.0
+    assert recs[10].payable == 2300.0
+    assert recs[11].due_date.isoformat() == "2025-01-15"
+
+def test_all_users_for_month(session):
+    users = [User(name=f"u{i}", email=f"u{i}@example.com", password_hash="x") for i in range(3)]
+    session.add_all(users)
+    session.commit()
+    session.add_all([
+        Transaction(user_id=users[0].id, type="INCOME", amount=100.0, date=date(2024, 5, 1), category="a"),
+        Transaction(user_id=users[1].id, type="INCOME", amount=200.0, date=date(2024, 5, 2), category="a"),
+        Transaction(user_id=users[2].id, type="EXPENSE", amount=50.0, date=date(2024, 5, 3), category="a"),
+    ])
+    session.commit()
+    rebuild_rollups(session)
+    results = generate_tax_records(session, 2024, [5])
+    assert {r["user_id"]: r["taxable_amount"] for r in results} == {users[0].id: 100.0, users[1].id: 200.0}
+    generate_tax_records(session, 2024, [5])
+    assert len(session.exec(select(TaxRecord)).all()) == 2
+
+def seed_users(session, n):
+    users = [User(name=f"u{i}", email=f"u{i}@example.com", password_hash="x") for i in range(n)]
+    session.add_all(users)
+    session.commit()
+    session.add_all([Transaction(user_id=u.id, type="INCOME", amount=100.0 * (i + 1), date=date(2024, 5, 3), category="a") for i, u in enumerate(users)])
+    session.add(TaxConfig(user_id=users[0].id, year=2024, vat_rate=0.0, tax_rate=0.1))
+    session.commit()
+    rebuild_rollups(session)
+    return users
+
+def test_month_end_job_is_resumable(engine, session):
+    users = seed_users(session, 5)
+    # pretend an earlier run died after the second user
+    session.add(TaxRun(year=2024, month=5, last_user_id=users[1].id, users_processed=2))
+    session.commit()
+    result = run_month_end(2024, 5, chunk_size=2, engine=engine, verbose=False)
+    assert result["status"] == "done" and result["users"] == 5
+    recs = session.exec(select(TaxRecord)).all()
+    assert sorted(r.user_id for r in recs) == [u.id for u in users[2:]]
+    assert run_month_end(2024, 5, engine=engine, verbose=False)["status"] == "skipped"
+
+def test_month_end_job_matches_single_path(engine, session):
+    users = seed_users(session, 4)
+    assert run_month_end(2024, 5, chunk_size=3, engine=engine, verbose=False)["records"] == 4
+    assert run_month_end(2024, 5, chunk_size=3, force=True, engine=engine, verbose=False)["records"] == 4
+    session.expire_all()
+    recs = {r.user_id: r for r in session.exec(select(TaxRecord))}
+    assert len(recs) == 4
+    assert (recs[users[0].id].vat_amount, recs[users[0].id].tax_amount, recs[users[0].id].payable) == (0.0, 10.0, 110.0)
+    assert (recs[users[3].id].vat_amount, recs[users[3].id].payable) == (60.0, 460.0)
+
+def test_generate_uses_bracket_config(client, session, user, auth_headers):
+    session.add(TaxConfig(user_id=user.id, year=2024, vat_rate=0.0, tax_rate=0.0, thresholds_json='{"brackets": [{"upto": 1000, "rate": 0.0}, {"rate": 0.1}]}'))
+    session.commit()
+    add(client, auth_headers, 3000.0, "2024-03-10")
+    summary = client.post("/tax/generate", headers=auth_headers, json={"year": 2024, "month": 3}).json()["summary"]
+    assert summary["tax_amount"] == 200.0 and summary["payable"] == 3200.0
+
+def test_simulate_is_read_only(client, session, user, auth_headers):
+    session.add(TaxConfig(user_id=user.id, year=2024, vat_rate=0.1, tax_rate=0.0))
+    session.commit()
+    add(client, auth_headers, 1000.0, "2024-04-10")
+    body = client.post("/tax/simulate", headers=auth_headers, json={"year": 2024, "month": 4, "adjustments": [-0.5, 0, 0.5]}).json()
+    assert [s["taxable_amount"] for s in body["scenarios"]] == [500.0, 1000.0, 1500.0]
+    assert [s["payable"] for s in body["scenarios"]] == [550.0, 1100.0, 1650.0]
+    grid = client.post("/tax/simulate", headers=auth_headers, json={"year": 2024, "min": -0.5, "max": 0.5, "steps": 1000}).json()
+    assert len(grid["scenarios"]) == 1000
+    assert records(session, user.id) == []
+    assert client.post("/tax/simulate", headers=auth_headers, json={"year": 2024, "steps": 10**6}).status_code == 400
+
+def test_simulate_rejects_bad_period(client, auth_headers):
+    for payload in ({}, {"year": None}, {"year": "soon"}, {"year": 2024, "month": "May"}, {"year": 2024, "month": 13}):
+        response = client.post("/tax/simulate", headers=auth_headers, json=payload)
+        assert response.status_code == 400 and response.json()["detail"] == "Invalid year or month"
+
+def test_concurrent_run_creation_claims_once(tmp_path):
+    # separate connections, like two uvicorn workers firing the month-end cron together
+    engine = create_engine(f"sqlite:///{tmp_path / 'runs.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as first, Session(engine) as second:
+        claimed = []
+
+        @event.listens_for(second, "before_flush")
+        def other_worker_wins(*args):
+            # runs after `second` found no row and before it inserts one
+            if not claimed:
+                claimed.append(_claim_run(first, 2024, 5, force=False))
+
+        assert _claim_run(second, 2024, 5, force=False) is None
+        assert claimed[0] is not None and claimed[0].locked_until is not None
+        assert len(second.exec(select(TaxRun)).all()) == 1
+    engine.dispose()
+
+def test_one_record_per_period(client, session, user, auth_headers):
+    add(client, auth_headers, 1000.0, "2024-05-10")
+    client.post("/tax/generate", headers=auth_headers, json={"year": 2024, "month": 5})
+    first = records(session, user.id)[0]
+    client.post("/tax/mark-paid", headers=auth_headers, json={"tax_id": first.id})
+    add(client, auth_headers, 500.0, "2024-05-20")
+    client.post("/tax/generate-year", headers=auth_headers, json={"year": 2024})
+    may = [r for r in records(session, user.id) if r.month == 5]
+    assert [(r.id, r.paid_boolean, r.taxable_amount) for r in may] == [(first.id, True, 1500.0)]
+    session.add(TaxRecord(user_id=user.id, year=2024, month=5, taxable_amount=0, vat_amount=0, tax_amount=0, payable=0))
+    with pytest.raises(IntegrityError):
+        session.commit()
+    session.rollback()
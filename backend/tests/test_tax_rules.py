@@ -0,0 +1,52 @@
+# tests/test_tax_rules.py
+import json
+import numpy as np
+from app.models.tax import TaxConfig
+from app.services.tax_rules import compile_rules, rules_for_config, DEFAULT_RULES
+
+SLABS = json.dumps({
+    "brackets": [{"upto": 1000, "rate": 0.0}, {"upto": 3000, "rate": 0.1}, {"rate": 0.2}],
+    "rebate": {"rate": 0.5, "max": 100},
+    "vat_exempt_upto": 2000,
+})
+
+def test_flat_config_matches_flat_rate():
+    amounts = np.random.default_rng(0).uniform(0, 1e6, 5000).round(2)
+    result = compile_rules(0.1, 0.05, "{}").evaluate(amounts)
+    vat = np.round(amounts * 0.1, 2)
+    tax = np.round(amounts * 0.05, 2)
+    assert np.array_equal(result["vat_amount"], vat)
+    assert np.array_equal(result["tax_amount"], tax)
+    assert np.array_equal(result["payable"], np.round(amounts + vat + tax, 2))
+
+def test_progressive_brackets_rebate_and_vat_exemption():
+    result = compile_rules(0.15, 0.0, SLABS).evaluate([500, 2000, 5000])
+    # 2000: 100 in the 10% slab, halved by the rebate; 5000: 200 + 400 = 600, rebate capped at 100
+    assert result["tax_amount"].tolist() == [0.0, 50.0, 500.0]
+    assert result["vat_amount"].tolist() == [0.0, 0.0, 750.0]
+    assert result["payable"].tolist() == [500.0, 2050.0, 6250.0]
+
+def test_rules_cached_by_config_version():
+    cfg = TaxConfig(user_id=1, year=2024, vat_rate=0.15, tax_rate=0.0, thresholds_json=SLABS)
+    first = rules_for_config(cfg)
+    assert rules_for_config(cfg) is first
+    cfg.thresholds_json = json.dumps({"brackets": [{"rate": 0.3}]})
+    changed = rules_for_config(cfg)
+    assert changed is not first and changed.version != first.version
+    assert rules_for_config(None) is DEFAULT_RULES
+    assert not first.rates.flags.writeable
+
+def test_malformed_thresholds_fall_back_to_flat_rate():
+    flat = compile_rules(0.1, 0.05, "{}").evaluate([1000.0, 5000.0])
+    for raw in (
+        '{"brackets": [{"upto": 3000, "rate": 0.1}, {"upto": 1000, "rate": 0.2}, {"rate": 0.3}]}',
+        '{"brackets": [0.1, 0.2]}',
+        '{"brackets": [{"upto": 1000, "rate": "ten"}, {"rate": 0.2}]}',
+        '{"brackets": {"upto": 1000}}',
+        '{"rebate": 0.5}',
+        '{"vat_exempt_upto": "lots"}',
+        'not json',
+    ):
+        result = compile_rules(0.1, 0.05, raw).evaluate([1000.0, 5000.0])
+        for key in flat:
+            assert np.array_equal(result[key], flat[key]), raw